@@ -1,33 +1,102 @@
 """
 AI 예측 API 라우터
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from datetime import datetime
-from typing import List, Dict
+from typing import Dict, Optional, Tuple
+from contextlib import suppress
+import os
+import tempfile
 
-from services.battery_service import BatteryService
-from services.ai_service import AIService
+from services.container import container
+from services.http_cache import cached_response
+from services.model_registry import BUILTIN_VERSION
+from services.record_reader import FORMAT_JSON, detect_format
+
+# 학습/평가 데이터 업로드 임시 저장 위치 / 복사 단위
+TRAINING_UPLOAD_DIR = os.getenv("TRAINING_UPLOAD_DIR") or tempfile.gettempdir()
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# 히스토리 학습/평가 기본 기간 (일)
+HISTORY_TRAINING_DAYS = 365
 
 router = APIRouter()
-battery_service = BatteryService()
-ai_service = AIService()
+ai_service = container.ai_service
+
+
+async def _spool_upload(request: Request, data_format: Optional[str]) -> Tuple[str, str, Dict]:
+    """요청 본문을 임시 파일로 저장 (메모리에 전체를 올리지 않음)
+
+    - multipart/form-data: file 필드
+    - application/x-ndjson, text/csv, application/json (레코드 배열) 등: 본문 그대로 (청크 단위)
+    반환: (파일 경로, 형식, 작업 설명)
+    """
+    content_type = request.headers.get("content-type", "").lower()
+    fd, path = tempfile.mkstemp(prefix="records-", suffix=".upload", dir=TRAINING_UPLOAD_DIR)
+    filename = None
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            if content_type.startswith("multipart/form-data"):
+                form = await request.form()
+                upload = form.get("file")
+                if upload is None or isinstance(upload, str):
+                    raise HTTPException(status_code=400, detail="file 필드가 필요합니다")
+                filename = upload.filename
+                fmt = data_format or detect_format(upload.filename, upload.content_type)
+                while chunk := await upload.read(UPLOAD_CHUNK_BYTES):
+                    await run_in_threadpool(out.write, chunk)
+                    size += len(chunk)
+            else:
+                fmt = data_format or detect_format(None, content_type)
+                async for chunk in request.stream():
+                    if chunk:
+                        # JSON은 배열인지만 미리 확인 - 원소는 학습 작업에서 조금씩 읽으며 검사
+                        head = chunk.lstrip() if size == 0 and fmt == FORMAT_JSON else b""
+                        if head and not head.startswith((b"[", b"\xef\xbb\xbf")):
+                            raise HTTPException(status_code=400, detail="레코드 배열이 필요합니다")
+                        await run_in_threadpool(out.write, chunk)
+                        size += len(chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="데이터가 없습니다")
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, fmt, {"type": "upload", "format": fmt, "filename": filename, "bytes": size}
+
+
+def _history_source(start: Optional[datetime], end: Optional[datetime],
+                    battery_id: Optional[int]) -> Tuple[Dict, Dict]:
+    """영구 저장소 기간 → (데이터 소스, 작업 설명) - 시작 시각 기본값은 HISTORY_TRAINING_DAYS일 전"""
+    store = container.telemetry_store
+    if store is None:
+        raise HTTPException(status_code=503, detail="텔레메트리 영구 저장소가 비활성화되어 있습니다")
+    end_ts = (end or datetime.now()).timestamp()
+    start_ts = start.timestamp() if start else end_ts - HISTORY_TRAINING_DAYS * 86400
+    source = {
+        "type": "history", "database_url": store.database_url,
+        "start": start_ts, "end": end_ts, "battery_id": battery_id,
+    }
+    description = {
+        "type": "history", "start": datetime.fromtimestamp(start_ts).isoformat(),
+        "end": datetime.fromtimestamp(end_ts).isoformat(), "battery_id": battery_id,
+    }
+    return source, description
 
 
 @router.get("/predict")
-async def predict_battery_health():
-    """배터리 건강 상태 예측"""
+async def predict_battery_health(request: Request):
+    """배터리 건강 상태 예측 (스냅샷 버전별 캐시, ETag / 304 지원)"""
     try:
-        # 현재 배터리 데이터 가져오기
-        battery_data = battery_service.generate_simulated_data()
+        # 현재 틱의 AI 예측 결과 (틱당 한 번만 추론)
+        snapshot = await container.current_async()
         
-        # AI 예측 수행
-        prediction = ai_service.predict_battery_health(battery_data)
-        
-        return {
+        return cached_response(request, snapshot, "ai:predict", lambda: {
             "success": True,
-            "data": prediction,
+            "data": snapshot.prediction,
             "timestamp": datetime.now().isoformat()
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -36,18 +105,12 @@ async def predict_battery_health():
 async def predict_single_battery(battery_id: int):
     """특정 배터리 건강 상태 예측"""
     try:
-        # 현재 배터리 데이터 가져오기
-        battery_data = battery_service.generate_simulated_data()
-        
-        # 특정 배터리 찾기
-        battery = next((b for b in battery_data["batteries"] if b["id"] == battery_id), None)
+        # 현재 틱의 예측 결과에서 특정 배터리 찾기
+        prediction = (await container.current_async()).find_prediction(battery_id)
         
-        if not battery:
+        if not prediction:
             raise HTTPException(status_code=404, detail="배터리를 찾을 수 없습니다")
         
-        # AI 예측 수행
-        prediction = ai_service._predict_single_battery(battery)
-        
         return {
             "success": True,
             "data": prediction,
@@ -59,6 +122,26 @@ async def predict_single_battery(battery_id: int):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/drift")
+async def get_drift(limit: int = Query(20, ge=1, le=1000, description="조회 배터리 수")):
+    """드리프트 점수가 높은 배터리 (지표별 분당 변화율, 기준선 대비 편차, CUSUM)"""
+    try:
+        fleet = (await container.current_async(prediction=False)).fleet
+        drift = fleet.drift
+        batteries = drift.top(fleet.battery_ids, limit) if drift is not None else []
+        return {
+            "success": True,
+            "data": {
+                "batteries": batteries,
+                "drifting_count": int((drift.score > 0).sum()) if drift is not None else 0,
+                "detector": container.battery_service.drift_detector.info()
+            },
+            "timestamp": datetime.now().isoformat()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/model/info")
 async def get_model_info():
     """AI 모델 정보 조회"""
@@ -66,8 +149,7 @@ async def get_model_info():
         return {
             "success": True,
             "data": {
-                "model_version": ai_service.model_version,
-                "model_accuracy": ai_service.model_accuracy,
+                **ai_service.model_info(),
                 "supported_features": [
                     "배터리 수명 예측 (RUL)",
                     "이상 탐지 (Anomaly Detection)",
@@ -75,9 +157,11 @@ async def get_model_info():
                     "충전 전략 추천",
                     "건강 상태 등급 분류"
                 ],
-                "model_type": "Deep Learning (CNN + RNN + Transformer)",
-                "training_data_count": 50000,
-                "last_updated": "2025-06-01"
+                "prediction_cache": (
+                    ai_service.prediction_cache.stats() if ai_service.prediction_cache is not None else None
+                ),
+                "inference_executor": container.inference.stats(),
+                "registry": ai_service.registry.info()
             },
             "timestamp": datetime.now().isoformat()
         }
@@ -85,29 +169,146 @@ async def get_model_info():
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/train")
-async def train_model(training_data: List[Dict]):
-    """AI 모델 학습"""
+@router.get("/model/versions")
+async def list_model_versions():
+    """모델 버전 목록 (디스크의 버전, 로드된 버전별 로드/워밍업 시간과 메모리 사용량)"""
+    try:
+        registry = await run_in_threadpool(ai_service.registry.info)
+        return {
+            "success": True,
+            "data": registry,
+            "timestamp": datetime.now().isoformat()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/model/versions/{version}/activate")
+async def activate_model_version(version: str):
+    """모델 버전 교체 (builtin: 규칙 기반 기본 모델)
+    
+    로드와 워밍업이 끝난 뒤 교체하므로 서버 재시작이나 WebSocket 재연결 없이
+    다음 예측부터 새 버전이 사용된다.
+    """
     try:
-        result = ai_service.train_model(training_data)
+        target = None if version == BUILTIN_VERSION else version
+        registry = await container.inference.run(ai_service.activate_model, target)
         return {
             "success": True,
-            "data": result,
+            "data": registry,
             "timestamp": datetime.now().isoformat()
         }
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/train", status_code=202)
+async def train_model(
+    request: Request,
+    source: str = Query("upload", pattern="^(upload|history)$", description="학습 데이터 소스"),
+    data_format: Optional[str] = Query(None, alias="format", pattern="^(ndjson|csv|json)$", description="업로드 형식"),
+    start: Optional[datetime] = Query(None, description="히스토리 학습 시작 시각"),
+    end: Optional[datetime] = Query(None, description="히스토리 학습 종료 시각 (기본값: 현재)"),
+    battery_id: Optional[int] = Query(None, description="히스토리 학습 대상 배터리 ID")
+):
+    """AI 모델 증분 학습 작업 제출 (업로드 NDJSON/CSV 또는 저장된 히스토리)
+    
+    학습은 백그라운드 프로세스에서 청크 단위로 진행되며, 진행 상황은
+    GET /train/jobs/{job_id} 로 조회한다.
+    """
+    try:
+        if source == "history":
+            data_source, description = _history_source(start, end, battery_id)
+            # 첫 작업은 프로세스 풀을 시작하므로 스레드풀에서 제출
+            job = await run_in_threadpool(ai_service.train_model, data_source, description)
+        else:
+            path, fmt, description = await _spool_upload(request, data_format)
+            data_source = {"type": "file", "path": path, "format": fmt}
+            job = await run_in_threadpool(ai_service.train_model, data_source, description, path)
+        
+        return {
+            "success": True,
+            "data": job,
+            "timestamp": datetime.now().isoformat()
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/train/jobs")
+async def list_training_jobs():
+    """학습 작업 목록 (최신순)"""
+    try:
+        jobs = await run_in_threadpool(ai_service.list_training_jobs)
+        return {
+            "success": True,
+            "data": jobs,
+            "count": len(jobs),
+            "timestamp": datetime.now().isoformat()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/train/jobs/{job_id}")
+async def get_training_job(job_id: str):
+    """학습 작업 상태 (status, progress, records, result)"""
+    try:
+        job = await run_in_threadpool(ai_service.get_training_job, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="학습 작업을 찾을 수 없습니다")
+        return {
+            "success": True,
+            "data": job,
+            "timestamp": datetime.now().isoformat()
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/evaluate")
-async def evaluate_model(test_data: List[Dict]):
-    """AI 모델 평가"""
+async def evaluate_model(
+    request: Request,
+    source: str = Query("upload", pattern="^(upload|history)$", description="평가 데이터 소스"),
+    data_format: Optional[str] = Query(None, alias="format", pattern="^(ndjson|csv|json)$", description="업로드 형식"),
+    start: Optional[datetime] = Query(None, description="히스토리 평가 시작 시각"),
+    end: Optional[datetime] = Query(None, description="히스토리 평가 종료 시각 (기본값: 현재)"),
+    battery_id: Optional[int] = Query(None, description="히스토리 평가 대상 배터리 ID")
+):
+    """AI 모델 평가 (업로드 NDJSON/CSV 또는 저장된 히스토리)
+    
+    데이터를 청크 단위로 읽어 활성 모델로 배치 예측하고 혼동 행렬과
+    RUL 오차 통계를 누적한다. 평가는 스레드풀에서 실행된다.
+    """
+    path = None
     try:
-        result = ai_service.evaluate_model(test_data)
+        if source == "history":
+            data_source, description = _history_source(start, end, battery_id)
+        else:
+            path, fmt, description = await _spool_upload(request, data_format)
+            data_source = {"type": "file", "path": path, "format": fmt}
+        
+        result = await run_in_threadpool(ai_service.evaluate_model, data_source)
         return {
             "success": True,
-            "data": result,
+            "data": {**result, "source": description},
             "timestamp": datetime.now().isoformat()
         }
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if path is not None:
+            with suppress(OSError):
+                os.remove(path)
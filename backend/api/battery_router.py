@@ -1,26 +1,47 @@
 """
 배터리 API 라우터
 """
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from typing import Optional
-from datetime import datetime
+from datetime import datetime, timedelta
+import asyncio
+import time
+import uuid
 
-from services.battery_service import BatteryService
+from services.container import container
+from services.history_export import (
+    EXPORT_CHUNK_ROWS, EXPORT_CSV, EXPORT_PATTERN, ExportUnavailableError, create_encoder,
+)
+from services.http_cache import HTTP_CACHE_MAX_AGE_SECONDS, cached_response
+from services.metrics import INGEST_READINGS
+from services.serialization import FORMAT_COLUMNAR, FORMAT_PATTERN, FORMAT_RECORDS, FastJSONResponse
+from services.telemetry_ingest import (
+    INGEST_ACK_TIMEOUT_SECONDS, INGEST_MAX_BODY_BYTES, SOURCE_SIMULATOR,
+    IngestError, QueueFullError, UnsupportedMediaTypeError, prepare_batch,
+)
+
+# 히스토리 조회 최대 개수
+HISTORY_MAX_LIMIT = 10000
+
+# 전달한 측정값의 반영 확인 주기 (초, 멀티 워커 모드 ack=applied)
+FORWARD_POLL_SECONDS = 0.02
 
 router = APIRouter()
-battery_service = BatteryService()
+battery_service = container.battery_service
 
 
 @router.get("/status")
-async def get_battery_status():
-    """현재 배터리 상태 조회"""
+async def get_battery_status(request: Request):
+    """현재 배터리 상태 조회 (스냅샷 버전별 캐시, ETag / 304 지원)"""
     try:
-        data = battery_service.generate_simulated_data()
-        return {
+        snapshot = await container.current_async(prediction=False)
+        return cached_response(request, snapshot, "battery:status", lambda: {
             "success": True,
-            "data": data,
+            "data": snapshot.battery_data,
             "timestamp": datetime.now().isoformat()
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -28,31 +49,183 @@ async def get_battery_status():
 @router.get("/history")
 async def get_battery_history(
     battery_id: Optional[int] = Query(None, description="배터리 ID"),
-    limit: int = Query(50, ge=1, le=100, description="조회 개수")
+    limit: int = Query(50, ge=1, le=HISTORY_MAX_LIMIT, description="조회 개수"),
+    start: Optional[datetime] = Query(None, description="조회 시작 시각 (영구 저장소 기간 조회)"),
+    end: Optional[datetime] = Query(None, description="조회 종료 시각 (기본값: 현재)"),
+    response_format: str = Query(FORMAT_RECORDS, alias="format", pattern=FORMAT_PATTERN,
+                                 description="응답 형식 (records / columnar)")
 ):
-    """배터리 히스토리 조회"""
+    """배터리 히스토리 조회 (columnar: 타임스탬프/지표별 배열)"""
     try:
-        history = battery_service.get_battery_history(battery_id, limit)
-        return {
+        columnar = response_format == FORMAT_COLUMNAR
+        if start is not None:
+            # 기간 조회는 영구 저장소에서 - 이벤트 루프를 막지 않도록 스레드풀에서 실행
+            if battery_service.telemetry_store is None:
+                raise HTTPException(status_code=503, detail="텔레메트리 영구 저장소가 비활성화되어 있습니다")
+            query = (battery_service.get_battery_history_range_columns if columnar
+                     else battery_service.get_battery_history_range)
+            history = await run_in_threadpool(query, start, end or datetime.now(), battery_id, limit)
+        else:
+            # 메모리 링 버퍼 조회 - 쓰기와 겹치지 않도록 컨테이너 락을 잡고 추론 실행기에서
+            query = (battery_service.get_battery_history_columns if columnar
+                     else battery_service.get_battery_history)
+            history = await container.read_locked(query, battery_id, limit)
+        return FastJSONResponse({
             "success": True,
             "data": history,
-            "count": len(history),
+            "count": len(history["timestamps"]) if columnar else len(history),
             "timestamp": datetime.now().isoformat()
-        }
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/history/export")
+async def export_battery_history(
+    start: Optional[datetime] = Query(None, description="내보내기 시작 시각 (기본값: 종료 24시간 전)"),
+    end: Optional[datetime] = Query(None, description="내보내기 종료 시각 (기본값: 현재)"),
+    battery_id: Optional[int] = Query(None, description="배터리 ID"),
+    export_format: str = Query(EXPORT_CSV, alias="format", pattern=EXPORT_PATTERN,
+                               description="내보내기 형식 (csv / ndjson / arrow)")
+):
+    """기간 히스토리 내보내기 (청크 단위 스트리밍 - 기간 크기와 무관하게 메모리 일정)"""
+    try:
+        end = end or datetime.now()
+        start = start or end - timedelta(days=1)
+        if start.timestamp() > end.timestamp():
+            raise HTTPException(status_code=400, detail="start는 end보다 이전이어야 합니다")
+        try:
+            encoder = create_encoder(export_format)
+        except ExportUnavailableError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        
+        # 동기 제너레이터 - StreamingResponse가 스레드풀에서 한 조각씩 읽고 전송이 끝나야 다음 청크를 읽음
+        chunks = battery_service.iter_history_range(start, end, battery_id, EXPORT_CHUNK_ROWS)
+        filename = f"battery_history_{start:%Y%m%dT%H%M%S}_{end:%Y%m%dT%H%M%S}.{encoder.extension}"
+        return StreamingResponse(
+            encoder.stream(chunks),
+            media_type=encoder.media_type,
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/statistics")
-async def get_battery_statistics():
-    """배터리 통계 조회"""
+async def get_battery_statistics(
+    request: Request,
+    window: Optional[str] = Query(None, pattern="^(1m|1h|24h)$", description="롤링 윈도우 (1m / 1h / 24h)"),
+    battery_id: Optional[int] = Query(None, description="배터리 ID (배터리별 누적 통계)")
+):
+    """배터리 통계 조회 (스냅샷 버전 + 파라미터별 캐시, ETag / 304 지원)
+    
+    롤링 윈도우 통계는 시간이 지나면 값이 바뀌므로 스냅샷 버전과 함께 시간 구간(HTTP_CACHE_MAX_AGE_SECONDS)별로 캐시
+    """
     try:
-        stats = battery_service.get_battery_statistics()
+        snapshot = await container.current_async(prediction=False)
+        return cached_response(request, snapshot, f"battery:statistics:{window}:{battery_id}", lambda: {
+            "success": True,
+            "data": battery_service.get_battery_statistics(battery_id, window),
+            "timestamp": datetime.now().isoformat()
+        }, bucket_seconds=max(HTTP_CACHE_MAX_AGE_SECONDS, 1) if window is not None else None)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def _read_body(request: Request) -> bytes:
+    """요청 본문 읽기 (INGEST_MAX_BODY_BYTES 초과 시 413)"""
+    too_large = HTTPException(status_code=413, detail=f"요청 본문이 너무 큽니다 (최대 {INGEST_MAX_BODY_BYTES}바이트)")
+    if int(request.headers.get("content-length") or 0) > INGEST_MAX_BODY_BYTES:
+        raise too_large
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > INGEST_MAX_BODY_BYTES:
+            raise too_large
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def _forwarded_applied(position: int) -> dict:
+    """전달 큐 위치 position까지 프로듀서 워커가 반영할 때까지 대기"""
+    shared = container.shared
+    while shared.forwarded_applied < position:
+        await asyncio.sleep(FORWARD_POLL_SECONDS)
+    return {"forwarded": True, "producer_pid": shared.info()["producer_pid"]}
+
+
+@router.post("/ingest", status_code=202)
+async def ingest_telemetry(
+    request: Request,
+    response: Response,
+    ack: str = Query("queued", pattern="^(queued|applied)$", description="응답 시점 (queued: 큐 저장 후 / applied: 반영 후)")
+):
+    """게이트웨이 측정값 일괄 수집 (NDJSON / JSON 배열 / 바이너리)
+    
+    측정값은 일괄 검증 후 프로세스 내 큐에 들어가고, 마이크로 배치 단위로
+    플릿 상태/히스토리/영구 저장소에 반영된다. 잘못된 측정값만 거부하고 나머지는 수집한다.
+    멀티 워커 모드에서 프로듀서가 아닌 워커는 검증한 측정값을 공유 메모리 전달 큐로 프로듀서에 넘긴다.
+    """
+    try:
+        if battery_service.telemetry_source == SOURCE_SIMULATOR:
+            raise HTTPException(status_code=503, detail="텔레메트리 소스가 simulator로 설정되어 수집 API가 비활성화되어 있습니다")
+        body = await _read_body(request)
+        received_at = time.time()
+        # 해석/검증은 측정값 수에 비례하므로 스레드풀에서 실행
+        batch, rejected, errors = await run_in_threadpool(
+            prepare_batch, body, request.headers.get("content-type", ""), received_at
+        )
+        INGEST_READINGS.labels("accepted").inc(len(batch))
+        INGEST_READINGS.labels("rejected").inc(rejected)
+        if len(batch) == 0:
+            raise HTTPException(status_code=400, detail={"message": "유효한 측정값이 없습니다", "errors": errors})
+        
+        data = {
+            "batch_id": uuid.uuid4().hex,
+            "accepted": len(batch),
+            "rejected": rejected,
+            "errors": errors,
+        }
+        if battery_service.is_replica:
+            # 멀티 워커 모드 - 수신 플릿 상태는 프로듀서 워커에만 있음 (프로듀서가 종료되면 승계한 워커가 이어서 꺼냄)
+            try:
+                position = container.shared.forward(batch)
+            except QueueFullError as e:
+                raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+            waiter = _forwarded_applied(position) if ack == "applied" else None
+            data["forwarded"] = True
+            data["queue_depth"] = container.shared.forward_depth
+        else:
+            try:
+                future = container.ingest_queue.offer(batch, wait=ack == "applied")
+            except QueueFullError as e:
+                raise HTTPException(status_code=429, detail=str(e),
+                                    headers={"Retry-After": str(container.ingest_queue.retry_after())})
+            waiter = asyncio.shield(future) if future is not None else None
+            data["queue_depth"] = container.ingest_queue.depth
+        if waiter is not None:
+            try:
+                data["applied"] = await asyncio.wait_for(waiter, INGEST_ACK_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                raise HTTPException(status_code=504, detail="측정값 반영 대기 시간이 초과되었습니다 (큐에는 저장됨)")
+            response.status_code = 200
+        
         return {
             "success": True,
-            "data": stats,
+            "data": data,
             "timestamp": datetime.now().isoformat()
         }
+    except HTTPException:
+        raise
+    except UnsupportedMediaTypeError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except IngestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -61,10 +234,8 @@ async def get_battery_statistics():
 async def get_battery_detail(battery_id: int):
     """특정 배터리 상세 정보 조회"""
     try:
-        data = battery_service.generate_simulated_data()
-        
         # 특정 배터리 찾기
-        battery = next((b for b in data["batteries"] if b["id"] == battery_id), None)
+        battery = (await container.current_async(prediction=False)).find_battery(battery_id)
         
         if not battery:
             raise HTTPException(status_code=404, detail="배터리를 찾을 수 없습니다")
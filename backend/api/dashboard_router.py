@@ -1,87 +1,131 @@
 """
 대시보드 API 라우터
 """
-from fastapi import APIRouter, HTTPException
-from datetime import datetime, timedelta
-import random
-from typing import List, Dict
+from fastapi import APIRouter, HTTPException, Query, Request
+from datetime import datetime
+from typing import Callable, List, Dict
+import numpy as np
 
-from services.battery_service import BatteryService
-from services.ai_service import AIService
+from services.container import container
+from services.http_cache import cached_response
+from services.rollup_store import ROLLUP_RESOLUTIONS
+from services.serialization import FORMAT_COLUMNAR, FORMAT_PATTERN, FORMAT_RECORDS, FastJSONResponse, epoch_millis
+
+# 차트 조회 범위 상한 (명목 롤업 보관 기간 - 배터리 수에 따라 줄어든 실제 보관 기간은 요청 시 확인)
+_ROLLUP_CAPACITY = {name: capacity for name, _, capacity in ROLLUP_RESOLUTIONS}
+MAX_CHART_HOURS = _ROLLUP_CAPACITY["hour"]
+MAX_CHART_DAYS = _ROLLUP_CAPACITY["day"]
+
+# 일일 발전량 목표 (kWh)
+ENERGY_TARGET = 169.10
 
 router = APIRouter()
-battery_service = BatteryService()
-ai_service = AIService()
+
+
+async def _read_rollup(resolution: str, points: int, unit: str, read: Callable):
+    """롤업 조회 (컨테이너 락 안에서) - 현재 보관 버킷 수를 넘는 범위는 잘라 응답하지 않고 400"""
+    def locked():
+        rollups = container.battery_service.rollups
+        capacity = rollups.capacity(resolution)
+        if points > capacity:
+            raise HTTPException(
+                status_code=400,
+                detail=f"현재 플릿 규모에서 조회 가능한 범위는 최대 {capacity}{unit}입니다"
+            )
+        return read(rollups)
+    return await container.read_locked(locked)
 
 
 @router.get("/overview")
-async def get_dashboard_overview():
-    """대시보드 개요 조회"""
+async def get_dashboard_overview(request: Request):
+    """대시보드 개요 조회 (스냅샷 버전별 캐시, ETag / 304 지원)"""
     try:
-        # 배터리 데이터
-        battery_data = battery_service.generate_simulated_data()
-        
-        # AI 예측
-        prediction = ai_service.predict_battery_health(battery_data)
-        
-        # 개요 데이터 구성
-        overview = {
-            # 전체 통계
-            "total_batteries": len(battery_data.get("batteries", [])),
-            "normal_count": sum(1 for b in battery_data.get("batteries", []) if b["status"] == "정상"),
-            "warning_count": sum(1 for b in battery_data.get("batteries", []) if b["status"] == "점검중"),
-            "error_count": sum(1 for b in battery_data.get("batteries", []) if b["status"] == "고장"),
-            
-            # 배터리 상태
-            "batteries": battery_data.get("batteries", []),
-            
-            # AI 예측 결과
-            "predictions": prediction.get("battery_predictions", []),
-            "system_prediction": prediction.get("system_prediction", {}),
-            
-            # 전체 통계
-            "total_stats": battery_data.get("total_stats", {}),
-            
-            # 알림
-            "alerts": battery_data.get("alerts", []),
-            
-            # 환경 정보
-            "environment": battery_data.get("environment", {}),
-        }
-        
-        return {
+        # 현재 틱의 배터리 데이터 및 AI 예측 (공유 캐시)
+        snapshot = await container.current_async()
+        return cached_response(request, snapshot, "dashboard:overview", lambda: {
             "success": True,
-            "data": overview,
+            "data": _build_overview(snapshot),
             "timestamp": datetime.now().isoformat()
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _build_overview(snapshot) -> Dict:
+    """스냅샷 → 대시보드 개요 데이터"""
+    battery_data = snapshot.battery_data
+    prediction = snapshot.prediction
+    
+    return {
+        # 전체 통계
+        "total_batteries": len(battery_data.get("batteries", [])),
+        "normal_count": sum(1 for b in battery_data.get("batteries", []) if b["status"] == "정상"),
+        "warning_count": sum(1 for b in battery_data.get("batteries", []) if b["status"] == "점검중"),
+        "error_count": sum(1 for b in battery_data.get("batteries", []) if b["status"] == "고장"),
+        
+        # 배터리 상태
+        "batteries": battery_data.get("batteries", []),
+        
+        # AI 예측 결과
+        "predictions": prediction.get("battery_predictions", []),
+        "system_prediction": prediction.get("system_prediction", {}),
+        
+        # 전체 통계
+        "total_stats": battery_data.get("total_stats", {}),
+        
+        # 알림
+        "alerts": battery_data.get("alerts", []),
+        
+        # 환경 정보
+        "environment": battery_data.get("environment", {}),
+    }
+
+
 @router.get("/chart/power-trend")
-async def get_power_trend(hours: int = 24):
-    """전력 추세 차트 데이터"""
+async def get_power_trend(
+    hours: int = Query(24, ge=1, le=MAX_CHART_HOURS, description="조회 시간 범위"),
+    response_format: str = Query(FORMAT_RECORDS, alias="format", pattern=FORMAT_PATTERN,
+                                 description="응답 형식 (records / columnar)")
+):
+    """전력 추세 차트 데이터 (시간 단위 롤업)"""
     try:
-        # 시간별 데이터 생성
-        now = datetime.now()
-        data_points = []
-        
-        for i in range(hours):
-            timestamp = (now - timedelta(hours=hours-i-1)).strftime("%Y-%m-%d %H:%M")
-            
-            # 시뮬레이션 데이터
-            data_points.append({
-                "timestamp": timestamp,
-                "power": round(30 + random.uniform(-10, 20), 2),
-                "voltage": round(3.7 + random.uniform(-0.3, 0.3), 2),
-                "current": round(1.5 + random.uniform(-0.5, 1.0), 2),
-            })
+        await container.current_async(prediction=False)
+        trend = await _read_rollup("hour", hours, "시간", lambda rollups: rollups.aggregate(
+            "hour", ("power_current", "voltage", "current"), hours
+        ))
         
-        return {
+        if response_format == FORMAT_COLUMNAR:
+            data = {
+                "timestamps": epoch_millis(trend["timestamp"]),
+                "values": {
+                    "power": trend["power_current_mean"].round(2).tolist(),
+                    "voltage": trend["voltage_mean"].round(2).tolist(),
+                    "current": trend["current_mean"].round(2).tolist(),
+                },
+            }
+        else:
+            data = [
+                {
+                    "timestamp": datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M"),
+                    "power": round(power, 2),
+                    "voltage": round(voltage, 2),
+                    "current": round(current, 2),
+                }
+                for ts, power, voltage, current in zip(
+                    trend["timestamp"].tolist(),
+                    trend["power_current_mean"].tolist(),
+                    trend["voltage_mean"].tolist(),
+                    trend["current_mean"].tolist(),
+                )
+            ]
+        
+        return FastJSONResponse({
             "success": True,
-            "data": data_points,
+            "data": data,
             "timestamp": datetime.now().isoformat()
-        }
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -90,7 +134,7 @@ async def get_power_trend(hours: int = 24):
 async def get_soc_distribution():
     """SOC 분포 차트 데이터"""
     try:
-        battery_data = battery_service.generate_simulated_data()
+        battery_data = (await container.current_async(prediction=False)).battery_data
         
         soc_data = [
             {
@@ -112,62 +156,93 @@ async def get_soc_distribution():
 
 
 @router.get("/chart/temperature-history")
-async def get_temperature_history(hours: int = 12):
-    """온도 이력 차트 데이터"""
+async def get_temperature_history(
+    hours: int = Query(12, ge=1, le=MAX_CHART_HOURS, description="조회 시간 범위"),
+    response_format: str = Query(FORMAT_RECORDS, alias="format", pattern=FORMAT_PATTERN,
+                                 description="응답 형식 (records / columnar)")
+):
+    """온도 이력 차트 데이터 (시간 단위 롤업)"""
     try:
-        now = datetime.now()
-        batteries = battery_service.generate_simulated_data().get("batteries", [])
-        
-        # 각 배터리별 온도 이력
-        data = {}
-        for battery in batteries:
-            battery_history = []
-            base_temp = 25.0
-            
-            for i in range(hours):
-                timestamp = (now - timedelta(hours=hours-i-1)).strftime("%Y-%m-%d %H:%M")
-                temp = base_temp + random.uniform(-5, 15)
-                
-                battery_history.append({
-                    "timestamp": timestamp,
-                    "temperature": round(temp, 1)
-                })
-            
-            data[f"battery_{battery['id']}"] = {
-                "name": battery["name"],
-                "history": battery_history
+        batteries = (await container.current_async(prediction=False)).battery_data.get("batteries", [])
+        history = await _read_rollup("hour", hours, "시간", lambda rollups: rollups.aggregate(
+            "hour", ("temperature",), hours, per_battery=True
+        ))
+        
+        # 각 배터리별 온도 이력 (버킷 × 배터리 → 배터리 × 버킷)
+        temperatures = history["temperature_mean"].T.round(1)
+        counts = history["count"].T
+        
+        if response_format == FORMAT_COLUMNAR:
+            # 배터리 × 버킷 배열, 측정값이 없는 버킷은 null
+            batteries = batteries[:len(temperatures)]
+            data = {
+                "timestamps": epoch_millis(history["timestamp"]),
+                "battery_ids": [battery["id"] for battery in batteries],
+                "names": [battery["name"] for battery in batteries],
+                "values": {
+                    "temperature": np.where(counts > 0, temperatures, None)[:len(batteries)].tolist(),
+                },
             }
+        else:
+            timestamps = [datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M") for ts in history["timestamp"].tolist()]
+            data = {}
+            for battery, battery_temps, battery_counts in zip(batteries, temperatures.tolist(), counts.tolist()):
+                data[f"battery_{battery['id']}"] = {
+                    "name": battery["name"],
+                    "history": [
+                        {"timestamp": timestamp, "temperature": temp}
+                        for timestamp, temp, count in zip(timestamps, battery_temps, battery_counts)
+                        if count
+                    ]
+                }
         
-        return {
+        return FastJSONResponse({
             "success": True,
             "data": data,
             "timestamp": datetime.now().isoformat()
-        }
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/chart/energy-production")
-async def get_energy_production(days: int = 20):
-    """에너지 생산량 차트 데이터"""
+async def get_energy_production(
+    days: int = Query(20, ge=1, le=MAX_CHART_DAYS, description="조회 일수"),
+    response_format: str = Query(FORMAT_RECORDS, alias="format", pattern=FORMAT_PATTERN,
+                                 description="응답 형식 (records / columnar)")
+):
+    """에너지 생산량 차트 데이터 (일 단위 롤업 - 배터리별 일 최대 발전량의 평균)"""
     try:
-        now = datetime.now()
-        data_points = []
-        
-        for i in range(days):
-            date = (now - timedelta(days=days-i-1)).strftime("%m/%d")
-            
-            data_points.append({
-                "date": date,
-                "energy": round(150 + random.uniform(-30, 50), 2),
-                "target": 169.10
-            })
+        await container.current_async(prediction=False)
+        production = await _read_rollup("day", days, "일", lambda rollups: rollups.per_battery_max_mean(
+            "day", "energy_today", days
+        ))
         
-        return {
+        if response_format == FORMAT_COLUMNAR:
+            data = {
+                "timestamps": epoch_millis(production["timestamp"]),
+                "values": {"energy": production["value"].round(2).tolist()},
+                "target": ENERGY_TARGET,
+            }
+        else:
+            data = [
+                {
+                    "date": datetime.fromtimestamp(ts).strftime("%m/%d"),
+                    "energy": round(energy, 2),
+                    "target": ENERGY_TARGET
+                }
+                for ts, energy in zip(production["timestamp"].tolist(), production["value"].tolist())
+            ]
+        
+        return FastJSONResponse({
             "success": True,
-            "data": data_points,
+            "data": data,
             "timestamp": datetime.now().isoformat()
-        }
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -176,7 +251,7 @@ async def get_energy_production(days: int = 20):
 async def get_alerts(limit: int = 10):
     """알림 목록 조회"""
     try:
-        battery_data = battery_service.generate_simulated_data()
+        battery_data = (await container.current_async(prediction=False)).battery_data
         alerts = battery_data.get("alerts", [])[:limit]
         
         return {
@@ -189,13 +264,35 @@ async def get_alerts(limit: int = 10):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/alerts/events")
+async def get_alert_events(
+    since: int = Query(0, ge=0, description="이 sequence 이후의 이벤트만 조회 (이전 응답의 sequence)"),
+    limit: int = Query(100, ge=1, le=1000, description="조회 개수")
+):
+    """알림 발생/해제 이벤트 조회 (상태가 바뀐 경우만 기록)"""
+    try:
+        await container.current_async(prediction=False)
+        engine = container.battery_service.alert_engine
+        events = engine.events_since(since, limit)
+        
+        return {
+            "success": True,
+            "data": events,
+            "count": len(events),
+            # 다음 조회의 since 값
+            "sequence": events[-1]["sequence"] if events else engine.sequence,
+            "timestamp": datetime.now().isoformat()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/maintenance/schedule")
 async def get_maintenance_schedule():
     """유지보수 일정 조회"""
     try:
         # AI 예측을 기반으로 유지보수 일정 생성
-        battery_data = battery_service.generate_simulated_data()
-        prediction = ai_service.predict_battery_health(battery_data)
+        prediction = (await container.current_async()).prediction
         
         schedule = []
         for pred in prediction.get("battery_predictions", []):
@@ -0,0 +1,3 @@
+"""
+벤치마크 모듈
+"""
@@ -0,0 +1,138 @@
+"""
+벤치마크 하네스 - 반복 측정, 통계 요약, 결과 저장 및 기준선 비교
+"""
+import json
+import os
+import platform
+import statistics
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+
+# 기준선 대비 중앙값이 이 비율 이상 느려지면 회귀로 판정
+DEFAULT_REGRESSION_THRESHOLD = 0.20
+
+
+def summarize(samples: List[float]) -> Dict:
+    """측정값(초) 목록 → 요약 통계 (밀리초)"""
+    ms = np.asarray(samples) * 1000
+    median = float(np.median(ms))
+    return {
+        "samples": len(samples),
+        "mean_ms": round(float(ms.mean()), 4),
+        "median_ms": round(median, 4),
+        "p95_ms": round(float(np.percentile(ms, 95)), 4),
+        "min_ms": round(float(ms.min()), 4),
+        "max_ms": round(float(ms.max()), 4),
+        "stdev_ms": round(statistics.pstdev(ms.tolist()), 4),
+        "ops_per_sec": round(1000 / median, 2) if median > 0 else None,
+    }
+
+
+def measure(name: str, fn: Callable[[], object], repeat: int, warmup: int = 1,
+            params: Optional[Dict] = None, setup: Optional[Callable[[], object]] = None) -> Dict:
+    """동기 함수 반복 측정 (setup은 매 반복 전에 실행되며 측정에서 제외)"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {"name": name, "params": params or {}, **summarize(samples)}
+
+
+async def measure_async(name: str, fn: Callable[[], Awaitable[object]], repeat: int, warmup: int = 1,
+                        params: Optional[Dict] = None, setup: Optional[Callable[[], object]] = None) -> Dict:
+    """비동기 함수 반복 측정 (setup은 매 반복 전에 실행되며 측정에서 제외)"""
+    for _ in range(warmup):
+        await fn()
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return {"name": name, "params": params or {}, **summarize(samples)}
+
+
+def environment() -> Dict:
+    """측정 환경 정보 (기준선 비교 시 환경 차이 확인용)"""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+    }
+
+
+def build_report(results: List[Dict]) -> Dict:
+    return {
+        "created_at": datetime.now().isoformat(),
+        "environment": environment(),
+        "results": results,
+    }
+
+
+def save_report(report: Dict, path: str):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def load_report(path: str) -> Dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(report: Dict, baseline: Dict, threshold: float = DEFAULT_REGRESSION_THRESHOLD) -> List[Dict]:
+    """기준선 대비 중앙값 변화율 - status: regression / improvement / ok / new"""
+    previous = {r["name"]: r for r in baseline.get("results", [])}
+    rows = []
+    for result in report["results"]:
+        base = previous.get(result["name"])
+        if base is None or not base.get("median_ms"):
+            rows.append({"name": result["name"], "median_ms": result["median_ms"], "status": "new"})
+            continue
+        change = result["median_ms"] / base["median_ms"] - 1
+        if change > threshold:
+            status = "regression"
+        elif change < -threshold:
+            status = "improvement"
+        else:
+            status = "ok"
+        rows.append({
+            "name": result["name"],
+            "baseline_median_ms": base["median_ms"],
+            "median_ms": result["median_ms"],
+            "change": round(change, 4),
+            "status": status,
+        })
+    return rows
+
+
+def format_results(results: List[Dict]) -> str:
+    lines = [f"{'name':<80} {'median':>11} {'p95':>11} {'ops/s':>11}"]
+    for r in results:
+        lines.append(f"{r['name']:<80} {r['median_ms']:>9.3f}ms {r['p95_ms']:>9.3f}ms {r['ops_per_sec'] or 0:>11.1f}")
+    return "\n".join(lines)
+
+
+def format_comparison(rows: List[Dict]) -> str:
+    lines = [f"{'name':<80} {'baseline':>11} {'current':>11} {'change':>8}  status"]
+    for r in rows:
+        if r["status"] == "new":
+            lines.append(f"{r['name']:<80} {'-':>11} {r['median_ms']:>9.3f}ms {'-':>8}  new")
+        else:
+            lines.append(f"{r['name']:<80} {r['baseline_median_ms']:>9.3f}ms {r['median_ms']:>9.3f}ms "
+                         f"{r['change']:>+7.1%}  {r['status']}")
+    return "\n".join(lines)
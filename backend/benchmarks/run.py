@@ -0,0 +1,97 @@
+"""
+벤치마크 실행기
+
+사용법 (backend 디렉터리에서):
+    python -m benchmarks.run                                  # 전체 실행, 결과 저장
+    python -m benchmarks.run --suite simulation inference     # 일부 스위트만
+    python -m benchmarks.run --baseline benchmarks/results/baseline.json   # 기준선 비교
+
+기준선 대비 중앙값이 --threshold 이상 느려진 항목이 있으면 종료 코드 1을 반환한다.
+"""
+import argparse
+import asyncio
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+# 벤치마크 중에는 영구 저장소에 쓰지 않음 (디스크 I/O가 측정을 흔들지 않도록)
+os.environ.setdefault("TELEMETRY_PERSISTENCE", "0")
+
+# 학습 엔드포인트가 만드는 모델 버전은 임시 디렉터리에 저장 (작업 트리의 학습 결과를 늘리거나 활성화하지 않도록)
+if "MODEL_ARTIFACT_DIR" not in os.environ:
+    os.environ["MODEL_ARTIFACT_DIR"] = tempfile.mkdtemp(prefix="benchmark_models_")
+    atexit.register(shutil.rmtree, os.environ["MODEL_ARTIFACT_DIR"], ignore_errors=True)
+
+from benchmarks import suites  # noqa: E402
+from benchmarks.harness import (  # noqa: E402
+    DEFAULT_REGRESSION_THRESHOLD, build_report, compare, format_comparison, format_results,
+    load_report, save_report,
+)
+
+
+SUITES = ("simulation", "inference", "endpoints", "websocket")
+DEFAULT_OUTPUT = os.path.join("benchmarks", "results", "latest.json")
+
+
+def _int_list(value: str):
+    return [int(v) for v in value.split(",") if v]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="배터리진단 AI 시스템 벤치마크")
+    parser.add_argument("--suite", nargs="+", choices=SUITES, default=list(SUITES), help="실행할 스위트")
+    parser.add_argument("--sizes", type=_int_list, default=[3, 1000, 10000, 100000],
+                        help="시뮬레이션/추론 배터리 수 (쉼표 구분)")
+    parser.add_argument("--endpoint-batteries", type=int, default=3, help="엔드포인트 벤치마크 플릿 크기")
+    parser.add_argument("--cold", action="store_true", help="엔드포인트 요청마다 스냅샷 새로 생성")
+    parser.add_argument("--clients", type=_int_list, default=[1, 100, 1000], help="WebSocket 클라이언트 수")
+    parser.add_argument("--protocols", nargs="+", choices=("json", "delta"), default=["json", "delta"],
+                        help="WebSocket 프로토콜")
+    parser.add_argument("--repeat", type=int, default=20, help="측정 반복 횟수")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="결과 JSON 경로")
+    parser.add_argument("--baseline", help="비교할 기준선 결과 JSON")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                        help="회귀 판정 기준 (중앙값 증가율, 기본 0.2 = 20%%)")
+    return parser.parse_args(argv)
+
+
+async def run(args) -> list:
+    results = []
+    if "simulation" in args.suite:
+        results += suites.run_simulation(args.sizes, args.repeat)
+    if "inference" in args.suite:
+        results += suites.run_inference(args.sizes, args.repeat)
+    if "endpoints" in args.suite:
+        from main import app
+        missing = suites.uncovered_routes(app)
+        if missing:
+            print(f"경고: 벤치마크에 없는 라우트 - {', '.join(missing)}", file=sys.stderr)
+        results += await suites.run_endpoints(args.endpoint_batteries, args.repeat, args.cold)
+    if "websocket" in args.suite:
+        results += await suites.run_websocket(args.clients, args.repeat, args.protocols)
+    return results
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    report = build_report(asyncio.run(run(args)))
+    save_report(report, args.output)
+    print(format_results(report["results"]))
+    print(f"\n결과 저장: {args.output}")
+
+    if not args.baseline:
+        return 0
+    rows = compare(report, load_report(args.baseline), args.threshold)
+    print()
+    print(format_comparison(rows))
+    regressions = [r for r in rows if r["status"] == "regression"]
+    if regressions:
+        print(f"\n성능 회귀 {len(regressions)}건 (기준: 중앙값 +{args.threshold:.0%})", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
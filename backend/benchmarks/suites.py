@@ -0,0 +1,198 @@
+"""
+벤치마크 스위트 - 시뮬레이션, AI 추론, HTTP 엔드포인트, WebSocket 팬아웃
+"""
+import asyncio
+from typing import Dict, List, Sequence
+
+from benchmarks.harness import measure, measure_async
+
+
+# 엔드포인트 벤치마크 대상 (메서드, 요청 경로, 라우트 템플릿)
+ENDPOINT_CASES = (
+    ("GET", "/api/battery/status", "/api/battery/status"),
+    ("GET", "/api/battery/history?limit=50", "/api/battery/history"),
+    ("GET", "/api/battery/history?battery_id=1&limit=1000", "/api/battery/history"),
+    ("GET", "/api/battery/history?limit=50&format=columnar", "/api/battery/history"),
+    ("GET", "/api/battery/history?battery_id=1&limit=1000&format=columnar", "/api/battery/history"),
+    ("GET", "/api/battery/history/export?format=csv", "/api/battery/history/export"),
+    ("GET", "/api/battery/history/export?format=ndjson", "/api/battery/history/export"),
+    ("GET", "/api/battery/statistics", "/api/battery/statistics"),
+    ("GET", "/api/battery/statistics?window=1m", "/api/battery/statistics"),
+    ("GET", "/api/battery/statistics?battery_id=1", "/api/battery/statistics"),
+    ("GET", "/api/battery/1", "/api/battery/{battery_id}"),
+    ("GET", "/api/ai/predict", "/api/ai/predict"),
+    ("GET", "/api/ai/predict/1", "/api/ai/predict/{battery_id}"),
+    ("GET", "/api/ai/drift?limit=20", "/api/ai/drift"),
+    ("GET", "/api/ai/model/info", "/api/ai/model/info"),
+    ("GET", "/api/ai/model/versions", "/api/ai/model/versions"),
+    ("POST", "/api/ai/model/versions/builtin/activate", "/api/ai/model/versions/{version}/activate"),
+    ("POST", "/api/ai/train", "/api/ai/train"),
+    ("GET", "/api/ai/train/jobs", "/api/ai/train/jobs"),
+    ("GET", "/api/ai/train/jobs/unknown", "/api/ai/train/jobs/{job_id}"),
+    ("POST", "/api/ai/evaluate", "/api/ai/evaluate"),
+    ("GET", "/api/dashboard/overview", "/api/dashboard/overview"),
+    ("GET", "/api/dashboard/chart/power-trend?hours=24", "/api/dashboard/chart/power-trend"),
+    ("GET", "/api/dashboard/chart/soc-distribution", "/api/dashboard/chart/soc-distribution"),
+    ("GET", "/api/dashboard/chart/temperature-history?hours=12", "/api/dashboard/chart/temperature-history"),
+    ("GET", "/api/dashboard/chart/temperature-history?hours=12&format=columnar",
+     "/api/dashboard/chart/temperature-history"),
+    ("GET", "/api/dashboard/chart/energy-production?days=20", "/api/dashboard/chart/energy-production"),
+    ("GET", "/api/dashboard/alerts?limit=10", "/api/dashboard/alerts"),
+    ("GET", "/api/dashboard/alerts/events?since=0&limit=100", "/api/dashboard/alerts/events"),
+    ("GET", "/api/dashboard/maintenance/schedule", "/api/dashboard/maintenance/schedule"),
+    # 수신 데이터 모드로 전환되므로 마지막에 측정 (run_endpoints가 시뮬레이터 모드로 되돌림)
+    ("POST", "/api/battery/ingest", "/api/battery/ingest"),
+)
+
+# 벤치마크 대상 라우터 접두사
+ENDPOINT_PREFIXES = ("/api/battery", "/api/ai", "/api/dashboard")
+
+
+def run_simulation(sizes: Sequence[int], repeat: int) -> List[Dict]:
+    """BatteryService.generate_simulated_data - 배터리 수별"""
+    from services.battery_service import BatteryService
+
+    results = []
+    for n in sizes:
+        service = BatteryService(battery_count=n, seed=0)
+        results.append(measure(f"simulation.generate_simulated_data[batteries={n}]",
+                               service.generate_simulated_data, repeat, params={"batteries": n}))
+    return results
+
+
+def run_inference(sizes: Sequence[int], repeat: int) -> List[Dict]:
+    """AIService.predict_battery_health - 배터리 수별"""
+    from services.ai_service import AIService
+    from services.battery_service import BatteryService
+
+    ai_service = AIService()
+    results = []
+    for n in sizes:
+        battery_data = BatteryService(battery_count=n, seed=0).generate_simulated_data()
+        results.append(measure(f"inference.predict_battery_health[batteries={n}]",
+                               lambda: ai_service.predict_battery_health(battery_data), repeat,
+                               params={"batteries": n}))
+    return results
+
+
+def uncovered_routes(app) -> List[str]:
+    """ENDPOINT_CASES에 없는 API 라우트 (라우트 추가 시 벤치마크 누락 확인용)"""
+    covered = {(method, route) for method, _, route in ENDPOINT_CASES}
+    missing = []
+    for route in app.routes:
+        path = getattr(route, "path", "")
+        if not path.startswith(ENDPOINT_PREFIXES):
+            continue
+        for method in sorted(getattr(route, "methods", None) or ()):
+            if method != "HEAD" and (method, path) not in covered:
+                missing.append(f"{method} {path}")
+    return missing
+
+
+async def run_endpoints(battery_count: int, repeat: int, cold: bool = False) -> List[Dict]:
+    """API 엔드포인트 - 프로세스 내 ASGI 클라이언트로 요청
+
+    기본은 스냅샷 캐시가 유효한 상태(틱 내 반복 요청)를 측정하고,
+    cold=True 이면 매 요청 전에 스냅샷을 새로 만들어 틱의 첫 요청 비용을 측정한다.
+    """
+    import httpx
+    from main import app
+    from services.container import container
+
+    container.battery_service.battery_count = battery_count
+    container.refresh()
+    sample = container.current().battery_data["batteries"][:10]
+    setup = container.refresh if cold else None
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for method, url, _ in ENDPOINT_CASES:
+            body = sample if method == "POST" else None
+
+            async def request(method=method, url=url, body=body):
+                response = await client.request(method, url, json=body)
+                # 없는 리소스 조회(404)도 측정 대상 - 서버 오류만 실패 처리
+                if response.status_code >= 500:
+                    response.raise_for_status()
+
+            mode = "cold" if cold else "warm"
+            results.append(await measure_async(
+                f"endpoint.{method} {url}[batteries={battery_count},{mode}]", request, repeat,
+                params={"batteries": battery_count, "mode": mode}, setup=setup,
+            ))
+    # 수집 API 측정으로 생긴 수신 플릿 상태 제거 (이후 스위트는 시뮬레이터 데이터 사용)
+    container.battery_service.live_state = None
+    return results
+
+
+class _FanoutProbe:
+    """한 라운드의 전송 완료 감지 (모든 클라이언트가 프레임을 받으면 done)"""
+
+    def __init__(self):
+        self.pending = 0
+        self.done = asyncio.Event()
+
+    def arm(self, clients: int):
+        self.pending = clients
+        self.done.clear()
+
+    def received(self):
+        self.pending -= 1
+        if self.pending == 0:
+            self.done.set()
+
+
+class _BenchmarkSocket:
+    """메모리 내 WebSocket (프레임 수신만 기록)"""
+
+    def __init__(self, probe: _FanoutProbe):
+        self.probe = probe
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, payload):
+        self.probe.received()
+
+    async def send_bytes(self, payload):
+        self.probe.received()
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+async def run_websocket(client_counts: Sequence[int], repeat: int, protocols: Sequence[str]) -> List[Dict]:
+    """/ws/battery-data 팬아웃 - 스냅샷 갱신부터 모든 클라이언트 전송 완료까지
+
+    실제 소켓 대신 메모리 내 소켓을 ConnectionManager에 연결하므로
+    네트워크 I/O를 제외한 서버 측 팬아웃 비용(갱신, 인코딩, 큐잉, 송신 태스크)을 측정한다.
+    """
+    import main
+
+    loop = asyncio.get_running_loop()
+    results = []
+    for protocol in protocols:
+        for clients in client_counts:
+            probe = _FanoutProbe()
+            subscribers = [await main.manager.connect(_BenchmarkSocket(probe), protocol) for _ in range(clients)]
+
+            async def fanout():
+                probe.arm(clients)
+                for group in main.manager.groups.values():
+                    group.next_due = 0.0
+                # 플릿 틱 하나 (스냅샷 갱신 + AI 예측) 후 모든 그룹에 전송
+                snapshot = await main.container.refresh_async()
+                now = loop.time()
+                await main.publish_due_groups(snapshot, now, now)
+                await probe.done.wait()
+
+            try:
+                results.append(await measure_async(
+                    f"websocket.fanout[protocol={protocol},clients={clients}]", fanout, repeat,
+                    params={"protocol": protocol, "clients": clients},
+                ))
+            finally:
+                for subscriber in subscribers:
+                    main.manager.disconnect(subscriber)
+    return results
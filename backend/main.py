@@ -1,24 +1,79 @@
 """
 배터리진단 AI 시스템 - 메인 애플리케이션
 """
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Response, WebSocket, WebSocketDisconnect, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from contextlib import asynccontextmanager, suppress
 import uvicorn
 from datetime import datetime
 import asyncio
+import math
+import os
 import random
 import json
+from collections import deque
+from typing import Callable, Optional
 
 from api import battery_router, ai_router, dashboard_router
-from services.battery_service import BatteryService
-from services.ai_service import AIService
+from services.container import container
+from services.http_cache import SNAPSHOT_VERSION_HEADER
+from services.shared_state import SHARED_STATE_TICK_SECONDS
+from services.metrics import (
+    BROADCAST_LATENCY, WS_CONNECTIONS, WS_DROPPED_FRAMES, WS_EVICTIONS, WS_FRAME_BYTES, WS_FRAMES_SENT,
+    MetricsMiddleware, metrics_payload, track_history,
+)
+from services.subscriptions import DEFAULT_RATE_HZ, DEFAULT_SUBSCRIPTION, Subscription
+from services.telemetry_codec import (
+    DELTA_SUBPROTOCOL, PROTOCOL_JSON, TelemetryFrames, encode_message, negotiate_protocol,
+)
+
+# WebSocket 송신 큐 크기 / 전송 시간 제한 / 연속으로 버릴 수 있는 프레임 수
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "8"))
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "5.0"))
+WS_MAX_DROPPED_FRAMES = int(os.getenv("WS_MAX_DROPPED_FRAMES", "30"))
+# 송신 큐에 쌓일 수 있는 제어 메시지 수 (넘으면 응답을 읽지 않는 클라이언트로 보고 연결을 끊음)
+WS_MAX_CONTROL_MESSAGES = int(os.getenv("WS_MAX_CONTROL_MESSAGES", "32"))
+
+# 플릿 틱 주기 (Hz) - 구독자 수나 접속 시각과 무관하게 고정 격자로 스냅샷 갱신 (멀티 워커 모드는 공유 상태 틱)
+TELEMETRY_TICK_HZ = float(os.getenv("TELEMETRY_TICK_HZ", str(DEFAULT_RATE_HZ)))
+
+
+def next_grid_time(now: float, origin: float, interval: float) -> float:
+    """origin 기준 interval 격자에서 now 다음 시각"""
+    return origin + (math.floor((now - origin) / interval + 1e-6) + 1) * interval
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """앱 수명주기 - 영구 저장소 연결, 모델 로드/워밍업, 공유 텔레메트리 프로듀서 시작/종료"""
+    container.start()
+    try:
+        version = await container.inference.run(container.ai_service.load_default_model)
+        print(f"AI model version: {version}")
+    except Exception as e:
+        # 손상된 학습 결과 등 - 기본 모델로 계속 실행
+        print(f"AI model load error: {e}")
+    tasks = [asyncio.create_task(telemetry_producer())]
+    if container.shared is not None:
+        tasks.append(asyncio.create_task(shared_state_ticker()))
+        tasks.append(asyncio.create_task(shared_ingest_pump()))
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        container.close()
+
 
 # FastAPI 앱 초기화
 app = FastAPI(
     title="배터리진단 AI 시스템",
     description="AI 기반 배터리 상태 진단 및 수명 예측 시스템",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS 설정
@@ -28,11 +83,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # 조건부 요청 (If-None-Match) 에 쓰는 캐시 헤더를 브라우저 스크립트에서 읽을 수 있도록
+    expose_headers=["ETag", SNAPSHOT_VERSION_HEADER],
 )
 
-# 서비스 초기화
-battery_service = BatteryService()
-ai_service = AIService()
+# 엔드포인트별 지연 시간 측정
+app.add_middleware(MetricsMiddleware)
+
+# 서비스 초기화 (라우터와 공유하는 프로세스 전역 인스턴스)
+battery_service = container.battery_service
+ai_service = container.ai_service
+track_history(battery_service.history)
 
 # 라우터 등록
 app.include_router(battery_router.router, prefix="/api/battery", tags=["Battery"])
@@ -53,69 +114,404 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """헬스 체크 엔드포인트"""
+    """헬스 체크 엔드포인트 (멀티 워커 모드에서는 이 워커의 역할 포함)"""
     return {
         "status": "healthy",
+        **({"worker": container.shared.info()} if container.shared is not None else {}),
         "timestamp": datetime.now().isoformat()
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus 메트릭 엔드포인트"""
+    body, content_type = metrics_payload()
+    return Response(content=body, headers={"Content-Type": content_type})
+
+
+class Subscriber:
+    """WebSocket 구독자
+    
+    전송은 구독자별 송신 태스크가 담당한다. 브로드캐스트는 제한된 크기의 송신 큐에
+    넣기만 하므로 느린 클라이언트가 다른 클라이언트를 지연시키지 않는다.
+    - 큐가 가득 차면 가장 오래된 텔레메트리 프레임을 버림 (최신 값 우선, 제어 메시지는 유지)
+    - 버린 프레임이 쌓이거나, 제어 메시지가 한도를 넘거나, 전송이 시간 초과/실패하면 연결을 끊음
+    - 델타 기준 프레임을 놓친 경우 다음 전송은 자동으로 키프레임이 됨
+    """
+    
+    def __init__(self, websocket: WebSocket, protocol: str = PROTOCOL_JSON):
+        self.websocket = websocket
+        self.protocol = protocol
+        self.subscription = DEFAULT_SUBSCRIPTION
+        self.group: Optional["SubscriptionGroup"] = None
+        # 마지막으로 받은 프레임 (그룹, 번호) - 델타 전송 가능 여부 판단
+        self.last_group: Optional["SubscriptionGroup"] = None
+        self.last_seq: Optional[int] = None
+        self.outbox: deque = deque()
+        self.dropped_frames = 0
+        # 송신 큐에 있는 제어 메시지 수
+        self.control_messages = 0
+        self.closed = False
+        self._wakeup = asyncio.Event()
+        self._sender: Optional[asyncio.Task] = None
+
+    def start(self, on_failure: Callable[["Subscriber"], None]):
+        self._sender = asyncio.create_task(self._send_loop(on_failure))
+
+    def stop(self):
+        """송신 태스크 종료 (송신 태스크 자신에서 호출된 경우는 루프가 스스로 끝남)"""
+        self.closed = True
+        self.outbox.clear()
+        self.control_messages = 0
+        self._wakeup.set()
+        if self._sender is not None and self._sender is not asyncio.current_task():
+            self._sender.cancel()
+
+    def enqueue_frames(self, group: "SubscriptionGroup", frames: TelemetryFrames) -> bool:
+        """텔레메트리 프레임 큐잉 - 연속으로 버린 프레임이 한도를 넘으면 False"""
+        if len(self.outbox) >= WS_SEND_QUEUE_SIZE:
+            for item in self.outbox:
+                if item[0] is not None:
+                    self.outbox.remove(item)
+                    self.dropped_frames += 1
+                    WS_DROPPED_FRAMES.inc()
+                    break
+        self.outbox.append((group, frames))
+        self._wakeup.set()
+        return self.dropped_frames <= WS_MAX_DROPPED_FRAMES
+
+    def enqueue_message(self, payload: str) -> bool:
+        """제어 메시지 큐잉 (버리지 않음) - 쌓인 제어 메시지가 한도를 넘으면 큐잉하지 않고 False"""
+        if self.control_messages >= WS_MAX_CONTROL_MESSAGES:
+            return False
+        self.outbox.append((None, payload))
+        self.control_messages += 1
+        self._wakeup.set()
+        return True
+
+    def forget_frames(self):
+        """구독 변경 시 이전 그룹의 프레임과 델타 기준 폐기"""
+        self.outbox = deque(item for item in self.outbox if item[0] is None)
+        self.last_group = None
+        self.last_seq = None
+
+    async def _send_loop(self, on_failure: Callable[["Subscriber"], None]):
+        try:
+            while not self.closed:
+                if not self.outbox:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                group, item = self.outbox.popleft()
+                if group is None:
+                    self.control_messages -= 1
+                    payload, kind = item, "control"
+                    size = len(payload.encode("utf-8"))
+                elif group is self.group:
+                    last_seq = self.last_seq if self.last_group is group else None
+                    payload = item.payload_for(self.protocol, last_seq)
+                    kind = "delta" if isinstance(payload, bytes) else self.protocol_frame_kind
+                    size = item.payload_size(payload)
+                else:
+                    # 이전 구독 그룹의 프레임
+                    continue
+                
+                await asyncio.wait_for(self._send(payload), WS_SEND_TIMEOUT_SECONDS)
+                WS_FRAMES_SENT.labels(kind).inc()
+                WS_FRAME_BYTES.labels(kind).observe(size)
+                if group is not None:
+                    self.last_group, self.last_seq = group, item.seq
+                    self.dropped_frames = 0
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # 전송 시간 초과 또는 끊긴 소켓
+            on_failure(self)
+
+    @property
+    def protocol_frame_kind(self) -> str:
+        return "json" if self.protocol == PROTOCOL_JSON else "keyframe"
+
+    async def _send(self, payload):
+        if isinstance(payload, bytes):
+            await self.websocket.send_bytes(payload)
+        else:
+            await self.websocket.send_text(payload)
+
+
+class SubscriptionGroup:
+    """같은 구독 조건을 가진 구독자 묶음 - 프레임을 그룹당 한 번만 인코딩"""
+    
+    def __init__(self, subscription: Subscription):
+        self.subscription = subscription
+        self.members: list[Subscriber] = []
+        self.seq = 0
+        # 그룹의 마지막 프레임 (신규 구독자에게 즉시 전송, 다음 델타의 기준)
+        self.latest_frames: Optional[TelemetryFrames] = None
+        # 다음 전송 시각 (event loop 시간, 0은 즉시 - 새 그룹은 최신 스냅샷으로 바로 첫 프레임)
+        self.next_due = 0.0
+        # 마지막 프레임을 만든 스냅샷 버전 (같은 스냅샷은 다시 보내지 않음)
+        self.snapshot_version: Optional[int] = None
+
+    def schedule(self, now: float, origin: float):
+        """다음 전송 시각 - 구독 주기 격자에 맞춤 (구독 시각과 무관하게 같은 주기의 그룹은 같은 위상)"""
+        self.next_due = next_grid_time(now, origin, self.subscription.interval)
+
+    def build_frames(self, snapshot) -> TelemetryFrames:
+        self.seq += 1
+        self.snapshot_version = snapshot.version
+        self.latest_frames = TelemetryFrames(self.seq, snapshot, self.latest_frames,
+                                             subscription=self.subscription)
+        return self.latest_frames
+
+
 class ConnectionManager:
-    """WebSocket 연결 관리자"""
+    """WebSocket 연결 관리자 (구독 조건별 그룹, 구독자별 송신 큐)"""
     
     def __init__(self):
-        self.active_connections: list[WebSocket] = []
+        self.active_connections: list[Subscriber] = []
+        self.groups: dict[tuple, SubscriptionGroup] = {}
+        # 그룹 추가 시 프로듀서를 깨워 바로 전송
+        self.changed = asyncio.Event()
+        self.evicted = 0
+
+    async def connect(self, websocket: WebSocket, protocol: str = PROTOCOL_JSON,
+                      subprotocol: Optional[str] = None) -> Subscriber:
+        await websocket.accept(subprotocol=subprotocol)
+        subscriber = Subscriber(websocket, protocol)
+        self.active_connections.append(subscriber)
+        WS_CONNECTIONS.inc()
+        subscriber.start(self.evict)
+        self._join(subscriber, DEFAULT_SUBSCRIPTION)
+        return subscriber
 
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
+    def disconnect(self, subscriber: Subscriber):
+        if subscriber in self.active_connections:
+            self.active_connections.remove(subscriber)
+            WS_CONNECTIONS.dec()
+            self._leave(subscriber)
+            subscriber.stop()
 
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+    def evict(self, subscriber: Subscriber):
+        """느리거나 끊긴 클라이언트 제거 - 소켓 종료는 백그라운드로 처리"""
+        if subscriber not in self.active_connections:
+            return
+        self.evicted += 1
+        WS_EVICTIONS.inc()
+        self.disconnect(subscriber)
+        asyncio.create_task(self._close(subscriber.websocket))
 
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except:
-                pass
+    @staticmethod
+    async def _close(websocket: WebSocket):
+        with suppress(Exception):
+            await asyncio.wait_for(websocket.close(code=status.WS_1008_POLICY_VIOLATION), WS_SEND_TIMEOUT_SECONDS)
+
+    def subscribe(self, subscriber: Subscriber, subscription: Subscription):
+        """구독 조건 변경 - 다른 그룹으로 옮기고 키프레임부터 다시 수신"""
+        self._leave(subscriber)
+        subscriber.forget_frames()
+        self._join(subscriber, subscription)
+
+    def _join(self, subscriber: Subscriber, subscription: Subscription):
+        subscriber.subscription = subscription
+        group = self.groups.get(subscription.key)
+        if group is None:
+            group = self.groups[subscription.key] = SubscriptionGroup(subscription)
+            self.changed.set()
+        group.members.append(subscriber)
+        subscriber.group = group
+        if group.latest_frames is not None:
+            subscriber.enqueue_frames(group, group.latest_frames)
+
+    def _leave(self, subscriber: Subscriber):
+        group = subscriber.group
+        subscriber.group = None
+        if group is None or subscriber not in group.members:
+            return
+        group.members.remove(subscriber)
+        if not group.members and self.groups.get(group.subscription.key) is group:
+            # 구독자가 없는 그룹은 계산을 멈추고 오래된 프레임을 폐기
+            del self.groups[group.subscription.key]
+
+    def due_groups(self, now: float) -> list[SubscriptionGroup]:
+        return [group for group in self.groups.values() if group.next_due <= now]
+
+    def next_due(self) -> Optional[float]:
+        return min((group.next_due for group in self.groups.values()), default=None)
+
+    def broadcast(self, message: dict):
+        """모든 연결에 JSON 메시지 전송 (한 번만 인코딩)"""
+        payload = encode_message(message)
+        for subscriber in list(self.active_connections):
+            if not subscriber.enqueue_message(payload):
+                self.evict(subscriber)
+
+    def broadcast_frames(self, group: SubscriptionGroup, frames: TelemetryFrames):
+        """그룹 프레임 큐잉 - 실제 전송은 구독자별 송신 태스크가 동시에 수행"""
+        for subscriber in list(group.members):
+            if not subscriber.enqueue_frames(group, frames):
+                # 계속 따라오지 못하는 클라이언트
+                self.evict(subscriber)
 
 
 manager = ConnectionManager()
 
 
+async def publish_due_groups(snapshot, now: float, origin: float):
+    """전송 주기가 된 그룹에 최신 스냅샷의 프레임 전송 (이미 보낸 스냅샷이면 건너뜀)
+    
+    프레임 생성은 추론 실행기에서 수행하므로 그동안에도 이벤트 루프는
+    HTTP 요청과 송신 태스크를 처리한다.
+    """
+    due = manager.due_groups(now)
+    for group in due:
+        group.schedule(now, origin)
+    due = [group for group in due if group.snapshot_version != snapshot.version]
+    if not due:
+        return
+    frames = await container.inference.run(lambda: [group.build_frames(snapshot) for group in due])
+    for group, group_frames in zip(due, frames):
+        manager.broadcast_frames(group, group_frames)
+
+
+async def telemetry_producer():
+    """공유 텔레메트리 프로듀서 - 클라이언트 수와 무관하게 틱당 한 번만 계산
+    
+    플릿 틱(TELEMETRY_TICK_HZ)마다 고정 격자로 스냅샷을 한 번 갱신하고, 각 구독 그룹은
+    자신의 주기가 되었을 때 최신 스냅샷을 받는다 (플릿 틱보다 빠른 구독은 새 틱마다 한 번).
+    구독자가 없으면 계산하지 않는다. 멀티 워커 모드에서는 공유 상태 틱이 스냅샷을 갱신하므로
+    최신 스냅샷만 읽는다.
+    """
+    loop = asyncio.get_running_loop()
+    tick = 1.0 / TELEMETRY_TICK_HZ
+    origin = next_tick = loop.time()
+    snapshot = None
+    
+    while True:
+        manager.changed.clear()
+        now = loop.time()
+        try:
+            if manager.groups:
+                with BROADCAST_LATENCY.time():
+                    if container.shared is not None:
+                        snapshot = await container.latest_async()
+                    elif snapshot is None or now >= next_tick:
+                        # 시뮬레이션 데이터 생성 + AI 예측 (실제로는 센서에서 받아옴)
+                        snapshot = await container.refresh_async()
+                    await publish_due_groups(snapshot, now, origin)
+        except Exception as e:
+            print(f"Telemetry producer error: {e}")
+        if now >= next_tick:
+            # 처리 지연으로 놓친 틱은 건너뛰고 격자 위상 유지
+            next_tick = next_grid_time(now, origin, tick)
+        
+        next_due = manager.next_due()
+        if next_due is not None and container.shared is None:
+            next_due = min(next_due, next_tick)
+        timeout = None if next_due is None else max(next_due - loop.time(), 0.0)
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(manager.changed.wait(), timeout)
+
+
+async def shared_state_ticker():
+    """멀티 워커 공유 상태 틱 - 프로듀서 워커는 새 틱을 기록하고, 나머지 워커는 기록된 틱을 반영
+    
+    요청이 어느 워커로 가든 데이터가 흐르도록 요청과 무관하게 주기적으로 갱신한다.
+    프로듀서 워커가 종료되면 다른 워커가 다음 틱에 프로듀서를 이어받는다.
+    """
+    loop = asyncio.get_running_loop()
+    origin = loop.time()
+    while True:
+        try:
+            await container.inference.run(container.refresh)
+        except Exception as e:
+            print(f"Shared state tick error: {e}")
+        # 고정 격자 유지 (틱 처리 시간만큼 주기가 밀리지 않도록)
+        await asyncio.sleep(max(next_grid_time(loop.time(), origin, SHARED_STATE_TICK_SECONDS) - loop.time(), 0.0))
+
+
+async def shared_ingest_pump():
+    """멀티 워커 수집 전달 - 프로듀서 워커는 다른 워커가 전달 큐에 넣은 측정값을 꺼내 수집 큐로 반영
+    
+    반영을 마치면 전달 큐 위치를 기록해 ack=applied 로 기다리는 워커가 응답할 수 있게 한다.
+    """
+    shared = container.shared
+    queue = container.ingest_queue
+    interval = queue.drain_interval or SHARED_STATE_TICK_SECONDS
+    
+    def mark_applied(future: asyncio.Future, position: int):
+        if not future.cancelled() and future.exception() is None:
+            shared.mark_forwarded_applied(position)
+    
+    while True:
+        await asyncio.sleep(interval)
+        if not shared.is_producer:
+            continue
+        try:
+            # 수집 큐에 남은 자리만큼만 꺼냄 (나머지는 전달 큐에서 대기)
+            room = min(queue.max_readings - queue.depth, queue.micro_batch)
+            while room > 0:
+                batch, position = shared.take_forwarded(room)
+                if batch is None:
+                    break
+                future = queue.offer(batch, wait=True)
+                future.add_done_callback(lambda f, position=position: mark_applied(f, position))
+                room -= len(batch)
+        except Exception as e:
+            print(f"Shared ingest pump error: {e}")
+
+
+async def handle_client_message(subscriber: Subscriber, text: str):
+    """클라이언트 메시지 처리 - subscribe / unsubscribe"""
+    try:
+        message = json.loads(text)
+        if not isinstance(message, dict):
+            raise ValueError("메시지는 JSON 객체여야 합니다")
+        message_type = message.get("type")
+        if message_type == "subscribe":
+            subscription = Subscription.from_message(message)
+        elif message_type == "unsubscribe":
+            subscription = DEFAULT_SUBSCRIPTION
+        else:
+            raise ValueError(f"지원하지 않는 메시지 유형: {message_type}")
+    except ValueError as e:
+        if not subscriber.enqueue_message(encode_message({"type": "error", "message": str(e)})):
+            manager.evict(subscriber)
+        return
+    
+    if not subscriber.enqueue_message(encode_message({"type": "subscribed", "subscription": subscription.to_dict()})):
+        # 응답을 읽지 않고 메시지만 보내는 클라이언트
+        manager.evict(subscriber)
+        return
+    manager.subscribe(subscriber, subscription)
+
+
 @app.websocket("/ws/battery-data")
 async def websocket_endpoint(websocket: WebSocket):
-    """실시간 배터리 데이터 WebSocket"""
-    await manager.connect(websocket)
+    """실시간 배터리 데이터 WebSocket (공유 프로듀서 구독)
+    
+    프로토콜 협상: Sec-WebSocket-Protocol: battery-delta.v1 또는 ?protocol=delta
+    - json (기본): 매 틱 전체 JSON 문서
+    - delta: 접속 시/주기적으로 JSON 키프레임, 그 외에는 변경 값만 담은 바이너리 델타
+    
+    구독 변경: {"type": "subscribe", "battery_ids": [...], "fields": [...], "rate": Hz}
+    """
+    requested = websocket.scope.get("subprotocols", [])
+    protocol = negotiate_protocol(requested, websocket.query_params.get("protocol"))
+    subprotocol = DELTA_SUBPROTOCOL if DELTA_SUBPROTOCOL in requested else None
+    subscriber = await manager.connect(websocket, protocol, subprotocol)
     
     try:
-        # 실시간 데이터 전송 루프
-        while True:
-            # 시뮬레이션 데이터 생성 (실제로는 센서에서 받아옴)
-            battery_data = battery_service.generate_simulated_data()
-            
-            # AI 예측 수행
-            prediction = ai_service.predict_battery_health(battery_data)
-            
-            # 데이터 결합
-            response_data = {
-                "timestamp": datetime.now().isoformat(),
-                "battery_data": battery_data,
-                "prediction": prediction
-            }
-            
-            # 클라이언트로 전송
-            await websocket.send_json(response_data)
-            
-            # 1초 대기
-            await asyncio.sleep(1)
+        # 데이터 전송은 telemetry_producer가 담당 - 여기서는 구독 메시지와 연결 종료 처리 (강제 종료되면 중단)
+        while not subscriber.closed:
+            text = await websocket.receive_text()
+            await handle_client_message(subscriber, text)
             
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
+        manager.disconnect(subscriber)
     except Exception as e:
         print(f"WebSocket error: {e}")
-        manager.disconnect(websocket)
+        manager.disconnect(subscriber)
 
 
 if __name__ == "__main__":
@@ -2,29 +2,218 @@
 AI 서비스 - 배터리 상태 예측 및 이상 탐지
 """
 import numpy as np
-from typing import Dict, List, Optional
-from datetime import datetime, timedelta
-import random
+from typing import Callable, Dict, List, Optional
+from datetime import datetime
+import time
+
+from services.alert_engine import ALERT_BITS, ALERT_RULE_INDEX, breached
+from services.metrics import PREDICTION_LATENCY
+from services.model_evaluation import EvaluationAccumulator
+from services.model_registry import WARMUP_BATCH_SIZE, ModelRegistry, ModelVersion
+from services.model_training import TrainingJobManager
+from services.prediction_cache import create_prediction_cache
+from services.record_reader import DEFAULT_CHUNK_SIZE, RECORD_FEATURES, iter_source_chunks, records_to_arrays
+
+
+# 학습 모델이 없을 때 사용하는 규칙 기반 기본 모델
+BUILTIN_MODEL_VERSION = "1.0.0"
+BUILTIN_MODEL_ACCURACY = 0.92
+
+# 건강 상태 등급 (코드 순서)
+HEALTH_GRADES = ("A (매우 좋음)", "B (좋음)", "C (보통)", "D (주의)", "F (교체 필요)")
+
+# 고장 위험 수준 (코드 순서)
+FAILURE_RISK_LABELS = ("낮음", "보통", "높음")
+
+# 충전 전략 (코드 순서)
+CHARGING_STRATEGIES = (
+    "긴급 충전 필요 (고온 주의)",
+    "긴급 충전 필요",
+    "충전 권장",
+    "과충전 방지 (배터리 수명 고려)",
+    "충전 완료 상태 유지",
+    "정상 운영",
+)
+
+# 비트마스크 → 메시지 (배치 경로에서 사용, 비트 순서 = 튜플 순서)
+WARNING_MESSAGES = (
+    "⚠️ 심각한 이상 징후 감지",
+    "⚠️ 이상 징후 감지",
+    "⚠️ 고장 위험 높음",
+    "⚠️ 고장 가능성 있음",
+    "🌡️ 배터리 온도 높음",
+    "🔋 배터리 충전 부족",
+    "📉 배터리 수명 저하",
+)
+RECOMMENDATION_MESSAGES = (
+    "냉각 시스템 점검 권장",
+    "충전 스케줄 조정 필요",
+    "배터리 교체 계획 수립 권장",
+    "셀 밸런싱 수행 필요",
+    "고주기 사용에 따른 예방 정비 권장",
+)
+ANOMALY_TYPES = ("고온", "저온", "과전압", "저전압", "수명 저하", "셀 불균형", "추세 이상")
+
+# 드리프트 점수(0~1)의 이상 점수 가중치 / 이상 유형에 "추세 이상"을 붙이는 드리프트 점수
+DRIFT_ANOMALY_WEIGHT = 0.3
+DRIFT_ANOMALY_THRESHOLD = 0.5
+
+
+def _bitmask(*conditions: np.ndarray) -> np.ndarray:
+    """조건 배열 목록 → 비트마스크 배열 (i번째 조건 = i번째 비트)"""
+    mask = np.zeros(np.shape(conditions[0]), dtype=np.int64)
+    for bit, condition in enumerate(conditions):
+        mask |= condition.astype(np.int64) << bit
+    return mask
+
+
+def _decode_mask(mask: int, messages: tuple, cache: Dict[int, tuple]) -> tuple:
+    """비트마스크 → 메시지 튜플 (조합별 메모이즈)"""
+    decoded = cache.get(mask)
+    if decoded is None:
+        decoded = tuple(message for bit, message in enumerate(messages) if mask >> bit & 1)
+        cache[mask] = decoded
+    return decoded
 
 
 class AIService:
     """AI 기반 배터리 진단 서비스"""
     
-    def __init__(self):
-        """초기화"""
-        self.model_version = "1.0.0"
-        self.model_accuracy = 0.92  # 92% 정확도
-        self.prediction_cache = {}
-        
-    def predict_battery_health(self, battery_data: Dict) -> Dict:
-        """배터리 건강 상태 예측"""
-        
-        predictions = []
+    def __init__(self, enable_cache: bool = True):
+        """초기화 (enable_cache=False: 추론 프로세스 워커처럼 캐시가 필요 없는 경우)"""
+        # 학습된 모델 버전 (활성 버전이 없으면 규칙 기반 기본 모델)
+        self.registry = ModelRegistry()
+        # 배터리 ID + 양자화 특성 → 예측 결과 (None이면 비활성화)
+        self.prediction_cache = create_prediction_cache() if enable_cache else None
+        # 증분 학습 작업 (백그라운드 프로세스 풀)
+        self.training = TrainingJobManager()
+        self.rng = np.random.default_rng()
+        
+        # 배치 경로 메시지 디코딩 캐시
+        self._warning_cache: Dict[int, tuple] = {}
+        self._recommendation_cache: Dict[int, tuple] = {}
+        self._anomaly_type_cache: Dict[int, tuple] = {}
+        
+    @property
+    def model_version(self) -> str:
+        model = self.registry.active
+        return model.version if model is not None else BUILTIN_MODEL_VERSION
+    
+    @property
+    def model_accuracy(self) -> Optional[float]:
+        """모델 정확도 (학습 모델의 온라인 정확도를 알 수 없으면 None)"""
+        model = self.registry.active
+        if model is None:
+            return BUILTIN_MODEL_ACCURACY
+        return model.meta.get("online_accuracy")
+    
+    def model_info(self) -> Dict:
+        """활성 모델 정보"""
+        model = self.registry.active
+        if model is None:
+            return {
+                "model_version": BUILTIN_MODEL_VERSION,
+                "model_accuracy": BUILTIN_MODEL_ACCURACY,
+                "model_type": "규칙 기반 (학습 모델 없음)",
+                "training_data_count": 0,
+                "last_updated": "2025-06-01",
+            }
+        return {
+            "model_version": model.version,
+            "model_accuracy": self.model_accuracy,
+            "model_type": "SGD 선형 모델 (상태 분류 + RUL 회귀, 증분 학습)",
+            "training_data_count": model.meta.get("records", 0),
+            "last_updated": model.meta.get("created_at"),
+        }
+    
+    def activate_model(self, version: Optional[str]) -> Dict:
+        """모델 버전 교체 (None: 규칙 기반 기본 모델)
+        
+        로드와 워밍업(전체 예측 경로 1회 실행)이 끝난 뒤 교체한다. 예측 캐시 키에는 모델 버전이
+        들어가므로 교체 중에 끝난 이전 모델 배치의 결과는 새 모델 조회에 쓰이지 않으며,
+        남은 이전 모델 항목은 비운다.
+        """
+        self.registry.activate(version, warm_up=self._warm_up)
+        if self.prediction_cache is not None:
+            self.prediction_cache.clear()
+        return self.registry.info()
+    
+    def load_default_model(self) -> Optional[str]:
+        """시작 시 MODEL_VERSION 설정의 버전 활성화 (학습 결과가 없으면 기본 모델) + 워밍업"""
+        version = self.registry.resolve()
+        if version is not None:
+            self.activate_model(version)
+        else:
+            self._warm_up(None)
+        return self.model_version
+    
+    def _warm_up(self, model: Optional[ModelVersion]):
+        """워밍업 배치 1회 예측 - 첫 요청이 초기화 비용을 치르지 않도록"""
+        if model is not None:
+            features = model.synthetic_features()
+            features["cell_imbalance"] = features["cell_imbalance"] > 0.5
+        else:
+            rng = np.random.default_rng(0)
+            n = WARMUP_BATCH_SIZE
+            features = {
+                "soc": rng.uniform(0, 100, n), "soh": rng.uniform(70, 100, n),
+                "temperature": rng.uniform(10, 50, n), "voltage": rng.uniform(3.2, 4.2, n),
+                "current": rng.uniform(-50, 50, n), "cycle_count": rng.uniform(0, 5000, n),
+                "cell_imbalance": np.zeros(n, dtype=bool),
+            }
+        self.predict_batch(**features, model=model)
+    
+    @PREDICTION_LATENCY.labels("predict_battery_health").time()
+    def predict_battery_health(self, battery_data: Dict,
+                               features: Optional[Dict[str, np.ndarray]] = None) -> Dict:
+        """배터리 건강 상태 예측 (features: 이미 배열로 가진 경우 딕셔너리 추출 생략)"""
+        
+        batteries = battery_data.get("batteries", [])
+        if features is None:
+            features = self._extract_features(batteries)
+        battery_ids = np.fromiter((b.get("id", i + 1) for i, b in enumerate(batteries)),
+                                  dtype=np.int64, count=len(batteries))
+        
+        # 전체 배터리를 한 번에 벡터 연산으로 예측 (캐시 적중 배터리는 제외)
+        batch = self.predict_fleet(battery_ids, features)
+        return self.build_prediction_response(batteries, batch)
+    
+    def predict_fleet(self, battery_ids: np.ndarray, features: Dict[str, np.ndarray],
+                      compute: Optional[Callable[[Dict[str, np.ndarray]], Dict[str, np.ndarray]]] = None
+                      ) -> Dict[str, np.ndarray]:
+        """예측 캐시를 거친 배치 예측 - 캐시 미스인 배터리만 predict_batch로 추론
+        
+        compute: 미스 배터리 특성 → 예측 결과 (기본값: 현재 프로세스에서 predict_batch)
+        """
+        compute = compute or (lambda f: self.predict_batch(**f))
+        cache = self.prediction_cache
+        if cache is None or len(battery_ids) == 0:
+            return compute(features)
+        
+        keys = cache.quantize(battery_ids, features, self.registry.active_version)
+        hit, cached = cache.lookup(keys)
+        if hit.all():
+            return cached
+        
+        miss = ~hit
+        computed = compute({name: values[miss] for name, values in features.items()})
+        cache.store(keys[miss], computed)
+        if not hit.any():
+            return computed
+        
+        batch = {}
+        for name, values in computed.items():
+            merged = np.empty(len(hit), dtype=values.dtype)
+            merged[miss] = values
+            merged[hit] = cached[name]
+            batch[name] = merged
+        return batch
+    
+    @PREDICTION_LATENCY.labels("build_prediction_response").time()
+    def build_prediction_response(self, batteries: List[Dict], batch: Dict[str, np.ndarray]) -> Dict:
+        """배치 예측 결과 → predict_battery_health 응답 형식"""
         
-        for battery in battery_data.get("batteries", []):
-            # 각 배터리에 대한 예측 수행
-            prediction = self._predict_single_battery(battery)
-            predictions.append(prediction)
+        predictions = self._build_predictions(batteries, batch)
         
         # 전체 시스템 예측
         system_prediction = self._predict_system_health(predictions)
@@ -37,263 +226,237 @@ class AIService:
             "system_prediction": system_prediction
         }
     
-    def _predict_single_battery(self, battery: Dict) -> Dict:
-        """개별 배터리 예측"""
-        
-        # 입력 특성
-        soc = battery.get("soc", 0)
-        soh = battery.get("soh", 0)
-        temperature = battery.get("temperature", 0)
-        voltage = battery.get("voltage", 0)
-        current = battery.get("current", 0)
-        cycle_count = battery.get("cycle_count", 0)
-        
-        # AI 모델 시뮬레이션 (실제로는 학습된 모델 사용)
-        
-        # 1. 잔존 수명 예측 (RUL: Remaining Useful Life)
-        rul_days = self._predict_rul(soh, cycle_count, temperature)
-        
-        # 2. 이상 탐지 (Anomaly Detection)
-        anomaly_score = self._detect_anomaly(battery)
-        is_anomaly = anomaly_score > 0.7
-        
-        # 3. 고장 확률 예측
-        failure_probability = self._predict_failure_probability(battery)
+    def _extract_features(self, batteries: List[Dict]) -> Dict[str, np.ndarray]:
+        """배터리 딕셔너리 목록 → 특성 배열"""
+        n = len(batteries)
+        features = {
+            name: np.fromiter((b.get(name, 0) for b in batteries), dtype=np.float64, count=n)
+            for name in ("soc", "soh", "temperature", "voltage", "current", "cycle_count")
+        }
+        features["cell_imbalance"] = np.fromiter(
+            (b.get("cell_balance") == "불균형" for b in batteries), dtype=bool, count=n
+        )
+        return features
+    
+    @PREDICTION_LATENCY.labels("predict_batch").time()
+    def predict_batch(self, soc: np.ndarray, soh: np.ndarray, temperature: np.ndarray,
+                      voltage: np.ndarray, current: np.ndarray, cycle_count: np.ndarray,
+                      cell_imbalance: Optional[np.ndarray] = None,
+                      drift_score: Optional[np.ndarray] = None,
+                      active_alerts: Optional[np.ndarray] = None,
+                      noise: Optional[Dict[str, np.ndarray]] = None,
+                      model: Optional[ModelVersion] = None) -> Dict[str, np.ndarray]:
+        """N개 배터리 배치 예측 (벡터 연산)
+        
+        같은 입력과 노이즈를 주면 같은 결과를 낸다. 노이즈를 생략하면 self.rng에서 추출한다.
+        학습 모델(model, 생략 시 활성 버전)이 있으면 학습된 항목(RUL, 고장 확률)은 모델 출력을 사용한다.
+        drift_score: 스트리밍 드리프트 탐지 점수 (0~1, 생략 시 0)
+        active_alerts: 알림 엔진의 배터리별 활성 알림 비트마스크 (AlertState.mask) - 주면 알림 규칙에
+            해당하는 경고는 엔진 상태(히스테리시스 포함)를 따르고, 생략하면 현재 값으로 판단
+        임계값은 모두 알림/진단 규칙(ALERT_RULES)에서 읽는다.
+        """
+        n = len(soh)
+        if cell_imbalance is None:
+            cell_imbalance = np.zeros(n, dtype=bool)
+        if drift_score is None:
+            drift_score = np.zeros(n)
+        if noise is None:
+            noise = self._draw_noise(n)
+        model = model or self.registry.active
+        learned = {}
+        if model is not None:
+            learned = model.predict({
+                "soc": soc, "soh": soh, "temperature": temperature, "voltage": voltage,
+                "current": current, "cycle_count": cycle_count, "cell_imbalance": cell_imbalance,
+            })
+        
+        # 1. 잔존 수명 예측 (RUL)
+        if "rul_days" in learned:
+            rul_days = np.maximum(0, learned["rul_days"])
+        else:
+            cycle_factor = np.maximum(0, 1 - (cycle_count / 5000))
+            temp_factor = np.clip(1 - np.abs(temperature - 25) / 100, 0.5, 1.0)
+            rul_days = 1000 * (soh / 100) * cycle_factor * temp_factor
+            rul_days = np.maximum(0, rul_days + noise["rul"])
+        
+        # 2. 이상 탐지
+        high_temperature = breached("high_temperature", temperature)
+        low_temperature = breached("low_temperature", temperature)
+        overvoltage = breached("overvoltage", voltage)
+        undervoltage = breached("undervoltage", voltage)
+        degraded_soh = breached("degraded_soh", soh)
+        anomaly_score = np.zeros(n)
+        anomaly_score += np.where(
+            breached("critical_temperature", temperature) | breached("freezing_temperature", temperature), 0.3,
+            np.where(high_temperature | low_temperature, 0.15, 0.0),
+        )
+        anomaly_score += np.where(
+            breached("critical_undervoltage", voltage) | breached("critical_overvoltage", voltage), 0.3,
+            np.where(undervoltage | overvoltage, 0.15, 0.0),
+        )
+        expected_voltage = 3.3 + (soc / 100) * 0.9
+        anomaly_score += np.where(breached("voltage_mismatch", np.abs(voltage - expected_voltage)), 0.2, 0.0)
+        anomaly_score += np.where(breached("critical_soh", soh), 0.3, np.where(degraded_soh, 0.1, 0.0))
+        anomaly_score += np.where(cell_imbalance, 0.2, 0.0)
+        anomaly_score += DRIFT_ANOMALY_WEIGHT * drift_score
+        anomaly_score += noise["anomaly"]
+        anomaly_score = np.minimum(1.0, np.maximum(0.0, anomaly_score))
+        is_anomaly = breached("severe_anomaly", anomaly_score)
+        
+        # 3. 고장 확률 (로지스틱)
+        if "failure_probability" in learned:
+            failure_probability = learned["failure_probability"]
+        else:
+            x = (
+                -0.05 * soh +
+                0.02 * np.abs(temperature - 25) +
+                0.0001 * cycle_count +
+                noise["failure"]
+            )
+            failure_probability = 1 / (1 + np.exp(-x))
+        high_failure_risk = breached("high_failure_risk", failure_probability)
+        failure_risk = np.where(high_failure_risk, 2,
+                                np.where(breached("medium_failure_risk", failure_probability), 1, 0))
+        
+        # 4. 충전 전략
+        low_soc = breached("low_soc", soc)
+        warm_temperature = breached("warm_temperature", temperature)
+        full_charge = breached("full_charge", soc)
+        charging = np.select(
+            [low_soc & warm_temperature, low_soc, breached("charge_recommended", soc),
+             full_charge & degraded_soh, full_charge],
+            [0, 1, 2, 3, 4],
+            default=5,
+        )
         
-        # 4. 최적 충전 추천
-        charging_recommendation = self._recommend_charging_strategy(soc, soh, temperature)
+        # 알림 규칙에 해당하는 경고 - 엔진 상태가 있으면 엔진과 같은 판단 (히스테리시스 포함)
+        low_soh = breached("low_soh", soh)
+        if active_alerts is None:
+            alert_temperature, alert_soc, alert_soh = high_temperature, low_soc, low_soh
+        else:
+            active_alerts = np.asarray(active_alerts, dtype=np.int64)
+            alert_temperature, alert_soc, alert_soh = (
+                (active_alerts & ALERT_BITS[key]) != 0 for key in ("high_temperature", "low_soc", "low_soh")
+            )
         
         # 5. 건강 상태 등급
-        health_grade = self._calculate_health_grade(soh, anomaly_score)
-        
-        # 6. 예상 교체 시기
-        replacement_date = (datetime.now() + timedelta(days=rul_days)).strftime("%Y-%m-%d")
+        health_grade = np.select(
+            [
+                (soh >= 95) & (anomaly_score < 0.2),
+                (soh >= 90) & (anomaly_score < 0.4),
+                (soh >= 80) & (anomaly_score < 0.6),
+                (soh >= 70) & (anomaly_score < 0.8),
+            ],
+            [0, 1, 2, 3],
+            default=4,
+        )
         
         return {
-            "battery_id": battery.get("id"),
-            "battery_name": battery.get("name"),
-            
-            # 예측 결과
-            "rul_days": int(rul_days),
-            "replacement_date": replacement_date,
-            "health_grade": health_grade,
-            
-            # 이상 탐지
-            "anomaly_score": round(anomaly_score, 3),
+            "rul_days": rul_days,
+            "anomaly_score": anomaly_score,
             "is_anomaly": is_anomaly,
-            "anomaly_type": self._identify_anomaly_type(battery) if is_anomaly else None,
-            
-            # 고장 예측
-            "failure_probability": round(failure_probability, 3),
-            "failure_risk": "높음" if failure_probability > 0.7 else "보통" if failure_probability > 0.3 else "낮음",
-            
-            # 충전 추천
-            "charging_recommendation": charging_recommendation,
-            
-            # 성능 예측
-            "predicted_soh_next_month": round(soh - random.uniform(0.5, 1.5), 1),
-            "predicted_capacity_retention": round((soh / 100) * battery.get("capacity_rated", 100), 2),
-            
-            # 경고 및 권장사항
-            "warnings": self._generate_warnings(battery, anomaly_score, failure_probability),
-            "recommendations": self._generate_recommendations(battery, soc, soh, temperature)
+            "failure_probability": failure_probability,
+            "failure_risk": failure_risk,
+            "charging_recommendation": charging,
+            "health_grade": health_grade,
+            "predicted_soh_next_month": soh - noise["soh_decline"],
+            "drift_score": drift_score,
+            "warnings": _bitmask(
+                is_anomaly,
+                breached("anomaly", anomaly_score) & ~is_anomaly,
+                high_failure_risk,
+                breached("possible_failure", failure_probability) & ~high_failure_risk,
+                alert_temperature,
+                alert_soc,
+                alert_soh,
+            ),
+            "recommendations": _bitmask(
+                warm_temperature, breached("charge_schedule", soc), degraded_soh, cell_imbalance,
+                breached("high_cycle_count", cycle_count),
+            ),
+            "anomaly_types": _bitmask(
+                high_temperature,
+                ~high_temperature & low_temperature,
+                overvoltage,
+                ~overvoltage & undervoltage,
+                low_soh,
+                cell_imbalance,
+                drift_score >= DRIFT_ANOMALY_THRESHOLD,
+            ),
         }
     
-    def _predict_rul(self, soh: float, cycle_count: int, temperature: float) -> float:
-        """잔존 수명 예측 (일 단위)"""
-        
-        # 간단한 경험적 모델 (실제로는 딥러닝 모델 사용)
-        base_life = 1000  # 기본 수명 (일)
-        
-        # SOH 영향
-        soh_factor = soh / 100
-        
-        # 사이클 카운트 영향
-        cycle_factor = max(0, 1 - (cycle_count / 5000))
-        
-        # 온도 영향 (최적 온도 25°C)
-        temp_factor = 1 - abs(temperature - 25) / 100
-        temp_factor = max(0.5, min(1.0, temp_factor))
-        
-        # 잔존 수명 계산
-        rul = base_life * soh_factor * cycle_factor * temp_factor
-        
-        # 노이즈 추가 (모델의 불확실성)
-        rul += random.uniform(-50, 50)
-        
-        return max(0, rul)
+    def _draw_noise(self, n: int) -> Dict[str, np.ndarray]:
+        """모델 불확실성 노이즈 추출"""
+        return {
+            "rul": self.rng.uniform(-50, 50, n),
+            "anomaly": self.rng.uniform(-0.05, 0.05, n),
+            "failure": self.rng.uniform(-0.5, 0.5, n),
+            "soh_decline": self.rng.uniform(0.5, 1.5, n),
+        }
     
-    def _detect_anomaly(self, battery: Dict) -> float:
-        """이상 탐지 점수 계산 (0~1)"""
-        
-        anomaly_score = 0.0
-        
-        # 온도 이상
-        temp = battery.get("temperature", 25)
-        if temp > 45 or temp < 0:
-            anomaly_score += 0.3
-        elif temp > 40 or temp < 5:
-            anomaly_score += 0.15
-        
-        # 전압 이상
-        voltage = battery.get("voltage", 3.7)
-        if voltage < 3.0 or voltage > 4.2:
-            anomaly_score += 0.3
-        elif voltage < 3.3 or voltage > 4.0:
-            anomaly_score += 0.15
-        
-        # SOC와 전압 불일치
-        soc = battery.get("soc", 50)
-        expected_voltage = 3.3 + (soc / 100) * 0.9
-        voltage_diff = abs(voltage - expected_voltage)
-        if voltage_diff > 0.5:
-            anomaly_score += 0.2
-        
-        # SOH 급격한 저하
-        soh = battery.get("soh", 100)
-        if soh < 70:
-            anomaly_score += 0.3
-        elif soh < 85:
-            anomaly_score += 0.1
-        
-        # 셀 불균형
-        if battery.get("cell_balance") == "불균형":
-            anomaly_score += 0.2
-        
-        # 랜덤 노이즈
-        anomaly_score += random.uniform(-0.05, 0.05)
-        
-        return min(1.0, max(0.0, anomaly_score))
+    @staticmethod
+    def _zero_noise(n: int) -> Dict[str, np.ndarray]:
+        """노이즈 없는 예측용 (평가)"""
+        zeros = np.zeros(n)
+        return {"rul": zeros, "anomaly": zeros, "failure": zeros, "soh_decline": zeros}
     
-    def _predict_failure_probability(self, battery: Dict) -> float:
-        """고장 확률 예측"""
-        
-        soh = battery.get("soh", 100)
-        temperature = battery.get("temperature", 25)
-        cycle_count = battery.get("cycle_count", 0)
-        
-        # 로지스틱 회귀 기반 간단한 모델
-        x = (
-            -0.05 * soh +
-            0.02 * abs(temperature - 25) +
-            0.0001 * cycle_count +
-            random.uniform(-0.5, 0.5)
+    def _build_predictions(self, batteries: List[Dict], batch: Dict[str, np.ndarray]) -> List[Dict]:
+        """배치 예측 배열 → 배터리별 응답 딕셔너리"""
+        
+        # 교체 예정일 (현재 시각 + RUL, 벡터 연산)
+        now = np.datetime64(datetime.now(), "us")
+        offsets = (batch["rul_days"] * 86_400_000_000).astype("timedelta64[us]")
+        replacement_dates = np.datetime_as_string((now + offsets).astype("datetime64[D]")).tolist()
+        
+        columns = zip(
+            batteries,
+            batch["rul_days"].tolist(),
+            replacement_dates,
+            batch["health_grade"].tolist(),
+            batch["anomaly_score"].tolist(),
+            batch["is_anomaly"].tolist(),
+            batch["anomaly_types"].tolist(),
+            batch["failure_probability"].tolist(),
+            batch["failure_risk"].tolist(),
+            batch["charging_recommendation"].tolist(),
+            batch["predicted_soh_next_month"].tolist(),
+            batch["warnings"].tolist(),
+            batch["recommendations"].tolist(),
+            batch["drift_score"].tolist(),
         )
         
-        # 시그모이드 함수
-        probability = 1 / (1 + np.exp(-x))
-        
-        return float(probability)
-    
-    def _recommend_charging_strategy(self, soc: float, soh: float, temperature: float) -> str:
-        """최적 충전 전략 추천"""
-        
-        if soc < 20:
-            if temperature > 35:
-                return "긴급 충전 필요 (고온 주의)"
-            else:
-                return "긴급 충전 필요"
-        elif soc < 40:
-            return "충전 권장"
-        elif soc > 90:
-            if soh < 85:
-                return "과충전 방지 (배터리 수명 고려)"
-            else:
-                return "충전 완료 상태 유지"
-        else:
-            return "정상 운영"
-    
-    def _calculate_health_grade(self, soh: float, anomaly_score: float) -> str:
-        """건강 상태 등급 계산"""
-        
-        if soh >= 95 and anomaly_score < 0.2:
-            return "A (매우 좋음)"
-        elif soh >= 90 and anomaly_score < 0.4:
-            return "B (좋음)"
-        elif soh >= 80 and anomaly_score < 0.6:
-            return "C (보통)"
-        elif soh >= 70 and anomaly_score < 0.8:
-            return "D (주의)"
-        else:
-            return "F (교체 필요)"
-    
-    def _identify_anomaly_type(self, battery: Dict) -> str:
-        """이상 유형 식별"""
-        
-        types = []
-        
-        temp = battery.get("temperature", 25)
-        if temp > 40:
-            types.append("고온")
-        elif temp < 5:
-            types.append("저온")
-        
-        voltage = battery.get("voltage", 3.7)
-        if voltage > 4.0:
-            types.append("과전압")
-        elif voltage < 3.3:
-            types.append("저전압")
-        
-        soh = battery.get("soh", 100)
-        if soh < 80:
-            types.append("수명 저하")
-        
-        if battery.get("cell_balance") == "불균형":
-            types.append("셀 불균형")
-        
-        return ", ".join(types) if types else "기타"
-    
-    def _generate_warnings(self, battery: Dict, anomaly_score: float, failure_prob: float) -> List[str]:
-        """경고 생성"""
-        
-        warnings = []
-        
-        if anomaly_score > 0.7:
-            warnings.append("⚠️ 심각한 이상 징후 감지")
-        elif anomaly_score > 0.5:
-            warnings.append("⚠️ 이상 징후 감지")
-        
-        if failure_prob > 0.7:
-            warnings.append("⚠️ 고장 위험 높음")
-        elif failure_prob > 0.5:
-            warnings.append("⚠️ 고장 가능성 있음")
-        
-        if battery.get("temperature", 25) > 40:
-            warnings.append("🌡️ 배터리 온도 높음")
-        
-        if battery.get("soc", 100) < 20:
-            warnings.append("🔋 배터리 충전 부족")
-        
-        if battery.get("soh", 100) < 80:
-            warnings.append("📉 배터리 수명 저하")
-        
-        return warnings
-    
-    def _generate_recommendations(self, battery: Dict, soc: float, soh: float, temperature: float) -> List[str]:
-        """권장사항 생성"""
-        
-        recommendations = []
-        
-        if temperature > 35:
-            recommendations.append("냉각 시스템 점검 권장")
-        
-        if soc < 30:
-            recommendations.append("충전 스케줄 조정 필요")
-        
-        if soh < 85:
-            recommendations.append("배터리 교체 계획 수립 권장")
-        
-        if battery.get("cell_balance") == "불균형":
-            recommendations.append("셀 밸런싱 수행 필요")
-        
-        cycle_count = battery.get("cycle_count", 0)
-        if cycle_count > 4000:
-            recommendations.append("고주기 사용에 따른 예방 정비 권장")
-        
-        if not recommendations:
-            recommendations.append("정상 운영 중")
-        
-        return recommendations
+        predictions = []
+        for (battery, rul_days, replacement_date, grade, anomaly_score, is_anomaly, anomaly_types,
+             failure_probability, failure_risk, charging, soh_next_month, warnings, recommendations,
+             drift_score) in columns:
+            anomaly_type = None
+            if is_anomaly:
+                anomaly_type = ", ".join(
+                    _decode_mask(anomaly_types, ANOMALY_TYPES, self._anomaly_type_cache)
+                ) or "기타"
+            
+            predictions.append({
+                "battery_id": battery.get("id"),
+                "battery_name": battery.get("name"),
+                "rul_days": int(rul_days),
+                "replacement_date": replacement_date,
+                "health_grade": HEALTH_GRADES[grade],
+                "anomaly_score": round(anomaly_score, 3),
+                "is_anomaly": is_anomaly,
+                "anomaly_type": anomaly_type,
+                "drift_score": round(drift_score, 3),
+                "failure_probability": round(failure_probability, 3),
+                "failure_risk": FAILURE_RISK_LABELS[failure_risk],
+                "charging_recommendation": CHARGING_STRATEGIES[charging],
+                "predicted_soh_next_month": round(soh_next_month, 1),
+                "predicted_capacity_retention": round((battery.get("soh", 0) / 100) * battery.get("capacity_rated", 100), 2),
+                "warnings": list(_decode_mask(warnings, WARNING_MESSAGES, self._warning_cache)),
+                "recommendations": list(
+                    _decode_mask(recommendations, RECOMMENDATION_MESSAGES, self._recommendation_cache)
+                ) or ["정상 운영 중"],
+            })
+        
+        return predictions
     
     def _predict_system_health(self, battery_predictions: List[Dict]) -> Dict:
         """전체 시스템 건강 상태 예측"""
@@ -308,7 +471,8 @@ class AIService:
         
         # 시스템 전체 건강 등급
         anomaly_batteries = sum(1 for p in battery_predictions if p["is_anomaly"])
-        high_risk_batteries = sum(1 for p in battery_predictions if p["failure_probability"] > 0.7)
+        high_risk = ALERT_RULE_INDEX["high_failure_risk"]
+        high_risk_batteries = sum(1 for p in battery_predictions if high_risk.breached(p["failure_probability"]))
         
         if high_risk_batteries > len(battery_predictions) * 0.3:
             system_health = "위험"
@@ -341,22 +505,79 @@ class AIService:
         else:
             return "✅ 시스템 정상 운영 중"
     
-    def train_model(self, training_data: List[Dict]) -> Dict:
-        """AI 모델 학습 (향후 구현)"""
-        
-        # 실제로는 TensorFlow/PyTorch를 사용한 모델 학습
-        return {
-            "status": "training_scheduled",
-            "message": "모델 학습이 예약되었습니다",
-            "data_count": len(training_data)
-        }
+    def train_model(self, source: Dict, description: Optional[Dict] = None,
+                    cleanup_path: Optional[str] = None) -> Dict:
+        """AI 모델 증분 학습 작업 제출 (즉시 반환, 진행 상황은 get_training_job으로 조회)
+        
+        source: 학습 데이터 소스 (record_reader.iter_source_chunks 형식)
+        cleanup_path: 작업 종료 후 삭제할 업로드 임시 파일
+        """
+        return self.training.submit(source, description, cleanup_path)
+    
+    def get_training_job(self, job_id: str) -> Optional[Dict]:
+        """학습 작업 상태"""
+        return self.training.get(job_id)
     
-    def evaluate_model(self, test_data: List[Dict]) -> Dict:
-        """모델 평가 (향후 구현)"""
+    def list_training_jobs(self) -> List[Dict]:
+        """학습 작업 목록 (최신순)"""
+        return self.training.list()
+    
+    def close(self):
+        """종료 시 학습 프로세스 풀 정리"""
+        self.training.shutdown()
+    
+    def evaluate_model(self, source: Dict, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict:
+        """모델 평가 - 라벨이 있는 데이터를 청크 단위로 읽어 배치 예측 후 지표 누적
+        
+        source: 평가 데이터 소스 (record_reader.iter_source_chunks 형식)
+        상태 예측은 학습 모델의 상태 분류를 사용하고, 기본 모델은 고장 위험 수준
+        (낮음/보통/높음)을 정상/점검중/고장에 대응시킨다. 노이즈 없이 예측한다.
+        """
+        # 평가 도중 모델이 교체되어도 같은 버전으로 평가
+        model = self.registry.active
+        accumulator = EvaluationAccumulator()
+        records = skipped = chunks = 0
+        scoring_seconds = 0.0
+        start = time.perf_counter()
+        
+        for chunk, _ in iter_source_chunks(source, chunk_size):
+            features, labels = records_to_arrays(chunk)
+            chunks += 1
+            skipped += len(chunk) - len(features)
+            records += len(features)
+            if not len(features):
+                continue
+            
+            scoring_start = time.perf_counter()
+            inputs = {name: features[:, j] for j, name in enumerate(RECORD_FEATURES)}
+            inputs["cell_imbalance"] = inputs["cell_imbalance"] > 0.5
+            batch = self.predict_batch(**inputs, noise=self._zero_noise(len(features)), model=model)
+            if model is not None and model.has_classifier:
+                status = model.predict(inputs)["status"]
+            else:
+                status = batch["failure_risk"]
+            scoring_seconds += time.perf_counter() - scoring_start
+            
+            accumulator.add_status(labels["status"], status)
+            accumulator.add_rul(labels["rul_days"], batch["rul_days"])
+        
+        if not records:
+            raise ValueError("평가 가능한 레코드가 없습니다")
         
+        elapsed = time.perf_counter() - start
+        status_metrics = accumulator.status_metrics()
         return {
-            "accuracy": self.model_accuracy,
-            "precision": 0.89,
-            "recall": 0.91,
-            "f1_score": 0.90
+            "model_version": model.version if model is not None else BUILTIN_MODEL_VERSION,
+            "accuracy": status_metrics["accuracy"] if status_metrics else None,
+            "precision": status_metrics["precision"] if status_metrics else None,
+            "recall": status_metrics["recall"] if status_metrics else None,
+            "f1_score": status_metrics["f1_score"] if status_metrics else None,
+            "status": status_metrics,
+            "rul": accumulator.rul_metrics(),
+            "records": records,
+            "skipped": skipped,
+            "chunks": chunks,
+            "elapsed_seconds": round(elapsed, 3),
+            "records_per_second": round(records / elapsed, 1) if elapsed > 0 else None,
+            "scoring_records_per_second": round(records / scoring_seconds, 1) if scoring_seconds > 0 else None,
         }
@@ -0,0 +1,287 @@
+"""
+알림 엔진 - 선언형 알림 규칙, 플릿 전체 벡터 평가, 배터리별 알림 상태 (히스테리시스/중복 제거/쿨다운)
+"""
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Optional, Sequence
+import numpy as np
+
+from services.metrics import ALERT_ACTIVE, ALERT_TRANSITIONS
+
+
+# 해제 후 같은 알림을 다시 발생시키지 않는 시간 (초)
+ALERT_COOLDOWN_SECONDS = float(os.getenv("ALERT_COOLDOWN_SECONDS", "60"))
+
+# 보관할 최근 알림 이벤트 수 (발생/해제)
+ALERT_EVENT_BUFFER = int(os.getenv("ALERT_EVENT_BUFFER", "10000"))
+
+EVENT_RAISED = "raised"
+EVENT_CLEARED = "cleared"
+
+
+class AlertRule:
+    """알림 규칙 하나
+
+    op가 ">" 이면 값이 raise_at을 넘을 때 발생하고 clear_at 이하로 내려와야 해제된다
+    ("<" 이면 반대). raise_at과 clear_at 사이는 현재 상태를 유지하는 히스테리시스 구간이다.
+    raise_ticks / clear_ticks 틱 연속으로 조건이 맞아야 상태가 바뀐다.
+    notify=False 인 규칙은 알림을 만들지 않는 진단 기준값이다 (AI 이상 점수/경고/권장사항이 읽음).
+    """
+
+    def __init__(self, key: str, level: Optional[str], metric: str, op: str, raise_at: float, clear_at: float,
+                 message: str, raise_ticks: int = 1, clear_ticks: int = 1,
+                 cooldown_seconds: float = ALERT_COOLDOWN_SECONDS, notify: bool = True):
+        if op not in (">", "<"):
+            raise ValueError(f"지원하지 않는 비교 연산: {op}")
+        if (clear_at > raise_at) if op == ">" else (clear_at < raise_at):
+            raise ValueError(f"{key}: clear_at은 raise_at보다 정상 쪽이어야 합니다")
+        self.key = key
+        self.level = level
+        self.metric = metric
+        self.op = op
+        self.raise_at = raise_at
+        self.clear_at = clear_at
+        self.message = message
+        self.raise_ticks = max(raise_ticks, 1)
+        self.clear_ticks = max(clear_ticks, 1)
+        self.cooldown_seconds = cooldown_seconds
+        self.notify = notify
+
+    def breached(self, values: np.ndarray) -> np.ndarray:
+        return values > self.raise_at if self.op == ">" else values < self.raise_at
+
+    def recovered(self, values: np.ndarray) -> np.ndarray:
+        return values <= self.clear_at if self.op == ">" else values >= self.clear_at
+
+
+def _threshold(key: str, metric: str, op: str, value: float) -> AlertRule:
+    """진단 기준값 (알림 없음)"""
+    return AlertRule(key, None, metric, op, value, value, "", notify=False)
+
+
+# 알림/진단 규칙 - 배터리 상태 판단 임계값은 모두 여기서 정의 (cell_imbalance는 0/1 값)
+ALERT_RULES = (
+    # 알림 (엔진이 배터리별 상태를 추적 - 순서가 상태 행렬의 열 순서)
+    AlertRule("high_temperature", "경고", "temperature", ">", 40.0, 38.0, "{name}: 고온 감지 ({value}°C)"),
+    AlertRule("low_soc", "주의", "soc", "<", 20.0, 25.0, "{name}: 낮은 충전 상태 ({value}%)"),
+    AlertRule("low_soh", "경고", "soh", "<", 80.0, 81.0, "{name}: 배터리 수명 저하 ({value}%)"),
+    AlertRule("cell_imbalance", "주의", "cell_imbalance", ">", 0.5, 0.5, "{name}: 셀 불균형 감지"),
+    # 이상 점수 / 이상 유형 (voltage_deviation: SOC 기준 예상 전압과의 차이)
+    _threshold("critical_temperature", "temperature", ">", 45.0),
+    _threshold("freezing_temperature", "temperature", "<", 0.0),
+    _threshold("low_temperature", "temperature", "<", 5.0),
+    _threshold("critical_overvoltage", "voltage", ">", 4.2),
+    _threshold("critical_undervoltage", "voltage", "<", 3.0),
+    _threshold("overvoltage", "voltage", ">", 4.0),
+    _threshold("undervoltage", "voltage", "<", 3.3),
+    _threshold("voltage_mismatch", "voltage_deviation", ">", 0.5),
+    _threshold("critical_soh", "soh", "<", 70.0),
+    _threshold("degraded_soh", "soh", "<", 85.0),
+    # 충전 전략 / 권장사항
+    _threshold("warm_temperature", "temperature", ">", 35.0),
+    _threshold("charge_schedule", "soc", "<", 30.0),
+    _threshold("charge_recommended", "soc", "<", 40.0),
+    _threshold("full_charge", "soc", ">", 90.0),
+    _threshold("high_cycle_count", "cycle_count", ">", 4000),
+    # 예측 결과 (이상 점수 / 고장 확률) 경고 및 위험 수준
+    _threshold("severe_anomaly", "anomaly_score", ">", 0.7),
+    _threshold("anomaly", "anomaly_score", ">", 0.5),
+    _threshold("high_failure_risk", "failure_probability", ">", 0.7),
+    _threshold("possible_failure", "failure_probability", ">", 0.5),
+    _threshold("medium_failure_risk", "failure_probability", ">", 0.3),
+)
+ALERT_RULE_INDEX = {rule.key: rule for rule in ALERT_RULES}
+
+# 알림 엔진이 상태를 추적하는 규칙 / 활성 알림 비트마스크의 규칙별 비트
+NOTIFY_RULES = tuple(rule for rule in ALERT_RULES if rule.notify)
+ALERT_BITS = {rule.key: 1 << bit for bit, rule in enumerate(NOTIFY_RULES)}
+
+
+def breached(key: str, values: np.ndarray) -> np.ndarray:
+    """규칙 key의 임계값을 넘은 값 (상태 없이 현재 값만 비교)"""
+    return ALERT_RULE_INDEX[key].breached(values)
+
+
+def alert_masks(values: Dict[str, np.ndarray], rules: Sequence[AlertRule] = NOTIFY_RULES) -> np.ndarray:
+    """배터리 × 알림 규칙 발생 조건 행렬 (n, len(rules)) - 상태 없이 현재 값만 평가"""
+    return np.column_stack([rule.breached(values[rule.metric]) for rule in rules])
+
+
+def build_alerts(rows: np.ndarray, rule_indices: np.ndarray, battery_ids: np.ndarray,
+                 values: Dict[str, np.ndarray], timestamps: Sequence[str],
+                 name_of: Callable[[int], str], rules: Sequence[AlertRule] = NOTIFY_RULES) -> List[Dict]:
+    """(행, 규칙) 쌍 → 알림 딕셔너리 목록 (해당 배터리에 대해서만 변환)"""
+    alerts = []
+    for row, index, battery_id, timestamp in zip(
+        rows.tolist(), rule_indices.tolist(), battery_ids[rows].tolist(), timestamps,
+    ):
+        rule = rules[index]
+        value = values[rule.metric][row].item()
+        alerts.append({
+            "level": rule.level,
+            "rule": rule.key,
+            "battery_id": battery_id,
+            "message": rule.message.format(name=name_of(battery_id), value=value),
+            "value": value,
+            "timestamp": timestamp,
+        })
+    return alerts
+
+
+def iso_timestamps(timestamps: np.ndarray) -> List[str]:
+    """epoch 초 배열 → ISO 문자열 목록 (같은 시각은 한 번만 변환)"""
+    unique, inverse = np.unique(timestamps, return_inverse=True)
+    converted = [datetime.fromtimestamp(ts).isoformat() for ts in unique.tolist()]
+    return [converted[i] for i in inverse.tolist()]
+
+
+class AlertState:
+    """한 틱 시점의 활성 알림 (스냅샷에 고정 - 이후 틱이 바꾸지 않도록 복사본)"""
+
+    def __init__(self, active: np.ndarray, raised_at: np.ndarray):
+        self.active = active
+        self.raised_at = raised_at
+        self._mask: Optional[np.ndarray] = None
+
+    def mask(self) -> np.ndarray:
+        """배터리별 활성 알림 비트마스크 (규칙 비트는 ALERT_BITS)"""
+        if self._mask is None:
+            bits = np.left_shift(1, np.arange(self.active.shape[1], dtype=np.int64))
+            self._mask = (self.active * bits).sum(axis=1, dtype=np.int64)
+        return self._mask
+
+    def alerts(self, battery_ids: np.ndarray, values: Dict[str, np.ndarray],
+               name_of: Callable[[int], str], rules: Sequence[AlertRule] = NOTIFY_RULES) -> List[Dict]:
+        """활성 알림 목록 (timestamp는 발생 시각)"""
+        rows, rule_indices = np.nonzero(self.active)
+        if len(rows) == 0:
+            return []
+        timestamps = iso_timestamps(self.raised_at[rows, rule_indices])
+        return build_alerts(rows, rule_indices, battery_ids, values, timestamps, name_of, rules)
+
+
+class AlertEngine:
+    """배터리 × 규칙 알림 상태 머신
+
+    매 틱 전체 플릿을 규칙별 벡터 비교로 평가하고, 연속 틱 수/히스테리시스/쿨다운을
+    반영해 상태가 바뀐 (배터리, 규칙)에 대해서만 발생/해제 이벤트를 만든다.
+    이미 발생한 알림은 해제될 때까지 다시 만들지 않으므로 이벤트 수와 변환 비용은
+    플릿 크기 × 틱 수가 아니라 실제 상태 변화 수에 비례한다.
+    """
+
+    def __init__(self, name_of: Callable[[int], str], rules: Sequence[AlertRule] = NOTIFY_RULES,
+                 event_buffer: int = ALERT_EVENT_BUFFER):
+        self.name_of = name_of
+        self.rules = tuple(rules)
+        self.raise_ticks = np.array([rule.raise_ticks for rule in self.rules], dtype=np.int32)
+        self.clear_ticks = np.array([rule.clear_ticks for rule in self.rules], dtype=np.int32)
+        self.cooldown = np.array([rule.cooldown_seconds for rule in self.rules])
+        self._lock = threading.Lock()
+        self.events: Deque[Dict] = deque(maxlen=event_buffer)
+        self.sequence = 0
+        self._allocate(np.zeros(0, dtype=np.int64))
+
+    def _allocate(self, battery_ids: np.ndarray):
+        shape = (len(battery_ids), len(self.rules))
+        self.battery_ids = battery_ids.copy()
+        self.active = np.zeros(shape, dtype=bool)
+        self.breach_count = np.zeros(shape, dtype=np.int32)
+        self.recover_count = np.zeros(shape, dtype=np.int32)
+        self.raised_at = np.zeros(shape)
+        self.cleared_at = np.full(shape, -np.inf)
+        self._state: Optional[AlertState] = None
+
+    def _remap(self, battery_ids: np.ndarray):
+        """플릿 구성이 바뀌면 남은 배터리의 상태만 옮김 (사라진 배터리의 알림은 조용히 제거)"""
+        old = (self.battery_ids, self.active, self.breach_count, self.recover_count, self.raised_at, self.cleared_at)
+        self._allocate(battery_ids)
+        _, new_rows, old_rows = np.intersect1d(battery_ids, old[0], assume_unique=True, return_indices=True)
+        for target, source in zip(
+            (self.active, self.breach_count, self.recover_count, self.raised_at, self.cleared_at), old[1:],
+        ):
+            target[new_rows] = source[old_rows]
+
+    def update(self, timestamp: float, battery_ids: np.ndarray, values: Dict[str, np.ndarray]) -> List[Dict]:
+        """한 틱 평가 → 상태 전이 이벤트 목록 (발생/해제)"""
+        with self._lock:
+            if not np.array_equal(battery_ids, self.battery_ids):
+                self._remap(battery_ids)
+            if len(battery_ids) == 0:
+                return []
+
+            breached = alert_masks(values, self.rules)
+            recovered = np.column_stack([rule.recovered(values[rule.metric]) for rule in self.rules])
+            # 연속 틱 수 (필요한 틱 수에서 멈춤)
+            self.breach_count = np.where(breached, np.minimum(self.breach_count + 1, self.raise_ticks), 0)
+            self.recover_count = np.where(recovered, np.minimum(self.recover_count + 1, self.clear_ticks), 0)
+
+            raising = (~self.active & (self.breach_count >= self.raise_ticks)
+                       & (timestamp - self.cleared_at >= self.cooldown))
+            clearing = self.active & (self.recover_count >= self.clear_ticks)
+            self.active |= raising
+            self.active &= ~clearing
+            self.raised_at[raising] = timestamp
+            self.cleared_at[clearing] = timestamp
+
+            for index, rule in enumerate(self.rules):
+                ALERT_ACTIVE.labels(rule.key).set(int(self.active[:, index].sum()))
+            if not (raising.any() or clearing.any()):
+                return []
+            self._state = None
+            return self._emit(timestamp, battery_ids, values, raising, clearing)
+
+    def _emit(self, timestamp: float, battery_ids: np.ndarray, values: Dict[str, np.ndarray],
+              raising: np.ndarray, clearing: np.ndarray) -> List[Dict]:
+        now = datetime.fromtimestamp(timestamp).isoformat()
+        events = []
+        for kind, mask in ((EVENT_RAISED, raising), (EVENT_CLEARED, clearing)):
+            rows, rule_indices = np.nonzero(mask)
+            if len(rows) == 0:
+                continue
+            raised = iso_timestamps(self.raised_at[rows, rule_indices])
+            alerts = build_alerts(rows, rule_indices, battery_ids, values, [now] * len(rows), self.name_of, self.rules)
+            for alert, raised_at in zip(alerts, raised):
+                self.sequence += 1
+                alert.update(sequence=self.sequence, event=kind, raised_at=raised_at)
+                events.append(alert)
+            for index, count in zip(*np.unique(rule_indices, return_counts=True)):
+                ALERT_TRANSITIONS.labels(self.rules[index].key, kind).inc(int(count))
+        events.sort(key=lambda event: event["sequence"])
+        self.events.extend(events)
+        return events
+
+    def state(self) -> AlertState:
+        """현재 활성 알림 상태 (복사본 - 상태 전이가 없으면 이전 틱의 복사본 재사용)"""
+        with self._lock:
+            if self._state is None:
+                self._state = AlertState(self.active.copy(), self.raised_at.copy())
+            return self._state
+
+    def events_since(self, sequence: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        """sequence 이후의 이벤트 (오래된 순, 버퍼에서 밀려난 이벤트는 제외)"""
+        with self._lock:
+            if self.sequence <= sequence:
+                return []
+            # 버퍼는 sequence 순서 - 마지막 (현재 sequence - 요청 sequence)개가 대상
+            count = min(self.sequence - sequence, len(self.events))
+            events = list(self.events)[len(self.events) - count:]
+        return events[:limit] if limit is not None else events
+
+    def info(self) -> Dict:
+        with self._lock:
+            active = self.active.sum(axis=0).tolist()
+            return {
+                "sequence": self.sequence,
+                "active": {rule.key: count for rule, count in zip(self.rules, active)},
+                "rules": [
+                    {
+                        "rule": rule.key, "level": rule.level, "metric": rule.metric, "op": rule.op,
+                        "raise_at": rule.raise_at, "clear_at": rule.clear_at,
+                        "raise_ticks": rule.raise_ticks, "clear_ticks": rule.clear_ticks,
+                        "cooldown_seconds": rule.cooldown_seconds,
+                    }
+                    for rule in self.rules
+                ],
+            }
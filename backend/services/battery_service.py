@@ -1,191 +1,428 @@
 """
 배터리 서비스 - 배터리 데이터 처리 및 관리
 """
-import random
 import time
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 import numpy as np
 
+from services.alert_engine import AlertEngine, alert_masks, build_alerts
+from services.drift_detector import DriftDetector
+from services.fleet_snapshot import FleetSnapshot, battery_name
+from services.history_store import (
+    STATUS_LABELS, CELL_BALANCE_LABELS, CATEGORY_LABELS, DEFAULT_HISTORY_CAPACITY, HistoryStore,
+)
+from services.metrics import SHARED_STATE_REPLAYED_TICKS, SIMULATION_LATENCY
+from services.rollup_store import RollupStore
+from services.shared_state import SHARED_STATE_REPLAY_TICKS, SharedHistoryStore, SharedTelemetry
+from services.streaming_stats import STAT_METRICS, StreamingStats
+from services.telemetry_ingest import (
+    SOURCE_AUTO, SOURCE_INGEST, TELEMETRY_SOURCE, TELEMETRY_SOURCES, LiveFleetState, ReadingBatch,
+)
+from services.telemetry_store import TelemetryStore
+
+
+# 시뮬레이션 난수 열 순서 (generate_fleet_snapshot에서 한 번에 추출)
+_UNIFORM_COLUMNS = (
+    "voltage", "current", "temperature", "soc", "soh", "capacity_current", "power_current",
+    "power_peak", "energy_today", "energy_total", "internal_resistance", "status", "cell_balance",
+)
+
 
 class BatteryService:
     """배터리 데이터 관리 서비스"""
     
-    def __init__(self):
-        self.battery_count = 3
+    def __init__(self, history_capacity: int = DEFAULT_HISTORY_CAPACITY,
+                 battery_count: int = 3, seed: Optional[int] = None,
+                 telemetry_store: Optional[TelemetryStore] = None,
+                 telemetry_source: str = TELEMETRY_SOURCE,
+                 shared: Optional[SharedTelemetry] = None):
+        if telemetry_source not in TELEMETRY_SOURCES:
+            raise ValueError(f"지원하지 않는 텔레메트리 소스: {telemetry_source} (auto / simulator / ingest)")
+        self.battery_count = battery_count
         self.base_voltage = 3.7
         self.base_temperature = 25.0
-        self.history: List[Dict] = []
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        # 멀티 워커 공유 상태 - 히스토리는 공유 메모리, 프로듀서 워커만 새 틱을 기록
+        self.shared = shared
+        self.history = (
+            HistoryStore(capacity=history_capacity) if shared is None
+            else SharedHistoryStore(shared, capacity=history_capacity)
+        )
+        self._is_producer = False
+        # 마지막으로 반영한 공유 히스토리 틱 순번 (프로듀서가 아닌 워커)
+        self._replica_sequence = 0
+        self.rollups = RollupStore()
+        self.stats = StreamingStats()
+        # 배터리별 알림 상태 (틱마다 상태 전이만 이벤트로 기록)
+        self.alert_engine = AlertEngine(battery_name)
+        # 배터리 × 지표 드리프트 상태 (EWMA / CUSUM / 변화율)
+        self.drift_detector = DriftDetector()
+        self.telemetry_store = telemetry_store
+        self.latest_snapshot: Optional[FleetSnapshot] = None
+        self.telemetry_source = telemetry_source
+        # 수집 API로 받은 배터리별 최신 값 (첫 수신 시 생성)
+        self.live_state: Optional[LiveFleetState] = None
+        
+    @property
+    def is_live(self) -> bool:
+        """수신 데이터 모드 여부 (ingest 또는 auto에서 첫 수신 이후)"""
+        return self.telemetry_source == SOURCE_INGEST or (
+            self.telemetry_source == SOURCE_AUTO and self.live_state is not None
+        )
+    
+    @property
+    def is_replica(self) -> bool:
+        """멀티 워커 모드에서 다른 워커가 프로듀서인지 (이 워커는 공유 히스토리만 읽음)"""
+        return self.shared is not None and not self.shared.is_producer
+    
+    def next_snapshot(self) -> FleetSnapshot:
+        """다음 틱 스냅샷 - 수신 데이터 모드에서는 마지막으로 반영된 스냅샷, 아니면 시뮬레이션
+        
+        멀티 워커 모드에서 프로듀서가 아닌 워커는 프로듀서가 공유 히스토리에 기록한 마지막 틱
+        """
+        if self.shared is not None and not self._acquire_producer():
+            return self._replicate()
+        if not self.is_live:
+            return self.generate_fleet_snapshot()
+        if self.latest_snapshot is None or self.live_state is None:
+            # 아직 수신한 측정값이 없음 - 빈 플릿
+            self.live_state = self.live_state or LiveFleetState()
+            self._record_history(self._live_snapshot(np.empty(0, dtype=np.int64)))
+        return self.latest_snapshot
+    
+    def ingest_readings(self, batch: ReadingBatch) -> Dict:
+        """검증된 측정값 마이크로 배치 반영 - 플릿 상태 갱신 후 스냅샷 한 틱으로 히스토리에 기록
+        
+        통계/롤업은 새 측정값을 보고한 배터리만 갱신하고, 영구 저장소에는 측정값을 각자의 시각으로 저장한다.
+        """
+        if self.live_state is None:
+            self.live_state = LiveFleetState()
+        result, applied = self.live_state.apply(batch)
+        if len(applied) or self.latest_snapshot is None:
+            readings = self.live_state.readings(batch, applied)
+            snapshot = self._live_snapshot(readings["rows"])
+            self._record_history(snapshot, readings)
+        else:
+            # 반영된 측정값 없음 (모두 이미 반영된 시각보다 오래됨) - 새 틱을 기록하지 않음
+            snapshot = self.latest_snapshot
+        return {**result, "batteries": len(snapshot), "snapshot_timestamp": snapshot.timestamp.isoformat()}
+    
+    def _acquire_producer(self) -> bool:
+        """프로듀서 잠금 확인 - 이번에 새로 얻었으면 이전 프로듀서가 남긴 상태를 이어받음"""
+        if not self.shared.try_acquire():
+            return False
+        if not self._is_producer:
+            self._is_producer = True
+            if self.history.generation:
+                self._take_over()
+        return True
+    
+    def _take_over(self):
+        """프로듀서 승계 - 아직 반영하지 못한 틱을 반영하고 마지막 틱에서 이어서 기록
+
+        수신 데이터 모드였으면 수신 플릿 상태를, 시뮬레이션이었으면 플릿 크기를 마지막 틱으로 복원한다.
+        시드를 지정했으면 이전 프로듀서가 쓴 난수열을 반복하지 않도록 마지막 틱 순번을 섞어 다시 시드한다.
+        """
+        self._replicate()
+        snapshot = self.latest_snapshot
+        if snapshot is None or not len(snapshot):
+            return
+        if self.shared.producer_live:
+            self.live_state = LiveFleetState()
+            self.live_state.restore(snapshot.battery_ids, snapshot.metrics, snapshot.status,
+                                    snapshot.cell_balance, snapshot.timestamp.timestamp())
+            return
+        self.battery_count = len(snapshot)
+        if self.seed is not None:
+            self.rng = np.random.default_rng([self.seed, self._replica_sequence])
+    
+    def _replicate(self) -> FleetSnapshot:
+        """프로듀서 워커가 공유 히스토리에 기록한 새 틱 반영
+        
+        히스토리는 공유 메모리를 그대로 읽고, 통계/롤업/알림/드리프트 상태는 워커마다
+        같은 틱을 같은 순서로 반영해 갱신한다 (시작 시에는 최근 SHARED_STATE_REPLAY_TICKS 틱부터).
+        읽는 동안 프로듀서가 덮어쓴 슬롯은 건너뛴다 - 더 새로운 틱이라 다음 호출에서 반영된다.
+        """
+        history = self.history
+        history.sync()
+        rows = history.slots_after(self._replica_sequence, SHARED_STATE_REPLAY_TICKS)
+        expected = history.sequences[rows].tolist()
+        replayed = 0
+        for row, sequence in zip(rows.tolist(), expected):
+            slot = history.slot(row)
+            if slot is None or slot["sequence"] != sequence:
+                continue
+            timestamp = slot["timestamp"]
+            self.stats.update(timestamp, slot["battery_ids"], slot["metrics"], slot["status"], slot["reported"])
+            snapshot = FleetSnapshot(
+                timestamp=datetime.fromtimestamp(timestamp),
+                battery_ids=slot["battery_ids"],
+                metrics=slot["metrics"],
+                status=slot["status"],
+                cell_balance=slot["cell_balance"],
+                total_stats=slot["total_stats"],
+                environment=slot["environment"],
+            )
+            snapshot.reported = slot["reported"]
+            self._observe(snapshot, timestamp)
+            self._replica_sequence = sequence
+            replayed += 1
+        SHARED_STATE_REPLAYED_TICKS.inc(replayed)
+        if self.latest_snapshot is None:
+            # 프로듀서가 아직 첫 틱을 기록하지 않음 - 빈 플릿
+            self.latest_snapshot = self._live_snapshot(np.empty(0, dtype=np.int64), LiveFleetState())
+        return self.latest_snapshot
+    
+    def _live_snapshot(self, rows: np.ndarray, state: Optional[LiveFleetState] = None) -> FleetSnapshot:
+        """수신 플릿 상태 → 스냅샷 (이후 반영이 이전 스냅샷을 바꾸지 않도록 복사)
+        
+        시각은 마지막으로 반영된 측정값의 시각, 통계는 새 측정값을 보고한 배터리 행(rows)만 갱신
+        """
+        state = self.live_state if state is None else state
+        current_time = datetime.fromtimestamp(state.latest_timestamp) if state.latest_timestamp else datetime.now()
+        battery_ids = state.battery_ids.copy()
+        metrics = {name: values.copy() for name, values in state.metrics.items()}
+        status = state.status.copy()
+        self.stats.update(current_time.timestamp(), battery_ids, metrics, status, rows)
+        # 전체 통계는 보고 여부와 관계없이 플릿 전체의 현재 값으로 계산
+        fleet_totals = {"sum": np.array([metrics[name].sum() for name in STAT_METRICS]), "count": len(battery_ids)}
+        snapshot = FleetSnapshot(
+            timestamp=current_time,
+            battery_ids=battery_ids,
+            metrics=metrics,
+            status=status,
+            cell_balance=state.cell_balance.copy(),
+            total_stats=self._compute_total_stats(fleet_totals),
+            # 게이트웨이 측정값에는 환경 정보가 없음
+            environment={"outdoor_temperature": None, "humidity": None, "weather": None},
+        )
+        snapshot.reported = rows
+        return snapshot
         
     def generate_simulated_data(self) -> Dict:
         """시뮬레이션 배터리 데이터 생성"""
+        return self.generate_fleet_snapshot().to_dict()
+    
+    @SIMULATION_LATENCY.time()
+    def generate_fleet_snapshot(self, battery_count: Optional[int] = None) -> FleetSnapshot:
+        """벡터화 시뮬레이션 - 전체 플릿 지표를 배열로 생성 (딕셔너리 변환 없음)"""
+        
+        n = battery_count or self.battery_count
+        rng = self.rng
         
-        # 현재 시간
+        # 현재 시간 및 시간에 따른 변동
         current_time = datetime.now()
+        time_factor = time.time() % 100 / 100
         
-        # 배터리 데이터 생성
-        batteries = []
-        for i in range(1, self.battery_count + 1):
-            # 시간에 따른 변동
-            time_factor = time.time() % 100 / 100
-            
-            # 배터리별 특성
-            battery_data = {
-                "id": i,
-                "name": f"대동씨엠씨 1단 {i}호발전소",
-                "status": "정상" if random.random() > 0.1 else "점검중",
-                
-                # 전압 (V)
-                "voltage": round(self.base_voltage + random.uniform(-0.2, 0.2) + time_factor * 0.1, 2),
-                "voltage_max": round(self.base_voltage * 1.2, 2),
-                "voltage_min": round(self.base_voltage * 0.8, 2),
-                
-                # 전류 (A)
-                "current": round(random.uniform(0.5, 2.5), 2),
-                
-                # 온도 (°C)
-                "temperature": round(self.base_temperature + random.uniform(-5, 15), 2),
-                
-                # SOC (State of Charge) - 충전 상태 (%)
-                "soc": round(85 + random.uniform(-10, 10) - time_factor * 5, 1),
-                
-                # SOH (State of Health) - 수명 상태 (%)
-                "soh": round(95 + random.uniform(-5, 2), 1),
-                
-                # 용량
-                "capacity_current": round(77.48 + random.uniform(-5, 5), 2),  # kW
-                "capacity_rated": 99.54,  # kW
-                
-                # 전력
-                "power_current": round(30.3 + random.uniform(-10, 10), 2),  # kW
-                "power_peak": round(12.3 + random.uniform(-2, 2), 2),  # kW
-                
-                # 에너지
-                "energy_today": round(169.10 + random.uniform(-10, 10), 2),  # kWh
-                "energy_total": round(150 + i * 10 + random.uniform(0, 10), 2),  # kWh
-                
-                # 사용 시간
-                "runtime": f"{random.randint(1, 3)}.{random.randint(10, 99)}시간",
-                
-                # 충방전 횟수
-                "cycle_count": random.randint(50, 100),
-                
-                # 내부 저항 (mΩ)
-                "internal_resistance": round(random.uniform(10, 30), 1),
-                
-                # 셀 밸런스 상태
-                "cell_balance": "정상" if random.random() > 0.2 else "불균형",
-            }
-            
-            batteries.append(battery_data)
-        
-        # 전체 시스템 데이터
-        system_data = {
-            "timestamp": current_time.isoformat(),
-            "batteries": batteries,
-            
-            # 전체 통계
-            "total_stats": {
-                "total_power": round(sum(b["power_current"] for b in batteries), 2),
-                "total_energy": round(sum(b["energy_total"] for b in batteries), 2),
-                "average_soc": round(sum(b["soc"] for b in batteries) / len(batteries), 1),
-                "average_soh": round(sum(b["soh"] for b in batteries) / len(batteries), 1),
-                "average_temperature": round(sum(b["temperature"] for b in batteries) / len(batteries), 1),
-            },
-            
-            # 알림 및 경고
-            "alerts": self._generate_alerts(batteries),
-            
-            # 환경 데이터
-            "environment": {
-                "outdoor_temperature": round(12.0 + random.uniform(-2, 2), 1),
-                "humidity": round(94 + random.uniform(-5, 5), 0),
+        # 모든 균등 난수를 한 번에 추출 (열 = 지표)
+        u = dict(zip(_UNIFORM_COLUMNS, rng.random((len(_UNIFORM_COLUMNS), n))))
+        battery_ids = np.arange(1, n + 1, dtype=np.int64)
+        
+        metrics = {
+            # 전압 (V)
+            "voltage": np.round(self.base_voltage + (u["voltage"] * 0.4 - 0.2) + time_factor * 0.1, 2),
+            # 전류 (A)
+            "current": np.round(0.5 + u["current"] * 2.0, 2),
+            # 온도 (°C)
+            "temperature": np.round(self.base_temperature + (u["temperature"] * 20 - 5), 2),
+            # SOC (State of Charge) - 충전 상태 (%)
+            "soc": np.round(85 + (u["soc"] * 20 - 10) - time_factor * 5, 1),
+            # SOH (State of Health) - 수명 상태 (%)
+            "soh": np.round(95 + (u["soh"] * 7 - 5), 1),
+            # 용량 (kW)
+            "capacity_current": np.round(77.48 + (u["capacity_current"] * 10 - 5), 2),
+            # 전력 (kW)
+            "power_current": np.round(30.3 + (u["power_current"] * 20 - 10), 2),
+            "power_peak": np.round(12.3 + (u["power_peak"] * 4 - 2), 2),
+            # 에너지 (kWh)
+            "energy_today": np.round(169.10 + (u["energy_today"] * 20 - 10), 2),
+            "energy_total": np.round(150 + battery_ids * 10 + u["energy_total"] * 10, 2),
+            # 사용 시간 (시간)
+            "runtime_hours": rng.integers(1, 4, n) + rng.integers(10, 100, n) / 100,
+            # 충방전 횟수
+            "cycle_count": rng.integers(50, 101, n).astype(np.float64),
+            # 내부 저항 (mΩ)
+            "internal_resistance": np.round(10 + u["internal_resistance"] * 20, 1),
+        }
+        
+        # 상태 코드 (정상 / 점검중), 셀 밸런스 코드 (정상 / 불균형)
+        status = np.where(u["status"] > 0.1, STATUS_LABELS.index("정상"), STATUS_LABELS.index("점검중")).astype(np.int8)
+        cell_balance = np.where(u["cell_balance"] > 0.2, 0, 1).astype(np.int8)
+        
+        # 스트리밍 통계 갱신 (이번 틱 합계는 total_stats에 재사용)
+        tick_totals = self.stats.update(current_time.timestamp(), battery_ids, metrics, status)
+        
+        snapshot = FleetSnapshot(
+            timestamp=current_time,
+            battery_ids=battery_ids,
+            metrics=metrics,
+            status=status,
+            cell_balance=cell_balance,
+            total_stats=self._compute_total_stats(tick_totals),
+            environment={
+                "outdoor_temperature": round(12.0 + rng.uniform(-2, 2), 1),
+                "humidity": round(94 + rng.uniform(-5, 5), 0),
                 "weather": "맑음",
-            }
+            },
+        )
+        
+        # 히스토리에 저장 (컬럼형 링 버퍼)
+        self._record_history(snapshot)
+        
+        return snapshot
+    
+    def _compute_total_stats(self, tick_totals: Dict) -> Dict:
+        """전체 통계 - 스트리밍 통계 갱신 시 계산된 이번 틱 합계 사용"""
+        sums = dict(zip(STAT_METRICS, tick_totals["sum"].tolist()))
+        n = max(tick_totals["count"], 1)
+        
+        return {
+            "total_power": round(sums["power_current"], 2),
+            "total_energy": round(sums["energy_total"], 2),
+            "average_soc": round(sums["soc"] / n, 1),
+            "average_soh": round(sums["soh"] / n, 1),
+            "average_temperature": round(sums["temperature"] / n, 1),
         }
+    
+    def _record_history(self, snapshot: FleetSnapshot, readings: Optional[Dict] = None):
+        """스냅샷을 컬럼 단위로 링 버퍼에 기록
+        
+        readings(수신 측정값)가 있으면 영구 저장소에는 스냅샷 대신 측정값을 각자의 시각으로 저장
+        """
+        history = self.history
+        
+        if not np.array_equal(snapshot.battery_ids, history.battery_ids):
+            history.set_batteries(snapshot.battery_ids, snapshot.battery_meta())
         
-        # 히스토리에 저장 (최근 100개만 유지)
-        self.history.append(system_data)
-        if len(self.history) > 100:
-            self.history.pop(0)
-        
-        return system_data
-    
-    def _generate_alerts(self, batteries: List[Dict]) -> List[Dict]:
-        """알림 생성"""
-        alerts = []
-        
-        for battery in batteries:
-            # 온도 경고
-            if battery["temperature"] > 40:
-                alerts.append({
-                    "level": "경고",
-                    "battery_id": battery["id"],
-                    "message": f"{battery['name']}: 고온 감지 ({battery['temperature']}°C)",
-                    "timestamp": datetime.now().isoformat()
-                })
-            
-            # SOC 경고
-            if battery["soc"] < 20:
-                alerts.append({
-                    "level": "주의",
-                    "battery_id": battery["id"],
-                    "message": f"{battery['name']}: 낮은 충전 상태 ({battery['soc']}%)",
-                    "timestamp": datetime.now().isoformat()
-                })
-            
-            # SOH 경고
-            if battery["soh"] < 80:
-                alerts.append({
-                    "level": "경고",
-                    "battery_id": battery["id"],
-                    "message": f"{battery['name']}: 배터리 수명 저하 ({battery['soh']}%)",
-                    "timestamp": datetime.now().isoformat()
-                })
-            
-            # 셀 밸런스 경고
-            if battery["cell_balance"] == "불균형":
-                alerts.append({
-                    "level": "주의",
-                    "battery_id": battery["id"],
-                    "message": f"{battery['name']}: 셀 불균형 감지",
-                    "timestamp": datetime.now().isoformat()
-                })
-        
-        return alerts
+        reported = None
+        if snapshot.reported is not None:
+            reported = np.zeros(len(snapshot), dtype=np.bool_)
+            reported[snapshot.reported] = True
+        timestamp = snapshot.timestamp.timestamp()
+        history.append(timestamp, snapshot.metrics, snapshot.status,
+                       snapshot.cell_balance, {**snapshot.total_stats, **snapshot.environment}, reported)
+        if self.shared is not None:
+            self.shared.mark_source(self.is_live)
+        self._observe(snapshot, timestamp)
+        
+        # 영구 저장소로 전달 (백그라운드 스레드가 N틱 단위로 bulk insert)
+        if self.telemetry_store is None:
+            return
+        if readings is not None:
+            if len(readings["battery_ids"]):
+                self.telemetry_store.enqueue(readings["timestamps"], readings["battery_ids"], readings["metrics"],
+                                             readings["status"], readings["cell_balance"])
+        else:
+            self.telemetry_store.enqueue(timestamp, snapshot.battery_ids, snapshot.metrics,
+                                         snapshot.status, snapshot.cell_balance)
+    
+    def _observe(self, snapshot: FleetSnapshot, timestamp: float):
+        """한 틱을 파생 상태(롤업, 알림, 드리프트)에 반영하고 최신 스냅샷으로 등록"""
+        self.rollups.update(timestamp, snapshot.battery_ids, snapshot.metrics, snapshot.reported)
+        self.alert_engine.update(timestamp, snapshot.battery_ids, snapshot.alert_values())
+        snapshot.alert_state = self.alert_engine.state()
+        snapshot.drift = self.drift_detector.update(timestamp, snapshot.battery_ids, snapshot.metrics)
+        self.latest_snapshot = snapshot
+    
+    def _generate_alerts(self, batteries: List[Dict], timestamp: Optional[str] = None) -> List[Dict]:
+        """알림 생성 (히스토리 레코드용 - 알림 상태 없이 그 시점 값으로 규칙 평가)"""
+        n = len(batteries)
+        values = {
+            name: np.fromiter((b[name] for b in batteries), dtype=np.float64, count=n)
+            for name in {rule.metric for rule in self.alert_engine.rules} - {"cell_imbalance"}
+        }
+        values["cell_imbalance"] = np.fromiter((b["cell_balance"] == "불균형" for b in batteries), dtype=np.float64, count=n)
+        battery_ids = np.fromiter((b["id"] for b in batteries), dtype=np.int64, count=n)
+        
+        rows, rules = np.nonzero(alert_masks(values, self.alert_engine.rules))
+        return build_alerts(rows, rules, battery_ids, values, [timestamp or datetime.now().isoformat()] * len(rows),
+                            battery_name, self.alert_engine.rules)
     
     def get_battery_history(self, battery_id: Optional[int] = None, limit: int = 50) -> List[Dict]:
         """배터리 히스토리 조회"""
-        history = self.history[-limit:]
         
         if battery_id:
-            # 특정 배터리의 히스토리만 추출
-            filtered_history = []
-            for data in history:
-                for battery in data.get("batteries", []):
-                    if battery["id"] == battery_id:
-                        filtered_history.append({
-                            "timestamp": data["timestamp"],
-                            **battery
-                        })
-            return filtered_history
+            # 특정 배터리의 히스토리만 추출 (컬럼 슬라이스 → 응답 직전 변환)
+            index = self.history.battery_index(battery_id)
+            if index is None:
+                return []
+            return self.history.battery_records(index, limit)
         
+        history = self.history.snapshot_records(limit)
+        for data in history:
+            data["alerts"] = self._generate_alerts(data["batteries"], data["timestamp"])
         return history
     
-    def get_battery_statistics(self) -> Dict:
-        """배터리 통계 조회"""
-        if not self.history:
+    def get_battery_history_columns(self, battery_id: Optional[int] = None, limit: int = 50) -> Dict:
+        """배터리 히스토리 조회 - 컬럼형 (없는 배터리는 빈 배열)"""
+        if battery_id:
+            index = self.history.battery_index(battery_id)
+            if index is None:
+                return {"battery_id": battery_id, "name": None, "timestamps": [], "values": {}, "labels": CATEGORY_LABELS}
+            return self.history.battery_columns(index, limit)
+        return self.history.snapshot_columns(limit)
+    
+    def get_battery_history_range(self, start: datetime, end: datetime,
+                                  battery_id: Optional[int] = None, limit: int = 1000) -> List[Dict]:
+        """영구 저장소에서 기간별 히스토리 조회 (블로킹 - 스레드풀에서 호출)"""
+        if self.telemetry_store is None:
+            raise RuntimeError("텔레메트리 영구 저장소가 비활성화되어 있습니다")
+        return self.telemetry_store.query_range(start.timestamp(), end.timestamp(), battery_id, limit)
+    
+    def get_battery_history_range_columns(self, start: datetime, end: datetime,
+                                          battery_id: Optional[int] = None, limit: int = 1000) -> Dict:
+        """영구 저장소에서 기간별 히스토리 조회 - 컬럼형 (블로킹 - 스레드풀에서 호출)"""
+        if self.telemetry_store is None:
+            raise RuntimeError("텔레메트리 영구 저장소가 비활성화되어 있습니다")
+        return self.telemetry_store.query_range_columns(start.timestamp(), end.timestamp(), battery_id, limit)
+    
+    def iter_history_range(self, start: datetime, end: datetime, battery_id: Optional[int] = None,
+                           chunk_rows: int = 10000) -> Iterator[Dict[str, np.ndarray]]:
+        """기간 측정값을 컬럼 배열 청크로 순회 (내보내기용 - 블로킹, 청크 단위로 읽음)
+        
+        영구 저장소가 있으면 저장소에서, 없으면 메모리 히스토리 버퍼에 남은 구간에서 읽는다.
+        """
+        if self.telemetry_store is not None:
+            yield from self.telemetry_store.iter_range_arrays(start.timestamp(), end.timestamp(), battery_id, chunk_rows)
+            return
+        index = None
+        if battery_id is not None:
+            index = self.history.battery_index(battery_id)
+            if index is None:
+                return
+        yield from self.history.iter_range_arrays(start.timestamp(), end.timestamp(), index, chunk_rows)
+    
+    def get_battery_statistics(self, battery_id: Optional[int] = None, window: Optional[str] = None) -> Dict:
+        """배터리 통계 조회 (누적 스트리밍 통계 기반 - 히스토리 재스캔 없음)
+        
+        window: "1m" / "1h" / "24h" 롤링 윈도우 통계
+        battery_id: 특정 배터리의 누적 통계
+        """
+        if window is not None:
+            return self.stats.rolling(window)
+        
+        if battery_id is not None:
+            index = self.stats.battery_index(battery_id)
+            if index is None:
+                return {}
+            return {"battery_id": battery_id, **self.stats.battery(index)}
+        
+        snapshot = self.latest_snapshot
+        if snapshot is None:
             return {}
         
-        latest_data = self.history[-1]
+        status_counts = self.stats.latest_status_counts.tolist()
         
         return {
             "summary": {
-                "total_batteries": len(latest_data.get("batteries", [])),
-                "normal_count": sum(1 for b in latest_data.get("batteries", []) if b["status"] == "정상"),
-                "warning_count": sum(1 for b in latest_data.get("batteries", []) if b["status"] == "점검중"),
-                "error_count": sum(1 for b in latest_data.get("batteries", []) if b["status"] == "고장"),
+                "total_batteries": len(snapshot),
+                "normal_count": status_counts[STATUS_LABELS.index("정상")],
+                "warning_count": status_counts[STATUS_LABELS.index("점검중")],
+                "error_count": status_counts[STATUS_LABELS.index("고장")],
             },
-            "total_stats": latest_data.get("total_stats", {}),
-            "latest_alerts": latest_data.get("alerts", [])[:5],
+            "total_stats": dict(snapshot.total_stats),
+            "running_stats": self.stats.running(),
+            "latest_alerts": snapshot.alerts()[:5],
         }
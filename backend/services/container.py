@@ -0,0 +1,241 @@
+"""
+서비스 컨테이너 - 프로세스 전역 공유 서비스 및 스냅샷 캐시
+"""
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+import numpy as np
+
+from services.battery_service import BatteryService
+from services.ai_service import AIService
+from services.fleet_snapshot import FleetSnapshot
+from services.inference_executor import InferenceExecutor
+from services.shared_state import create_shared_telemetry
+from services.telemetry_ingest import IngestQueue, ReadingBatch
+from services.telemetry_store import create_telemetry_store
+
+
+# 스냅샷 유효 시간 (초) - 같은 틱 안의 요청은 같은 계산 결과를 공유
+SNAPSHOT_TTL_SECONDS = float(os.getenv("SNAPSHOT_TTL_SECONDS", "1.0"))
+
+
+class CurrentSnapshot:
+    """한 틱의 스냅샷 + AI 예측 (응답용 변환 결과는 최초 접근 시 한 번만 계산)"""
+
+    def __init__(self, version: int, fleet: FleetSnapshot, ai_service: AIService):
+        self.version = version
+        self.fleet = fleet
+        self.created_at = time.monotonic()
+        self._ai_service = ai_service
+        self._lock = threading.Lock()
+        self._battery_data: Optional[Dict] = None
+        self._prediction: Optional[Dict] = None
+        self._prediction_batch: Optional[Dict[str, np.ndarray]] = None
+        self._battery_index: Optional[Dict[int, int]] = None
+        self._derived: Dict[str, Any] = {}
+        self._prediction_task: Optional[asyncio.Task] = None
+
+    @property
+    def battery_data(self) -> Dict:
+        """generate_simulated_data 형식의 배터리 데이터"""
+        if self._battery_data is None:
+            with self._lock:
+                if self._battery_data is None:
+                    self._battery_data = self.fleet.to_dict()
+        return self._battery_data
+
+    @property
+    def prediction_batch(self) -> Dict[str, np.ndarray]:
+        """배치 예측 결과 배열 (틱당 한 번만 추론)"""
+        if self._prediction_batch is None:
+            with self._lock:
+                if self._prediction_batch is None:
+                    self._prediction_batch = self._ai_service.predict_fleet(
+                        self.fleet.battery_ids, self.fleet.features()
+                    )
+        return self._prediction_batch
+
+    @property
+    def prediction(self) -> Dict:
+        """predict_battery_health 형식의 예측 결과"""
+        if self._prediction is None:
+            batteries = self.battery_data["batteries"]
+            batch = self.prediction_batch
+            with self._lock:
+                if self._prediction is None:
+                    self._prediction = self._ai_service.build_prediction_response(batteries, batch)
+        return self._prediction
+
+    async def ensure_prediction(self, executor: InferenceExecutor) -> Dict:
+        """예측 결과를 이벤트 루프 밖에서 계산 (동시에 기다리는 요청은 같은 작업을 공유)"""
+        if self._prediction is not None:
+            return self._prediction
+        loop = asyncio.get_running_loop()
+        task = self._prediction_task
+        if task is None or task.get_loop() is not loop or (task.done() and task.exception() is not None):
+            task = self._prediction_task = loop.create_task(self._compute_prediction(executor))
+        return await asyncio.shield(task)
+
+    async def _compute_prediction(self, executor: InferenceExecutor) -> Dict:
+        if self._prediction_batch is None:
+            batch = await executor.predict(self.fleet.battery_ids, self.fleet.features())
+            with self._lock:
+                if self._prediction_batch is None:
+                    self._prediction_batch = batch
+        return await executor.run(lambda: self.prediction)
+
+    def memo(self, key: str, factory: Callable[[], Any]) -> Any:
+        """스냅샷에서 파생된 값 캐시 (인코딩 결과 등 - 스냅샷당 한 번만 계산)"""
+        if key not in self._derived:
+            value = factory()
+            with self._lock:
+                self._derived.setdefault(key, value)
+        return self._derived[key]
+
+    def index_of(self, battery_id: int) -> Optional[int]:
+        """배터리 ID → 스냅샷 행 인덱스"""
+        if self._battery_index is None:
+            self._battery_index = {bid: i for i, bid in enumerate(self.fleet.battery_ids.tolist())}
+        return self._battery_index.get(battery_id)
+
+    def find_battery(self, battery_id: int) -> Optional[Dict]:
+        """배터리 ID로 배터리 데이터 조회"""
+        index = self.index_of(battery_id)
+        return None if index is None else self.battery_data["batteries"][index]
+
+    def find_prediction(self, battery_id: int) -> Optional[Dict]:
+        """배터리 ID로 예측 결과 조회"""
+        index = self.index_of(battery_id)
+        return None if index is None else self.prediction["battery_predictions"][index]
+
+
+class ServiceContainer:
+    """공유 서비스 컨테이너
+
+    모든 라우터와 WebSocket 프로듀서가 같은 BatteryService / AIService 인스턴스와
+    같은 현재 스냅샷을 사용한다. 스냅샷은 TTL 동안 재사용되므로 HTTP 요청 수와
+    무관하게 시뮬레이션과 추론은 틱당 한 번만 수행된다.
+    """
+
+    def __init__(self, ttl_seconds: float = SNAPSHOT_TTL_SECONDS):
+        # 영구 저장소는 앱 시작 시 start()에서 연결 (import만으로 DB 파일/쓰기 스레드를 만들지 않음)
+        self.telemetry_store = None
+        # 멀티 워커 공유 상태 (SHARED_STATE=1 일 때만)
+        self.shared = create_shared_telemetry()
+        self.battery_service = BatteryService(telemetry_store=self.telemetry_store, shared=self.shared)
+        self.ai_service = AIService()
+        # 이벤트 루프 밖 배치 추론 (async 라우트 / WebSocket 프로듀서용)
+        self.inference = InferenceExecutor(self.ai_service)
+        # 수집 API 큐 - 마이크로 배치 단위로 ingest()에 전달
+        self.ingest_queue = IngestQueue(self.ingest)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._current: Optional[CurrentSnapshot] = None
+        self._version = 0
+
+    def _is_fresh(self, snapshot: Optional[CurrentSnapshot]) -> bool:
+        return snapshot is not None and time.monotonic() - snapshot.created_at < self.ttl_seconds
+
+    def current(self) -> CurrentSnapshot:
+        """현재 스냅샷 (TTL 경과 시에만 새로 생성)"""
+        snapshot = self._current
+        if self._is_fresh(snapshot):
+            return snapshot
+        with self._lock:
+            snapshot = self._current
+            if not self._is_fresh(snapshot):
+                snapshot = self._refresh_locked()
+        return snapshot
+
+    def refresh(self) -> CurrentSnapshot:
+        """TTL과 무관하게 새 스냅샷 생성 (프로듀서 틱)"""
+        with self._lock:
+            return self._refresh_locked()
+
+    async def current_async(self, prediction: bool = True) -> CurrentSnapshot:
+        """current()의 async 버전 - 시뮬레이션과 추론을 추론 실행기에서 수행
+
+        prediction=True 이면 반환 전에 스냅샷의 예측 결과까지 계산해 둔다.
+        """
+        snapshot = self._current
+        if not self._is_fresh(snapshot):
+            snapshot = await self.inference.run(self._current_with_battery_data)
+        if prediction:
+            await snapshot.ensure_prediction(self.inference)
+        return snapshot
+
+    def _current_with_battery_data(self) -> CurrentSnapshot:
+        snapshot = self.current()
+        snapshot.battery_data
+        return snapshot
+
+    async def refresh_async(self) -> CurrentSnapshot:
+        """refresh()의 async 버전 (예측 결과 포함)"""
+        snapshot = await self.inference.run(self.refresh)
+        await snapshot.ensure_prediction(self.inference)
+        return snapshot
+
+    async def latest_async(self) -> CurrentSnapshot:
+        """마지막으로 게시된 스냅샷 (예측 결과 포함) - 아직 없을 때만 생성하고 틱을 진행하지 않음"""
+        snapshot = self._current
+        if snapshot is None:
+            snapshot = await self.inference.run(self.current)
+        await snapshot.ensure_prediction(self.inference)
+        return snapshot
+
+    async def ingest(self, batch: ReadingBatch) -> Dict:
+        """수신 측정값 마이크로 배치 반영 후 새 스냅샷 게시 (추론 실행기에서 실행)"""
+        return await self.inference.run(self._ingest, batch)
+
+    def _ingest(self, batch: ReadingBatch) -> Dict:
+        with self._lock:
+            result = self.battery_service.ingest_readings(batch)
+            self._publish_locked(self.battery_service.latest_snapshot)
+        return result
+
+    async def read_locked(self, fn: Callable, *args) -> Any:
+        """히스토리/롤업 조회 - 추론 실행기에서 컨테이너 락을 잡고 실행
+
+        쓰기 (append, 배터리 목록 변경에 따른 재배치) 는 모두 이 락 안에서 일어나므로
+        조회 중에 버퍼가 바뀌지 않고, 이벤트 루프도 막지 않는다.
+        """
+        return await self.inference.run(self._call_locked, fn, *args)
+
+    def _call_locked(self, fn: Callable, *args) -> Any:
+        with self._lock:
+            return fn(*args)
+
+    def start(self):
+        """앱 시작 시 초기화 - 영구 저장소 연결 및 쓰기 스레드 시작"""
+        if self.telemetry_store is None:
+            self.telemetry_store = create_telemetry_store()
+            self.battery_service.telemetry_store = self.telemetry_store
+
+    def close(self):
+        """종료 시 정리 (추론/학습 실행기 종료, 영구 저장소 flush, 공유 상태 연결 해제)"""
+        self.inference.shutdown()
+        self.ai_service.close()
+        if self.telemetry_store is not None:
+            self.telemetry_store.close()
+            self.telemetry_store = self.battery_service.telemetry_store = None
+        if self.shared is not None:
+            self.shared.close()
+
+    def _refresh_locked(self) -> CurrentSnapshot:
+        fleet = self.battery_service.next_snapshot()
+        current = self._current
+        if current is not None and current.fleet is fleet:
+            # 수신 데이터 모드에서 새 측정값이 없음 - 계산 결과를 그대로 재사용
+            current.created_at = time.monotonic()
+            return current
+        return self._publish_locked(fleet)
+
+    def _publish_locked(self, fleet: FleetSnapshot) -> CurrentSnapshot:
+        self._version += 1
+        self._current = CurrentSnapshot(self._version, fleet, self.ai_service)
+        return self._current
+
+
+container = ServiceContainer()
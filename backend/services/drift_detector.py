@@ -0,0 +1,190 @@
+"""
+드리프트 탐지 - 배터리 × 지표별 스트리밍 상태 (시간 상수 EWMA 평균/분산, CUSUM, 변화율)
+"""
+import os
+import threading
+from typing import Dict, List, Optional
+import numpy as np
+
+
+# 감시 지표 (이름, 허용 변화율 - 분당 단위, 최소 표준편차 - 센서 분해능)
+# 허용 변화율을 넘는 추세는 값이 임계값 안이어도 이상으로 본다
+# 최소 표준편차는 값이 거의 변하지 않는 지표에서 분해능 한 단계 변화가 큰 편차로 보이지 않게 한다
+DRIFT_METRICS = (
+    ("temperature", 0.2, 0.1),
+    ("voltage", 0.01, 0.005),
+    ("internal_resistance", 0.5, 0.1),
+    ("soh", 0.1, 0.1),
+)
+
+# EWMA 시간 상수 (초) - 빠른 평균 / 느린 평균(기준선, 분산)
+DRIFT_FAST_SECONDS = float(os.getenv("DRIFT_FAST_SECONDS", "60"))
+DRIFT_SLOW_SECONDS = float(os.getenv("DRIFT_SLOW_SECONDS", "600"))
+
+# CUSUM 허용량 k / 결정 구간 h (표준화 값 기준)
+DRIFT_CUSUM_K = float(os.getenv("DRIFT_CUSUM_K", "1.0"))
+DRIFT_CUSUM_H = float(os.getenv("DRIFT_CUSUM_H", "12.0"))
+
+# 표준화 편차 z가 이 값 이상이면 이상 (점수 1)
+DRIFT_Z_LIMIT = 6.0
+
+# 관측 시간이 빠른 시간 상수보다 짧은 배터리는 점수 0 (기준선 학습 중)
+DRIFT_WARMUP_SECONDS = DRIFT_FAST_SECONDS
+
+_EPSILON = 1e-12
+
+
+def _excess(ratio: np.ndarray) -> np.ndarray:
+    """한계 대비 비율 → 점수 (한계의 절반까지는 0, 한계에서 1) - np.clip보다 빠른 제자리 연산"""
+    score = 2.0 * ratio
+    score -= 1.0
+    np.maximum(score, 0.0, out=score)
+    return np.minimum(score, 1.0, out=score)
+
+
+class DriftResult:
+    """한 틱의 드리프트 평가 결과 (배터리 × 지표 배열)"""
+
+    def __init__(self, metrics: tuple, score: np.ndarray, metric_scores: np.ndarray,
+                 trend: np.ndarray, z: np.ndarray, cusum: np.ndarray):
+        self.metrics = metrics
+        # 배터리별 드리프트 점수 (0~1, 지표 점수의 최댓값)
+        self.score = score
+        self.metric_scores = metric_scores
+        # 분당 변화율 / 기준선 대비 표준화 편차 / CUSUM (양·음 중 큰 값)
+        self.trend = trend
+        self.z = z
+        self.cusum = cusum
+
+    def top(self, battery_ids: np.ndarray, limit: int) -> List[Dict]:
+        """점수가 높은 배터리부터 상세 정보 (점수 0 제외)"""
+        order = np.argsort(-self.score, kind="stable")[:limit]
+        order = order[self.score[order] > 0]
+        return [self.battery(battery_ids, row) for row in order.tolist()]
+
+    def battery(self, battery_ids: np.ndarray, row: int) -> Dict:
+        """배터리 한 대의 지표별 상세"""
+        return {
+            "battery_id": int(battery_ids[row]),
+            "drift_score": round(float(self.score[row]), 3),
+            "metric": self.metrics[int(self.metric_scores[row].argmax())] if self.score[row] > 0 else None,
+            "metrics": {
+                name: {
+                    "score": round(float(self.metric_scores[row, j]), 3),
+                    "trend_per_minute": round(float(self.trend[row, j]), 4),
+                    "z": round(float(self.z[row, j]), 2),
+                    "cusum": round(float(self.cusum[row, j]), 2),
+                }
+                for j, name in enumerate(self.metrics)
+            },
+        }
+
+
+class DriftDetector:
+    """배터리 × 지표 스트리밍 드리프트 탐지기
+
+    틱마다 전체 플릿을 한 번의 벡터 연산으로 갱신한다 (배터리당 O(1), 메모리는
+    배터리 수 × 지표 수 고정). EWMA는 시간 상수 기반이라 틱 간격이 바뀌어도 같은 의미를 가진다.
+    - 변화율: (빠른 EWMA - 느린 EWMA) / 두 평균의 지연 차이 → 선형 추세의 분당 기울기
+    - z: 느린 EWMA 기준선과 분산으로 표준화한 현재 값
+    - CUSUM: z의 누적 합 (작은 지속 편차 감지)
+    """
+
+    def __init__(self, metrics=DRIFT_METRICS, fast_seconds: float = DRIFT_FAST_SECONDS,
+                 slow_seconds: float = DRIFT_SLOW_SECONDS, cusum_k: float = DRIFT_CUSUM_K,
+                 cusum_h: float = DRIFT_CUSUM_H, warmup_seconds: float = DRIFT_WARMUP_SECONDS):
+        if not 0 < fast_seconds < slow_seconds:
+            raise ValueError("fast_seconds는 0보다 크고 slow_seconds보다 작아야 합니다")
+        self.metrics = tuple(name for name, _, _ in metrics)
+        self.rate_limits = np.array([limit for _, limit, _ in metrics], dtype=np.float64)
+        self.min_variance = np.array([floor for _, _, floor in metrics], dtype=np.float64) ** 2
+        self.fast_seconds = fast_seconds
+        self.slow_seconds = slow_seconds
+        self.cusum_k = cusum_k
+        self.cusum_h = cusum_h
+        self.warmup_seconds = warmup_seconds
+        self._lock = threading.Lock()
+        self._allocate(np.zeros(0, dtype=np.int64))
+
+    def _allocate(self, battery_ids: np.ndarray):
+        shape = (len(battery_ids), len(self.metrics))
+        self.battery_ids = battery_ids.copy()
+        self.fast = np.zeros(shape)
+        self.slow = np.zeros(shape)
+        self.var = np.zeros(shape)
+        self.cusum_pos = np.zeros(shape)
+        self.cusum_neg = np.zeros(shape)
+        self.last_timestamp = np.full(len(battery_ids), np.nan)
+        self.observed = np.zeros(len(battery_ids))
+
+    def _remap(self, battery_ids: np.ndarray):
+        """플릿 구성이 바뀌면 남은 배터리의 상태만 옮김 (새 배터리는 기준선 학습부터)"""
+        names = ("fast", "slow", "var", "cusum_pos", "cusum_neg", "last_timestamp", "observed")
+        old_ids = self.battery_ids
+        old = [getattr(self, name) for name in names]
+        self._allocate(battery_ids)
+        _, new_rows, old_rows = np.intersect1d(battery_ids, old_ids, assume_unique=True, return_indices=True)
+        for name, source in zip(names, old):
+            getattr(self, name)[new_rows] = source[old_rows]
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.fast, self.slow, self.var, self.cusum_pos, self.cusum_neg, self.last_timestamp, self.observed)
+        return sum(a.nbytes for a in arrays)
+
+    def update(self, timestamp: float, battery_ids: np.ndarray, metrics: Dict[str, np.ndarray]) -> DriftResult:
+        """한 틱 반영 → 배터리별 드리프트 점수"""
+        with self._lock:
+            if not np.array_equal(battery_ids, self.battery_ids):
+                self._remap(battery_ids)
+            x = np.column_stack([np.asarray(metrics[name], dtype=np.float64) for name in self.metrics]) \
+                if len(battery_ids) else np.zeros((0, len(self.metrics)))
+
+            first = np.isnan(self.last_timestamp)
+            dt = np.where(first, 0.0, np.maximum(timestamp - self.last_timestamp, 0.0))[:, None]
+            self.last_timestamp[:] = timestamp
+            self.observed += dt[:, 0]
+
+            # 갱신 전 기준선으로 표준화 (현재 값이 기준선에 섞이기 전), 기준선 학습 중에는 z = 0
+            warm = (self.observed >= self.warmup_seconds)[:, None]
+            std = np.sqrt(np.maximum(self.var, self.min_variance))
+            z = np.where(warm, (x - self.slow) / std, 0.0)
+
+            # 시간 상수 EWMA - 관측 시간이 시간 상수보다 짧은 동안은 누적 평균 (첫 관측 값에 치우치지 않도록)
+            share = np.where(first, 1.0, dt[:, 0] / np.maximum(self.observed, _EPSILON))[:, None]
+            a_fast = np.maximum(-np.expm1(-dt / self.fast_seconds), share)
+            a_slow = np.maximum(-np.expm1(-dt / self.slow_seconds), share)
+            delta = x - self.slow
+            self.fast += a_fast * (x - self.fast)
+            self.slow += a_slow * delta
+            self.var = (1 - a_slow) * (self.var + a_slow * delta ** 2)
+
+            # CUSUM (결정 구간의 2배에서 멈춤 - 편차가 사라지면 빨리 복귀)
+            limit = 2 * self.cusum_h
+            for cusum, step in ((self.cusum_pos, z), (self.cusum_neg, -z)):
+                cusum += step
+                cusum -= self.cusum_k
+                np.maximum(cusum, 0.0, out=cusum)
+                np.minimum(cusum, limit, out=cusum)
+            cusum = np.maximum(self.cusum_pos, self.cusum_neg)
+
+            # 선형 추세의 EWMA 지연은 시간 상수와 같으므로 평균 차이 / 지연 차이 = 기울기
+            trend = (self.fast - self.slow) / ((self.slow_seconds - self.fast_seconds) / 60.0)
+
+            metric_scores = _excess(np.abs(trend) / self.rate_limits)
+            np.maximum(metric_scores, _excess(np.abs(z) / DRIFT_Z_LIMIT), out=metric_scores)
+            np.maximum(metric_scores, _excess(cusum / self.cusum_h), out=metric_scores)
+            metric_scores[~warm[:, 0]] = 0.0
+            score = metric_scores.max(axis=1) if len(self.metrics) else np.zeros(len(battery_ids))
+            return DriftResult(self.metrics, score, metric_scores, trend, z, cusum)
+
+    def info(self) -> Dict:
+        return {
+            "metrics": dict(zip(self.metrics, self.rate_limits.tolist())),
+            "fast_seconds": self.fast_seconds,
+            "slow_seconds": self.slow_seconds,
+            "cusum_k": self.cusum_k,
+            "cusum_h": self.cusum_h,
+            "batteries": len(self.battery_ids),
+            "memory_bytes": self.nbytes,
+        }
@@ -0,0 +1,138 @@
+"""
+플릿 스냅샷 - 한 틱의 전체 배터리 데이터를 컬럼 배열로 보관
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+import numpy as np
+
+from services.alert_engine import AlertState, alert_masks, build_alerts
+from services.drift_detector import DriftResult
+from services.history_store import STATUS_LABELS, CELL_BALANCE_LABELS
+
+
+# 배터리 정적 사양
+VOLTAGE_MAX = 4.44
+VOLTAGE_MIN = 2.96
+CAPACITY_RATED = 99.54
+
+
+def battery_name(battery_id: int) -> str:
+    """배터리 표시 이름"""
+    return f"대동씨엠씨 1단 {battery_id}호발전소"
+
+
+class FleetSnapshot:
+    """한 틱의 플릿 데이터 (컬럼 배열)
+
+    시뮬레이터와 히스토리/추론 경로는 배열을 그대로 사용하고,
+    배터리별 딕셔너리는 to_dict()/to_batteries() 호출 시에만 만든다.
+    """
+
+    def __init__(self, timestamp: datetime, battery_ids: np.ndarray, metrics: Dict[str, np.ndarray],
+                 status: np.ndarray, cell_balance: np.ndarray, total_stats: Dict, environment: Dict):
+        self.timestamp = timestamp
+        self.battery_ids = battery_ids
+        self.metrics = metrics
+        self.status = status
+        self.cell_balance = cell_balance
+        self.total_stats = total_stats
+        self.environment = environment
+        # 알림 엔진이 이 틱을 평가한 결과 (없으면 현재 값 기준 조건만 표시)
+        self.alert_state: Optional[AlertState] = None
+        # 드리프트 탐지기가 이 틱을 평가한 결과 (없으면 드리프트 점수 0)
+        self.drift: Optional[DriftResult] = None
+        # 이번 틱에 새 측정값을 보고한 배터리 행 (None은 전체 - 수신 데이터 모드에서는 나머지는 직전 값 유지)
+        self.reported: Optional[np.ndarray] = None
+        self._alerts: Optional[List[Dict]] = None
+
+    def __len__(self) -> int:
+        return len(self.battery_ids)
+
+    @property
+    def cell_imbalance(self) -> np.ndarray:
+        return self.cell_balance == CELL_BALANCE_LABELS.index("불균형")
+
+    def features(self) -> Dict[str, np.ndarray]:
+        """AIService.predict_batch 입력 특성"""
+        return {
+            "soc": self.metrics["soc"],
+            "soh": self.metrics["soh"],
+            "temperature": self.metrics["temperature"],
+            "voltage": self.metrics["voltage"],
+            "current": self.metrics["current"],
+            "cycle_count": self.metrics["cycle_count"],
+            "cell_imbalance": self.cell_imbalance,
+            **({"drift_score": self.drift.score} if self.drift is not None else {}),
+            # 알림 엔진 상태 - 알림 규칙에 해당하는 AI 경고가 활성 알림과 일치하도록
+            **({"active_alerts": self.alert_state.mask()} if self.alert_state is not None else {}),
+        }
+
+    def battery_meta(self) -> List[Dict]:
+        """배터리별 정적 메타데이터"""
+        return [
+            {
+                "name": battery_name(battery_id),
+                "voltage_max": VOLTAGE_MAX,
+                "voltage_min": VOLTAGE_MIN,
+                "capacity_rated": CAPACITY_RATED,
+            }
+            for battery_id in self.battery_ids.tolist()
+        ]
+
+    def alert_values(self) -> Dict[str, np.ndarray]:
+        """알림 규칙 입력 (지표 + 셀 불균형 0/1)"""
+        return {**self.metrics, "cell_imbalance": self.cell_imbalance.astype(np.float64)}
+
+    def alerts(self) -> List[Dict]:
+        """활성 알림 목록 (조건에 걸린 배터리만 딕셔너리로 변환, timestamp는 발생 시각)"""
+        if self._alerts is None:
+            values = self.alert_values()
+            if self.alert_state is not None:
+                self._alerts = self.alert_state.alerts(self.battery_ids, values, battery_name)
+            else:
+                rows, rules = np.nonzero(alert_masks(values))
+                self._alerts = build_alerts(rows, rules, self.battery_ids, values,
+                                            [self.timestamp.isoformat()] * len(rows), battery_name)
+        return self._alerts
+
+    def to_batteries(self) -> List[Dict]:
+        """배터리별 딕셔너리 목록"""
+        columns = {name: values.tolist() for name, values in self.metrics.items()}
+        status = self.status.tolist()
+        cell_balance = self.cell_balance.tolist()
+
+        return [
+            {
+                "id": battery_id,
+                "name": battery_name(battery_id),
+                "status": STATUS_LABELS[status[i]],
+                "voltage": columns["voltage"][i],
+                "voltage_max": VOLTAGE_MAX,
+                "voltage_min": VOLTAGE_MIN,
+                "current": columns["current"][i],
+                "temperature": columns["temperature"][i],
+                "soc": columns["soc"][i],
+                "soh": columns["soh"][i],
+                "capacity_current": columns["capacity_current"][i],
+                "capacity_rated": CAPACITY_RATED,
+                "power_current": columns["power_current"][i],
+                "power_peak": columns["power_peak"][i],
+                "energy_today": columns["energy_today"][i],
+                "energy_total": columns["energy_total"][i],
+                "runtime": f"{columns['runtime_hours'][i]:.2f}시간",
+                "cycle_count": int(columns["cycle_count"][i]),
+                "internal_resistance": columns["internal_resistance"][i],
+                "cell_balance": CELL_BALANCE_LABELS[cell_balance[i]],
+            }
+            for i, battery_id in enumerate(self.battery_ids.tolist())
+        ]
+
+    def to_dict(self) -> Dict:
+        """generate_simulated_data 응답 형식의 시스템 데이터"""
+        return {
+            "timestamp": self.timestamp.isoformat(),
+            "batteries": self.to_batteries(),
+            "total_stats": dict(self.total_stats),
+            "alerts": self.alerts(),
+            "environment": dict(self.environment),
+        }
@@ -0,0 +1,191 @@
+"""
+히스토리 내보내기 - 기간 측정값 청크를 CSV / NDJSON / Arrow IPC 스트림으로 인코딩
+"""
+import abc
+import csv
+import io
+import os
+from typing import Dict, Iterable, Iterator, List
+import numpy as np
+
+from services.alert_engine import iso_timestamps
+from services.history_store import BATTERY_METRICS, CELL_BALANCE_LABELS, STATUS_LABELS
+from services.metrics import HISTORY_EXPORT_ROWS
+from services.serialization import encode_json
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:  # 선택 의존성 - 없으면 Arrow 형식만 비활성화 (NumPy 버전 불일치 포함)
+    pyarrow = None
+
+
+# 청크당 행 수 (측정값 = 배터리 × 시각) - 내보내기 중 메모리 사용량은 이 크기에 비례
+EXPORT_CHUNK_ROWS = int(os.getenv("HISTORY_EXPORT_CHUNK_ROWS", "10000"))
+
+EXPORT_CSV = "csv"
+EXPORT_NDJSON = "ndjson"
+EXPORT_ARROW = "arrow"
+EXPORT_PATTERN = f"^({EXPORT_CSV}|{EXPORT_NDJSON}|{EXPORT_ARROW})$"
+
+# 내보내기 열 순서
+EXPORT_COLUMNS = ("timestamp", "battery_id", *(name for name, _ in BATTERY_METRICS), "status", "cell_balance")
+
+_STATUS = np.array(STATUS_LABELS, dtype=object)
+_CELL_BALANCE = np.array(CELL_BALANCE_LABELS, dtype=object)
+
+
+class ExportUnavailableError(RuntimeError):
+    """요청한 내보내기 형식을 쓸 수 없음 (선택 의존성 없음)"""
+
+
+def _value_columns(chunk: Dict[str, np.ndarray]) -> List[list]:
+    """청크 → EXPORT_COLUMNS 순서의 파이썬 값 목록 (시각은 ISO 문자열, 범주형은 라벨, 값 없음은 None)"""
+    columns = [iso_timestamps(chunk["timestamp"]), chunk["battery_id"].tolist()]
+    for name, digits in BATTERY_METRICS:
+        values = chunk[name].astype(np.float64)
+        missing = np.isnan(values)
+        if digits is None:
+            rounded = np.rint(np.where(missing, 0.0, values)).astype(np.int64)
+        else:
+            rounded = np.round(values, digits)
+        columns.append((np.where(missing, None, rounded) if missing.any() else rounded).tolist())
+    columns.append(_STATUS[chunk["status"]].tolist())
+    columns.append(_CELL_BALANCE[chunk["cell_balance"]].tolist())
+    return columns
+
+
+class ExportEncoder(abc.ABC):
+    """청크 단위 인코더 - stream()은 청크를 하나씩 읽어 바이트 조각을 내보낸다
+
+    청크를 하나 인코딩해 내보낸 뒤에야 다음 청크를 읽으므로 메모리는 청크 크기로 고정되고,
+    StreamingResponse가 이전 조각의 전송을 기다리는 동안 읽기도 멈춘다 (백프레셔).
+    """
+
+    format = ""
+    media_type = ""
+    extension = ""
+
+    def header(self) -> bytes:
+        return b""
+
+    @abc.abstractmethod
+    def encode(self, chunk: Dict[str, np.ndarray]) -> bytes:
+        """청크 하나 → 바이트 조각"""
+
+    def footer(self) -> bytes:
+        return b""
+
+    def stream(self, chunks: Iterable[Dict[str, np.ndarray]]) -> Iterator[bytes]:
+        rows = 0
+        try:
+            header = self.header()
+            if header:
+                yield header
+            for chunk in chunks:
+                count = len(chunk["timestamp"])
+                if count:
+                    yield self.encode(chunk)
+                    rows += count
+            footer = self.footer()
+            if footer:
+                yield footer
+        finally:
+            HISTORY_EXPORT_ROWS.labels(self.format).inc(rows)
+
+
+class CsvEncoder(ExportEncoder):
+    format = EXPORT_CSV
+    media_type = "text/csv"
+    extension = "csv"
+
+    def header(self) -> bytes:
+        # 스프레드시트에서 한글이 깨지지 않도록 UTF-8 BOM
+        return ("\ufeff" + ",".join(EXPORT_COLUMNS) + "\r\n").encode("utf-8")
+
+    def encode(self, chunk: Dict[str, np.ndarray]) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(zip(*_value_columns(chunk)))
+        return buffer.getvalue().encode("utf-8")
+
+
+class NdjsonEncoder(ExportEncoder):
+    format = EXPORT_NDJSON
+    media_type = "application/x-ndjson"
+    extension = "ndjson"
+
+    def encode(self, chunk: Dict[str, np.ndarray]) -> bytes:
+        return b"".join(
+            encode_json(dict(zip(EXPORT_COLUMNS, row))) + b"\n"
+            for row in zip(*_value_columns(chunk))
+        )
+
+
+class ArrowEncoder(ExportEncoder):
+    """Arrow IPC 스트림 형식 - 청크마다 레코드 배치 하나 (범주형은 딕셔너리 인코딩)"""
+
+    format = EXPORT_ARROW
+    media_type = "application/vnd.apache.arrow.stream"
+    extension = "arrows"
+
+    def __init__(self):
+        if pyarrow is None:
+            raise ExportUnavailableError("Arrow 형식을 사용하려면 pyarrow가 필요합니다")
+        category = pyarrow.dictionary(pyarrow.int8(), pyarrow.string())
+        self.schema = pyarrow.schema([
+            ("timestamp", pyarrow.timestamp("ms", tz="UTC")),
+            ("battery_id", pyarrow.int64()),
+            *[(name, pyarrow.int64() if digits is None else pyarrow.float64()) for name, digits in BATTERY_METRICS],
+            ("status", category),
+            ("cell_balance", category),
+        ])
+        self._status = pyarrow.array(STATUS_LABELS)
+        self._cell_balance = pyarrow.array(CELL_BALANCE_LABELS)
+        self._sink = io.BytesIO()
+        self._writer = None
+
+    def _drain(self) -> bytes:
+        data = self._sink.getvalue()
+        self._sink.seek(0)
+        self._sink.truncate()
+        return data
+
+    def header(self) -> bytes:
+        # 스키마 메시지
+        self._writer = pyarrow.ipc.new_stream(self._sink, self.schema)
+        return self._drain()
+
+    def encode(self, chunk: Dict[str, np.ndarray]) -> bytes:
+        arrays = [
+            pyarrow.array(np.rint(chunk["timestamp"] * 1000).astype(np.int64), type=self.schema.field("timestamp").type),
+            pyarrow.array(chunk["battery_id"].astype(np.int64)),
+        ]
+        for name, digits in BATTERY_METRICS:
+            values = chunk[name].astype(np.float64)
+            missing = np.isnan(values)
+            if digits is None:
+                values = np.rint(np.where(missing, 0.0, values)).astype(np.int64)
+            else:
+                values = np.round(values, digits)
+            arrays.append(pyarrow.array(values, mask=missing if missing.any() else None))
+        arrays.append(pyarrow.DictionaryArray.from_arrays(pyarrow.array(chunk["status"], pyarrow.int8()), self._status))
+        arrays.append(pyarrow.DictionaryArray.from_arrays(
+            pyarrow.array(chunk["cell_balance"], pyarrow.int8()), self._cell_balance,
+        ))
+        self._writer.write_batch(pyarrow.record_batch(arrays, schema=self.schema))
+        return self._drain()
+
+    def footer(self) -> bytes:
+        # 스트림 종료 표시 (중간에 끊긴 전송은 이 표시가 없어 수신 측에서 구분 가능)
+        self._writer.close()
+        return self._drain()
+
+
+_ENCODERS = {EXPORT_CSV: CsvEncoder, EXPORT_NDJSON: NdjsonEncoder, EXPORT_ARROW: ArrowEncoder}
+
+
+def create_encoder(export_format: str) -> ExportEncoder:
+    """형식 이름 → 인코더 (Arrow 의존성이 없으면 ExportUnavailableError)"""
+    if export_format not in _ENCODERS:
+        raise ValueError(f"지원하지 않는 내보내기 형식: {export_format}")
+    return _ENCODERS[export_format]()
@@ -0,0 +1,413 @@
+"""
+히스토리 저장소 - NumPy 기반 고정 용량 컬럼형 링 버퍼
+"""
+import os
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+
+from services.serialization import epoch_millis
+
+
+# 배터리별 수치 지표 (이름, 반올림 자릿수 - None은 정수형)
+BATTERY_METRICS = (
+    ("voltage", 2),
+    ("current", 2),
+    ("temperature", 2),
+    ("soc", 1),
+    ("soh", 1),
+    ("capacity_current", 2),
+    ("power_current", 2),
+    ("power_peak", 2),
+    ("energy_today", 2),
+    ("energy_total", 2),
+    ("runtime_hours", 2),
+    ("cycle_count", None),
+    ("internal_resistance", 1),
+)
+
+# 누적 지표 - 값이 계속 커져 float32 (유효 숫자 약 7자리) 로는 소수 자릿수가 깨지므로 float64 로 저장
+CUMULATIVE_METRICS = frozenset({"energy_today", "energy_total", "runtime_hours", "cycle_count"})
+
+
+def metric_dtype(name: str) -> type:
+    """배터리 지표 컬럼 dtype (누적 지표는 float64, 나머지는 메모리 절약을 위해 float32)"""
+    return np.float64 if name in CUMULATIVE_METRICS else np.float32
+
+
+# 시스템 전체 지표 (이름, 반올림 자릿수) - 슬롯당 값 하나이므로 모두 float64
+SYSTEM_METRICS = (
+    ("total_power", 2),
+    ("total_energy", 2),
+    ("average_soc", 1),
+    ("average_soh", 1),
+    ("average_temperature", 1),
+    ("outdoor_temperature", 1),
+    ("humidity", 0),
+)
+
+# 범주형 필드 코드표
+STATUS_LABELS = ("정상", "점검중", "고장")
+CELL_BALANCE_LABELS = ("정상", "불균형")
+CATEGORY_LABELS = {"status": STATUS_LABELS, "cell_balance": CELL_BALANCE_LABELS}
+
+# 기본 용량 (타임 슬롯 수) - 환경 변수로 조정 가능
+DEFAULT_HISTORY_CAPACITY = int(os.getenv("BATTERY_HISTORY_CAPACITY", "100000"))
+
+# 전체 샘플 수 상한 (타임 슬롯 × 배터리 수) - 대규모 플릿의 메모리 사용량 제한
+DEFAULT_HISTORY_MAX_SAMPLES = int(os.getenv("BATTERY_HISTORY_MAX_SAMPLES", "2000000"))
+
+
+class HistoryStore:
+    """배터리 × 타임 슬롯 컬럼형 링 버퍼
+
+    지표마다 (2 × capacity, battery_count) 배열을 하나씩 두고 각 행을
+    i 와 i + capacity 위치에 두 번 기록한다. 덕분에 최근 N개 구간은 항상
+    연속된 슬라이스가 되어 배터리별 조회가 복사 없이 뷰로 반환된다.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_HISTORY_CAPACITY, battery_count: int = 0,
+                 max_samples: int = DEFAULT_HISTORY_MAX_SAMPLES):
+        if capacity < 1:
+            raise ValueError("capacity는 1 이상이어야 합니다")
+        self.requested_capacity = capacity
+        self.max_samples = max_samples
+        self._allocate(battery_count)
+
+    def _allocate(self, battery_count: int):
+        """버퍼 할당 (배터리 수가 바뀌면 히스토리 초기화)"""
+        self.capacity = max(1, min(self.requested_capacity, self.max_samples // max(battery_count, 1)))
+        rows = 2 * self.capacity
+        self.battery_count = battery_count
+        self.battery_ids = np.arange(1, battery_count + 1, dtype=np.int64)
+        self.battery_meta: List[Dict] = [{} for _ in range(battery_count)]
+        self._id_index: Dict[int, int] = {}
+
+        self.timestamps = np.zeros(rows, dtype=np.float64)
+        self.metrics = {
+            name: np.zeros((rows, battery_count), dtype=metric_dtype(name))
+            for name, _ in BATTERY_METRICS
+        }
+        self.status = np.zeros((rows, battery_count), dtype=np.int8)
+        self.cell_balance = np.zeros((rows, battery_count), dtype=np.int8)
+        # 그 슬롯에서 새 측정값을 보고한 배터리 (수신 데이터 모드에서는 나머지는 직전 값 유지)
+        self.reported = np.zeros((rows, battery_count), dtype=np.bool_)
+        self.system = {
+            name: np.zeros(rows, dtype=np.float64)
+            for name, _ in SYSTEM_METRICS
+        }
+        # 슬롯 기록 순번 (0은 빈 슬롯 또는 기록 중) - 다른 프로세스가 읽을 때 일관성 확인 / 이어 읽기 위치
+        self.sequences = np.zeros(rows, dtype=np.int64)
+
+        self._next = 0
+        self._size = 0
+        self._sequence = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        """버퍼가 차지하는 메모리 (바이트)"""
+        arrays = [self.timestamps, self.sequences, self.status, self.cell_balance, self.reported,
+                  *self.metrics.values(), *self.system.values()]
+        return sum(a.nbytes for a in arrays)
+
+    def set_batteries(self, battery_ids: Sequence[int], meta: Sequence[Dict]):
+        """배터리 ID 및 정적 메타데이터(이름, 정격값 등) 등록 - 플릿 구성이 바뀌면 남은 배터리의 이력을 옮김"""
+        battery_ids = np.asarray(battery_ids, dtype=np.int64)
+        if not np.array_equal(battery_ids, self.battery_ids):
+            self._remap(battery_ids)
+        self.battery_meta = [dict(m) for m in meta]
+        self._id_index = {int(bid): i for i, bid in enumerate(self.battery_ids)}
+
+    def _columns(self) -> Dict:
+        """현재 버퍼의 배열 (재배치 전 보관용)"""
+        return {
+            "battery_ids": self.battery_ids.copy(),
+            "rows": self._window_slice(self._size),
+            "timestamps": self.timestamps,
+            "sequences": self.sequences,
+            "sequence": self._sequence,
+            "metrics": self.metrics,
+            "status": self.status,
+            "cell_balance": self.cell_balance,
+            "reported": self.reported,
+            "system": self.system,
+        }
+
+    def _remap(self, battery_ids: np.ndarray):
+        """새 플릿 크기로 버퍼를 다시 할당하고 남은 배터리의 최근 이력을 옮김
+
+        새 배터리의 과거 슬롯은 값 없음(NaN, 미보고)이고, 용량이 줄면 최근 슬롯만 남는다.
+        """
+        old = self._columns()
+        self._allocate(len(battery_ids))
+        self._carry_over(old, battery_ids)
+
+    def _carry_over(self, old: Dict, battery_ids: np.ndarray):
+        """보관한 배열의 최근 슬롯을 새 버퍼 앞쪽(과 복제 위치)에 복사"""
+        self.battery_ids[:] = battery_ids
+        _, new_cols, old_cols = np.intersect1d(battery_ids, old["battery_ids"], assume_unique=True,
+                                               return_indices=True)
+        rows = old["rows"]
+        count = min(rows.stop - rows.start, self.capacity)
+        source = slice(rows.stop - count, rows.stop)
+        for target in (slice(0, count), slice(self.capacity, self.capacity + count)):
+            self.timestamps[target] = old["timestamps"][source]
+            self.sequences[target] = old["sequences"][source]
+            for name, column in self.metrics.items():
+                column[target] = np.nan
+                column[target, new_cols] = old["metrics"][name][source][:, old_cols]
+            for name in ("status", "cell_balance", "reported"):
+                getattr(self, name)[target, new_cols] = old[name][source][:, old_cols]
+            for name, column in self.system.items():
+                column[target] = old["system"][name][source]
+        self._next = count % self.capacity
+        self._size = count
+        self._sequence = old["sequence"]
+
+    def battery_index(self, battery_id: int) -> Optional[int]:
+        """배터리 ID → 컬럼 인덱스"""
+        return self._id_index.get(int(battery_id))
+
+    def append(self, timestamp: float, metrics: Dict[str, np.ndarray],
+               status: np.ndarray, cell_balance: np.ndarray, system: Dict[str, float],
+               reported: Optional[np.ndarray] = None):
+        """한 타임 슬롯 기록 - O(1) (배터리 수에 대해서만 선형)
+
+        reported: 이번 슬롯에 새 측정값을 보고한 배터리 (생략 시 전체)
+        """
+        lo = self._next
+        hi = lo + self.capacity
+
+        # 기록 중 표시 - 순번은 값을 모두 쓴 뒤에 매김
+        self.sequences[lo] = self.sequences[hi] = 0
+        self.timestamps[lo] = self.timestamps[hi] = timestamp
+        for name, column in self.metrics.items():
+            column[lo] = column[hi] = metrics[name]
+        self.status[lo] = self.status[hi] = status
+        self.cell_balance[lo] = self.cell_balance[hi] = cell_balance
+        self.reported[lo] = self.reported[hi] = True if reported is None else reported
+        for name, column in self.system.items():
+            column[lo] = column[hi] = system[name]
+
+        self._next = (lo + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        sequence = self._sequence + 1
+        self.sequences[lo] = self.sequences[hi] = sequence
+        self._sequence = sequence
+
+    def _window_slice(self, limit: int) -> slice:
+        """최근 limit개 슬롯을 가리키는 연속 슬라이스"""
+        count = min(limit, self._size)
+        end = self._next + self.capacity
+        return slice(end - count, end)
+
+    def window(self, limit: int, battery_index: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """최근 limit개 구간의 컬럼 뷰 (복사 없음)"""
+        return self._read(self._window_slice(limit), battery_index)[0]
+
+    def system_window(self, limit: int) -> Dict[str, np.ndarray]:
+        """최근 limit개 구간의 시스템 지표 뷰 (복사 없음)"""
+        return self._read(self._window_slice(limit), system=True)[1]
+
+    def _read(self, rows, battery_index: Optional[int] = None,
+              system: bool = False) -> Tuple[Dict[str, np.ndarray], Optional[Dict[str, np.ndarray]]]:
+        """행 구간(슬라이스 또는 행 번호 배열) 의 배터리 지표 컬럼과 시스템 지표 컬럼 (system=False면 None)"""
+        cols = slice(None) if battery_index is None else battery_index
+        window = {
+            "timestamp": self.timestamps[rows],
+            "status": self.status[rows, cols],
+            "cell_balance": self.cell_balance[rows, cols],
+            **{name: column[rows, cols] for name, column in self.metrics.items()},
+        }
+        system_window = None
+        if system:
+            system_window = {
+                "timestamp": self.timestamps[rows],
+                **{name: column[rows] for name, column in self.system.items()},
+            }
+        return window, system_window
+
+    def battery_records(self, battery_index: int, limit: int) -> List[Dict]:
+        """특정 배터리의 최근 이력을 응답용 딕셔너리로 변환"""
+        window = self.window(limit, battery_index)
+        meta = self.battery_meta[battery_index]
+        battery_id = int(self.battery_ids[battery_index])
+
+        columns = _rounded_columns(window, BATTERY_METRICS)
+        timestamps = _iso_timestamps(window["timestamp"])
+        status = window["status"].tolist()
+        cell_balance = window["cell_balance"].tolist()
+
+        # 플릿에 추가되기 전 슬롯(값 없음)은 제외
+        present = (~np.isnan(window["voltage"])).tolist()
+        return [
+            {
+                "timestamp": timestamps[t],
+                **_battery_dict(battery_id, meta, columns, t, status[t], cell_balance[t]),
+            }
+            for t in range(len(timestamps)) if present[t]
+        ]
+
+    def snapshot_records(self, limit: int) -> List[Dict]:
+        """최근 시스템 스냅샷 목록을 응답용 딕셔너리로 변환"""
+        window, system = self._read(self._window_slice(limit), system=True)
+
+        columns = _rounded_columns(window, BATTERY_METRICS)
+        system_columns = _rounded_columns(system, SYSTEM_METRICS)
+        timestamps = _iso_timestamps(window["timestamp"])
+        status = window["status"].tolist()
+        cell_balance = window["cell_balance"].tolist()
+        battery_ids = self.battery_ids.tolist()
+        present = (~np.isnan(window["voltage"])).tolist()
+
+        records = []
+        for t, timestamp in enumerate(timestamps):
+            # 그 슬롯 이후에 플릿에 추가된 배터리(값 없음)는 제외
+            batteries = [
+                _battery_dict(battery_id, self.battery_meta[b],
+                              {name: values[t] for name, values in columns.items()},
+                              b, status[t][b], cell_balance[t][b])
+                for b, battery_id in enumerate(battery_ids) if present[t][b]
+            ]
+            records.append({
+                "timestamp": timestamp,
+                "batteries": batteries,
+                "total_stats": {
+                    name: system_columns[name][t]
+                    for name in ("total_power", "total_energy", "average_soc",
+                                 "average_soh", "average_temperature")
+                },
+                "environment": {
+                    "outdoor_temperature": system_columns["outdoor_temperature"][t],
+                    "humidity": system_columns["humidity"][t],
+                    # 환경 정보가 없는 수신 데이터 틱은 None
+                    "weather": "맑음" if system_columns["outdoor_temperature"][t] is not None else None,
+                },
+            })
+        return records
+
+
+    def battery_columns(self, battery_index: int, limit: int) -> Dict:
+        """특정 배터리의 최근 이력 - 컬럼형 (지표별 배열, 범주형은 코드 + 라벨표)"""
+        window = self.window(limit, battery_index)
+        meta = self.battery_meta[battery_index]
+        return {
+            "battery_id": int(self.battery_ids[battery_index]),
+            "name": meta.get("name"),
+            "timestamps": epoch_millis(window["timestamp"]),
+            "values": _columnar_values(window),
+            "labels": CATEGORY_LABELS,
+        }
+
+    def snapshot_columns(self, limit: int) -> Dict:
+        """최근 시스템 스냅샷 - 컬럼형 (배터리 지표는 타임 슬롯 × 배터리 2차원 배열)"""
+        window, system = self._read(self._window_slice(limit), system=True)
+        return {
+            "battery_ids": self.battery_ids.tolist(),
+            "names": [meta.get("name") for meta in self.battery_meta],
+            "timestamps": epoch_millis(window["timestamp"]),
+            "values": _columnar_values(window),
+            "system": _rounded_columns(system, SYSTEM_METRICS),
+            "labels": CATEGORY_LABELS,
+        }
+
+
+    def iter_range_arrays(self, start: float, end: float, battery_index: Optional[int] = None,
+                          chunk_rows: int = 10000) -> Iterator[Dict[str, np.ndarray]]:
+        """[start, end] 구간 (버퍼에 남아 있는 슬롯) 을 시간순 컬럼 배열 청크로 반환
+
+        행은 (타임 슬롯, 배터리) 하나씩이며 청크마다 복사본을 만든다. 청크 사이에
+        새 슬롯이 기록되어도 마지막으로 보낸 시각 이후부터 이어서 읽는다.
+        """
+        cursor = -np.inf
+        while True:
+            if battery_index is not None and battery_index >= self.battery_count:
+                return
+            rows = self._window_slice(self._size)
+            timestamps = self.timestamps[rows]
+            selected = np.flatnonzero((timestamps >= start) & (timestamps > cursor) & (timestamps <= end))
+            width = 1 if battery_index is not None else self.battery_count
+            selected = selected[:max(1, chunk_rows // max(width, 1))] + rows.start
+            if len(selected) == 0:
+                return
+            window, _ = self._read(selected, battery_index)
+            slot_timestamps = window.pop("timestamp")
+            if len(slot_timestamps) == 0:
+                # 남은 슬롯을 모두 덮어쓰는 중 (공유 저장소) - 읽을 수 있는 구간 끝
+                return
+            cols = slice(None) if battery_index is None else [battery_index]
+            chunk = {
+                "timestamp": np.repeat(slot_timestamps, width),
+                "battery_id": np.tile(self.battery_ids[cols], len(slot_timestamps)),
+                **{name: window[name].reshape(-1) for name in self.metrics},
+                "status": window["status"].reshape(-1),
+                "cell_balance": window["cell_balance"].reshape(-1),
+            }
+            cursor = slot_timestamps[-1]
+            present = ~np.isnan(chunk["voltage"])
+            if not present.all():
+                # 플릿에 추가되기 전 슬롯의 빈 값은 내보내지 않음
+                chunk = {name: values[present] for name, values in chunk.items()}
+            yield chunk
+
+
+def _columnar_values(window: Dict[str, np.ndarray]) -> Dict[str, list]:
+    """윈도우 → 지표별 반올림 배열 + 범주형 코드 배열"""
+    return {
+        **_rounded_columns(window, BATTERY_METRICS),
+        "status": window["status"].tolist(),
+        "cell_balance": window["cell_balance"].tolist(),
+    }
+
+
+def _rounded_columns(window: Dict[str, np.ndarray], specs) -> Dict[str, list]:
+    """컬럼별 반올림 후 파이썬 리스트로 변환 (응답 직전에 한 번만)"""
+    columns = {}
+    for name, digits in specs:
+        values = window[name].astype(np.float64)
+        if digits is None:
+            missing = np.isnan(values)
+            rounded = np.rint(np.where(missing, 0.0, values)).astype(np.int64)
+            # 플릿에 늦게 추가된 배터리의 이전 슬롯 등 값이 없으면 None
+            columns[name] = (np.where(missing, None, rounded) if missing.any() else rounded).tolist()
+        else:
+            rounded = np.round(values, digits)
+            missing = np.isnan(rounded)
+            # 값이 없는 슬롯(NaN)은 None - JSON 응답에 NaN이 들어가지 않도록
+            columns[name] = (np.where(missing, None, rounded) if missing.any() else rounded).tolist()
+    return columns
+
+
+def _iso_timestamps(timestamps: np.ndarray) -> List[str]:
+    """epoch 초 배열 → ISO 문자열 목록"""
+    return [datetime.fromtimestamp(ts).isoformat() for ts in timestamps.tolist()]
+
+
+def _battery_dict(battery_id: int, meta: Dict, columns: Dict[str, list],
+                  index: int, status: int, cell_balance: int) -> Dict:
+    """컬럼 값 → 배터리 딕셔너리 (generate_simulated_data 형식)"""
+    return {
+        "id": battery_id,
+        "name": meta.get("name"),
+        "status": STATUS_LABELS[status],
+        "voltage": columns["voltage"][index],
+        "voltage_max": meta.get("voltage_max"),
+        "voltage_min": meta.get("voltage_min"),
+        "current": columns["current"][index],
+        "temperature": columns["temperature"][index],
+        "soc": columns["soc"][index],
+        "soh": columns["soh"][index],
+        "capacity_current": columns["capacity_current"][index],
+        "capacity_rated": meta.get("capacity_rated"),
+        "power_current": columns["power_current"][index],
+        "power_peak": columns["power_peak"][index],
+        "energy_today": columns["energy_today"][index],
+        "energy_total": columns["energy_total"][index],
+        "runtime": f"{columns['runtime_hours'][index]:.2f}시간",
+        "cycle_count": columns["cycle_count"][index],
+        "internal_resistance": columns["internal_resistance"][index],
+        "cell_balance": CELL_BALANCE_LABELS[cell_balance],
+    }
@@ -0,0 +1,80 @@
+"""
+HTTP 응답 캐시 - 스냅샷 버전별 직렬화 본문 재사용, ETag / If-None-Match 조건부 요청
+"""
+import hashlib
+import os
+import time
+from typing import Any, Callable, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from services.metrics import HTTP_CACHE_REQUESTS
+from services.serialization import encode_json
+
+
+# 클라이언트 캐시 유효 시간 (초) - 스냅샷 TTL보다 길면 새 틱을 놓칠 수 있음
+HTTP_CACHE_MAX_AGE_SECONDS = int(os.getenv("HTTP_CACHE_MAX_AGE_SECONDS", "1"))
+
+SNAPSHOT_VERSION_HEADER = "X-Snapshot-Version"
+
+
+class CachedBody:
+    """직렬화된 응답 본문 + ETag (본문 해시만 사용 - 스냅샷 버전은 워커마다 다르므로 넣지 않음)"""
+
+    def __init__(self, body: bytes, version: int):
+        self.body = body
+        self.version = version
+        self.etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 헤더가 ETag와 일치하는지 (목록, 약한 비교, * 지원)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def cached_response(request: Request, snapshot, key: str, build: Callable[[], Any],
+                    bucket_seconds: Optional[float] = None) -> Response:
+    """스냅샷 버전별 캐시 응답
+
+    본문은 스냅샷당 한 번만 만들어 직렬화하고, 같은 틱 안의 반복 요청은 같은 바이트를 보낸다.
+    클라이언트가 보낸 If-None-Match가 현재 ETag와 같으면 본문 없이 304를 반환한다.
+
+    bucket_seconds: 시각에 따라 달라지는 응답 (롤링 윈도우 등) - 수신 데이터 모드에서 새 측정값이 없어
+    스냅샷 버전이 그대로여도 이 간격마다 새로 만든다 (키별로 최근 구간 하나만 유지).
+    """
+    route = request.url.path
+    built = []
+
+    def factory() -> CachedBody:
+        built.append(True)
+        return CachedBody(encode_json(build()), snapshot.version)
+
+    if bucket_seconds:
+        bucket = int(time.time() // bucket_seconds)
+        slot = snapshot.memo(f"http:{key}", dict)
+        cached = slot.get(bucket)
+        if cached is None:
+            cached = factory()
+            slot.clear()
+            slot[bucket] = cached
+    else:
+        cached = snapshot.memo(f"http:{key}", factory)
+    result = "miss" if built else "hit"
+
+    headers = {
+        "ETag": cached.etag,
+        "Cache-Control": f"private, max-age={HTTP_CACHE_MAX_AGE_SECONDS}",
+        SNAPSHOT_VERSION_HEADER: str(cached.version),
+    }
+    if _matches(request.headers.get("if-none-match"), cached.etag):
+        HTTP_CACHE_REQUESTS.labels(route, "not_modified").inc()
+        return Response(status_code=304, headers=headers)
+    HTTP_CACHE_REQUESTS.labels(route, result).inc()
+    return Response(content=cached.body, media_type="application/json", headers=headers)
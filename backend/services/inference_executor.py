@@ -0,0 +1,213 @@
+"""
+추론 실행기 - 동시 예측 요청을 묶어 이벤트 루프 밖(스레드/프로세스 풀)에서 배치 추론
+"""
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional
+import numpy as np
+
+from services.metrics import INFERENCE_BATCH_REQUESTS, INFERENCE_QUEUE_DEPTH, INFERENCE_QUEUE_WAIT
+
+
+EXECUTOR_THREAD = "thread"
+EXECUTOR_PROCESS = "process"
+EXECUTOR_KINDS = (EXECUTOR_THREAD, EXECUTOR_PROCESS)
+
+# thread: NumPy 배치 연산 (GIL 해제) / process: 순수 파이썬 경로 (GIL 경합 회피)
+INFERENCE_EXECUTOR = os.getenv("INFERENCE_EXECUTOR", EXECUTOR_THREAD)
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# 첫 요청 후 다른 요청을 모으는 시간 (밀리초) / 배치 하나의 최대 배터리 수
+INFERENCE_BATCH_WINDOW_MS = float(os.getenv("INFERENCE_BATCH_WINDOW_MS", "2"))
+INFERENCE_MAX_BATCH_ROWS = int(os.getenv("INFERENCE_MAX_BATCH_ROWS", "200000"))
+
+
+# 프로세스 풀 워커의 AIService (워커 시작 시 한 번 생성, 캐시는 부모 프로세스가 관리)
+_worker_service = None
+
+
+def _init_worker():
+    global _worker_service
+    from services.ai_service import AIService
+    _worker_service = AIService(enable_cache=False)
+
+
+def _predict_in_worker(features: Dict[str, np.ndarray], model_version: Optional[str]) -> Dict[str, np.ndarray]:
+    # 부모 프로세스의 활성 모델 버전을 따름 (가중치는 메모리 맵이라 페이지 캐시 공유)
+    registry = _worker_service.registry
+    if registry.active_version != model_version:
+        registry.activate(model_version)
+    return _worker_service.predict_batch(**features)
+
+
+class _PendingRequest:
+    __slots__ = ("battery_ids", "features", "future", "enqueued_at")
+
+    def __init__(self, battery_ids: np.ndarray, features: Dict[str, np.ndarray], future: asyncio.Future):
+        self.battery_ids = battery_ids
+        self.features = features
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+
+class InferenceExecutor:
+    """배치 추론 실행기
+
+    predict()를 동시에 호출한 요청들은 짧은 대기 시간(batch_window) 동안 모였다가
+    특성 배열을 이어 붙여 predict_fleet 한 번으로 추론하고, 결과는 요청별로 잘라 돌려준다.
+    추론은 스레드 풀에서 실행되므로 이벤트 루프는 그동안 다른 요청과 WebSocket을 처리한다.
+    process 모드에서는 캐시 조회/저장은 스레드에서, 미스 배터리 추론만 프로세스 풀에서 수행한다.
+    동시에 실행되는 배치 수는 워커 수로 제한한다.
+    """
+
+    def __init__(self, ai_service, kind: str = INFERENCE_EXECUTOR, workers: int = INFERENCE_WORKERS,
+                 batch_window_ms: float = INFERENCE_BATCH_WINDOW_MS,
+                 max_batch_rows: int = INFERENCE_MAX_BATCH_ROWS):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"지원하지 않는 추론 실행기: {kind} (thread / process)")
+        self.ai_service = ai_service
+        self.kind = kind
+        self.workers = max(workers, 1)
+        self.batch_window = batch_window_ms / 1000.0
+        self.max_batch_rows = max_batch_rows
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._process_lock = threading.Lock()
+
+        # 이벤트 루프별 상태 (루프가 바뀌면 초기화)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Deque[_PendingRequest] = deque()
+        self._pending_rows = 0
+        self._drain_task: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._running: set = set()
+
+        self.requests = 0
+        self.batches = 0
+        self.rows = 0
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """CPU 작업을 추론 스레드 풀에서 실행 (스냅샷 생성, 응답 변환 등)"""
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        return await asyncio.get_running_loop().run_in_executor(self._threads, functools.partial(fn, *args))
+
+    async def predict(self, battery_ids: np.ndarray, features: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """배치 예측 (다른 동시 요청과 묶어서 실행) - predict_fleet과 같은 결과"""
+        loop = asyncio.get_running_loop()
+        self._bind(loop)
+        request = _PendingRequest(battery_ids, features, loop.create_future())
+        self._pending.append(request)
+        self._pending_rows += len(battery_ids)
+        INFERENCE_QUEUE_DEPTH.inc()
+        if self._drain_task is None or self._drain_task.done():
+            self._drain_task = loop.create_task(self._drain())
+        return await request.future
+
+    def _bind(self, loop: asyncio.AbstractEventLoop):
+        if self._loop is loop:
+            return
+        INFERENCE_QUEUE_DEPTH.dec(len(self._pending))
+        self._loop = loop
+        self._pending = deque()
+        self._pending_rows = 0
+        self._drain_task = None
+        self._slots = asyncio.Semaphore(self.workers)
+        self._running = set()
+
+    async def _drain(self):
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            if self.batch_window > 0 and self._pending_rows < self.max_batch_rows:
+                await asyncio.sleep(self.batch_window)
+            await self._slots.acquire()
+            task = loop.create_task(self._run_batch(self._take_batch()))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    def _take_batch(self) -> List[_PendingRequest]:
+        batch = [self._pending.popleft()]
+        rows = len(batch[0].battery_ids)
+        while self._pending and rows + len(self._pending[0].battery_ids) <= self.max_batch_rows:
+            request = self._pending.popleft()
+            batch.append(request)
+            rows += len(request.battery_ids)
+        self._pending_rows -= rows
+        INFERENCE_QUEUE_DEPTH.dec(len(batch))
+        return batch
+
+    async def _run_batch(self, batch: List[_PendingRequest]):
+        try:
+            started = time.perf_counter()
+            for request in batch:
+                INFERENCE_QUEUE_WAIT.observe(started - request.enqueued_at)
+            INFERENCE_BATCH_REQUESTS.observe(len(batch))
+
+            if len(batch) == 1:
+                battery_ids, features = batch[0].battery_ids, batch[0].features
+            else:
+                battery_ids = np.concatenate([r.battery_ids for r in batch])
+                features = {name: np.concatenate([r.features[name] for r in batch]) for name in batch[0].features}
+            self.requests += len(batch)
+            self.batches += 1
+            self.rows += len(battery_ids)
+
+            compute = self._compute_in_process if self.kind == EXECUTOR_PROCESS else None
+            try:
+                result = await self.run(self.ai_service.predict_fleet, battery_ids, features, compute)
+            except Exception as e:
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                return
+
+            start = 0
+            for request in batch:
+                end = start + len(request.battery_ids)
+                if not request.future.done():
+                    request.future.set_result(
+                        result if len(batch) == 1 else {name: values[start:end] for name, values in result.items()}
+                    )
+                start = end
+        finally:
+            self._slots.release()
+
+    def _compute_in_process(self, features: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """미스 배터리 추론을 프로세스 풀에서 실행 (추론 스레드에서 호출, 결과까지 대기)"""
+        with self._process_lock:
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+        model_version = self.ai_service.registry.active_version
+        return self._processes.submit(_predict_in_worker, features, model_version).result()
+
+    def stats(self) -> Dict:
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "batch_window_ms": self.batch_window * 1000.0,
+            "max_batch_rows": self.max_batch_rows,
+            "queue_depth": len(self._pending),
+            "requests": self.requests,
+            "batches": self.batches,
+            "rows": self.rows,
+            "requests_per_batch": round(self.requests / self.batches, 2) if self.batches else 0.0,
+        }
+
+    def shutdown(self):
+        """스레드/프로세스 풀 종료 (이후 요청이 오면 다시 생성)"""
+        if self._threads is not None:
+            self._threads.shutdown(wait=False, cancel_futures=True)
+            self._threads = None
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+            self._processes = None
+
@@ -0,0 +1,152 @@
+"""
+모니터링 지표 - Prometheus 메트릭 정의 및 HTTP 지연 시간 미들웨어
+"""
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+
+# 지연 시간 버킷 (초) - p99 회귀 감지를 위해 1ms 미만부터 세분화
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 프레임 크기 버킷 (바이트)
+FRAME_SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+SIMULATION_LATENCY = Histogram(
+    "battery_generate_simulated_data_seconds",
+    "배터리 시뮬레이션 데이터(플릿 스냅샷) 생성 시간",
+    buckets=LATENCY_BUCKETS,
+)
+PREDICTION_LATENCY = Histogram(
+    "battery_predict_health_seconds",
+    "AI 예측 시간 (operation: predict_battery_health / predict_batch / build_prediction_response)",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+PREDICTION_CACHE_LOOKUPS = Counter(
+    "battery_prediction_cache_lookups_total",
+    "예측 캐시 조회 수 (result: hit / miss)",
+    ["result"],
+)
+INFERENCE_QUEUE_DEPTH = Gauge("inference_queue_depth", "배치 추론 대기 중인 예측 요청 수")
+INFERENCE_QUEUE_WAIT = Histogram(
+    "inference_queue_wait_seconds",
+    "예측 요청이 배치에 묶여 실행되기까지 기다린 시간",
+    buckets=LATENCY_BUCKETS,
+)
+INFERENCE_BATCH_REQUESTS = Histogram(
+    "inference_batch_requests",
+    "추론 배치 하나에 묶인 예측 요청 수",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+INGEST_READINGS = Counter(
+    "telemetry_ingest_readings_total",
+    "수집 API 측정값 수 (result: accepted / rejected / applied / stale)",
+    ["result"],
+)
+INGEST_QUEUE_DEPTH = Gauge("telemetry_ingest_queue_depth", "수집 큐에서 반영을 기다리는 측정값 수")
+INGEST_APPLY_LATENCY = Histogram(
+    "telemetry_ingest_apply_seconds",
+    "마이크로 배치 하나를 플릿 상태/히스토리에 반영하는 시간",
+    buckets=LATENCY_BUCKETS,
+)
+ALERT_TRANSITIONS = Counter(
+    "battery_alert_transitions_total",
+    "알림 상태 전이 수 (event: raised / cleared)",
+    ["rule", "event"],
+)
+ALERT_ACTIVE = Gauge("battery_alerts_active", "규칙별 활성 알림 수", ["rule"])
+HISTORY_EXPORT_ROWS = Counter(
+    "battery_history_export_rows_total",
+    "히스토리 내보내기로 전송한 측정값 수 (format: csv / ndjson / arrow)",
+    ["format"],
+)
+HTTP_CACHE_REQUESTS = Counter(
+    "http_cache_requests_total",
+    "스냅샷 캐시 응답 요청 수 (result: hit / miss / not_modified)",
+    ["route", "result"],
+)
+HTTP_REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP 엔드포인트 응답 시간",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP 요청 수",
+    ["method", "route", "status"],
+)
+
+WS_CONNECTIONS = Gauge("websocket_connections", "WebSocket 연결 수")
+WS_FRAMES_SENT = Counter(
+    "websocket_frames_sent_total",
+    "WebSocket 전송 프레임 수 (kind: json / keyframe / delta / control)",
+    ["kind"],
+)
+WS_FRAME_BYTES = Histogram(
+    "websocket_frame_bytes",
+    "WebSocket 프레임 크기",
+    ["kind"],
+    buckets=FRAME_SIZE_BUCKETS,
+)
+WS_DROPPED_FRAMES = Counter("websocket_dropped_frames_total", "송신 큐가 가득 차 버린 프레임 수")
+WS_EVICTIONS = Counter("websocket_evictions_total", "느리거나 끊겨 강제 종료한 연결 수")
+BROADCAST_LATENCY = Histogram(
+    "websocket_broadcast_seconds",
+    "틱당 브로드캐스트 시간 (스냅샷 갱신 + 그룹별 프레임 큐잉)",
+    buckets=LATENCY_BUCKETS,
+)
+
+HISTORY_SAMPLES = Gauge("battery_history_samples", "메모리 히스토리 버퍼의 스냅샷 수")
+HISTORY_CAPACITY = Gauge("battery_history_capacity", "메모리 히스토리 버퍼 용량 (스냅샷 수)")
+HISTORY_BYTES = Gauge("battery_history_bytes", "메모리 히스토리 버퍼 크기 (바이트)")
+
+SHARED_STATE_PRODUCER = Gauge("shared_state_producer", "이 워커가 공유 상태 프로듀서이면 1 (멀티 워커 모드)")
+SHARED_STATE_REPLAYED_TICKS = Counter("shared_state_replayed_ticks_total", "다른 워커가 기록해 이 워커가 반영한 틱 수")
+
+
+def track_history(history):
+    """히스토리 버퍼 크기 게이지 등록 (수집 시점에 읽음)"""
+    HISTORY_SAMPLES.set_function(lambda: len(history))
+    HISTORY_CAPACITY.set_function(lambda: history.capacity)
+    HISTORY_BYTES.set_function(lambda: history.nbytes)
+
+
+def metrics_payload():
+    """/metrics 응답 본문과 Content-Type"""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """HTTP 엔드포인트별 지연 시간 측정 ASGI 미들웨어
+
+    라벨은 실제 경로가 아닌 라우트 템플릿(/api/battery/{battery_id})을 사용해
+    시계열 수가 늘어나지 않게 한다.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            HTTP_REQUEST_LATENCY.labels(method, path).observe(time.perf_counter() - start)
+            HTTP_REQUESTS.labels(method, path, str(status_code)).inc()
@@ -0,0 +1,104 @@
+"""
+모델 평가 - 청크 단위 점수 누적 (혼동 행렬, RUL 오차 통계)
+"""
+from typing import Dict, Optional
+import numpy as np
+
+from services.history_store import STATUS_LABELS
+
+
+# RUL 절대 오차 구간 경계 (일) - 구간별 비율과 근사 분위수 계산용
+RUL_ERROR_BINS = (0, 7, 14, 30, 60, 90, 180, 365, 730)
+
+
+class EvaluationAccumulator:
+    """청크별 예측/정답을 누적해 평가 지표 계산 (메모리 사용량은 데이터 크기와 무관)"""
+
+    def __init__(self, status_labels=STATUS_LABELS):
+        self.status_labels = tuple(status_labels)
+        classes = len(self.status_labels)
+        # 행: 실제 상태, 열: 예측 상태
+        self.confusion = np.zeros((classes, classes), dtype=np.int64)
+
+        self.rul_count = 0
+        self.rul_abs_sum = 0.0
+        self.rul_sq_sum = 0.0
+        self.rul_err_sum = 0.0
+        self.rul_abs_max = 0.0
+        self.rul_bins = np.array(RUL_ERROR_BINS + (np.inf,), dtype=np.float64)
+        self.rul_histogram = np.zeros(len(RUL_ERROR_BINS), dtype=np.int64)
+
+    def add_status(self, actual: np.ndarray, predicted: np.ndarray):
+        """상태 코드 (라벨이 없는 -1은 제외)"""
+        labelled = actual >= 0
+        classes = len(self.status_labels)
+        pairs = actual[labelled] * classes + predicted[labelled]
+        self.confusion += np.bincount(pairs, minlength=classes * classes).reshape(classes, classes)
+
+    def add_rul(self, actual: np.ndarray, predicted: np.ndarray):
+        """잔존 수명 (일, 라벨이 없는 NaN은 제외)"""
+        labelled = np.isfinite(actual)
+        if not labelled.any():
+            return
+        error = predicted[labelled] - actual[labelled]
+        abs_error = np.abs(error)
+        self.rul_count += len(error)
+        self.rul_abs_sum += float(abs_error.sum())
+        self.rul_sq_sum += float(np.square(error).sum())
+        self.rul_err_sum += float(error.sum())
+        self.rul_abs_max = max(self.rul_abs_max, float(abs_error.max()))
+        self.rul_histogram += np.histogram(abs_error, bins=self.rul_bins)[0]
+
+    def _rul_quantile(self, q: float) -> Optional[float]:
+        """오차 구간 히스토그램으로 근사한 분위수 (구간 상한, 최대 오차 이하)"""
+        if not self.rul_count:
+            return None
+        index = int(np.searchsorted(np.cumsum(self.rul_histogram), q * self.rul_count))
+        return round(min(float(self.rul_bins[index + 1]), self.rul_abs_max), 3)
+
+    def status_metrics(self) -> Optional[Dict]:
+        total = int(self.confusion.sum())
+        if not total:
+            return None
+        true_positive = np.diag(self.confusion).astype(np.float64)
+        predicted = self.confusion.sum(axis=0)
+        actual = self.confusion.sum(axis=1)
+        precision = np.divide(true_positive, predicted, out=np.zeros_like(true_positive), where=predicted > 0)
+        recall = np.divide(true_positive, actual, out=np.zeros_like(true_positive), where=actual > 0)
+        f1 = np.divide(2 * precision * recall, precision + recall,
+                       out=np.zeros_like(true_positive), where=(precision + recall) > 0)
+        present = actual > 0
+        return {
+            "samples": total,
+            "accuracy": round(float(true_positive.sum() / total), 4),
+            "precision": round(float(precision[present].mean()), 4),
+            "recall": round(float(recall[present].mean()), 4),
+            "f1_score": round(float(f1[present].mean()), 4),
+            "per_class": {
+                label: {
+                    "support": int(actual[i]),
+                    "precision": round(float(precision[i]), 4),
+                    "recall": round(float(recall[i]), 4),
+                    "f1_score": round(float(f1[i]), 4),
+                }
+                for i, label in enumerate(self.status_labels)
+            },
+            "labels": list(self.status_labels),
+            "confusion_matrix": self.confusion.tolist(),
+        }
+
+    def rul_metrics(self) -> Optional[Dict]:
+        if not self.rul_count:
+            return None
+        n = self.rul_count
+        ranges = [f"<{b}" for b in RUL_ERROR_BINS[1:]] + [f">={RUL_ERROR_BINS[-1]}"]
+        return {
+            "samples": n,
+            "mae": round(self.rul_abs_sum / n, 3),
+            "rmse": round(float(np.sqrt(self.rul_sq_sum / n)), 3),
+            "bias": round(self.rul_err_sum / n, 3),
+            "max_abs_error": round(self.rul_abs_max, 3),
+            "p50_abs_error": self._rul_quantile(0.5),
+            "p90_abs_error": self._rul_quantile(0.9),
+            "abs_error_histogram": dict(zip(ranges, self.rul_histogram.tolist())),
+        }
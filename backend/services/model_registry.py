@@ -0,0 +1,212 @@
+"""
+모델 레지스트리 - 버전별 학습 결과 로드 (메모리 맵 가중치), 워밍업, 무중단 교체
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+import numpy as np
+
+from services.history_store import STATUS_LABELS
+from services.model_training import MODEL_ARTIFACT_DIR
+
+
+# 시작 시 활성화할 버전 (builtin: 규칙 기반 기본 모델, latest: 가장 최근 학습 결과, 또는 버전 이름)
+# 학습 결과는 검증 후 POST /api/ai/model/versions/{version}/activate 또는 이 설정으로 명시적으로 활성화한다
+MODEL_VERSION = os.getenv("MODEL_VERSION", "builtin")
+LATEST_VERSION = "latest"
+BUILTIN_VERSION = "builtin"
+
+# 메모리에 유지할 버전 수 (활성 버전 포함 - 나머지는 즉시 되돌리기용)
+MODEL_REGISTRY_KEEP = int(os.getenv("MODEL_REGISTRY_KEEP", "2"))
+
+# 워밍업 배치 크기 (배터리 수)
+WARMUP_BATCH_SIZE = int(os.getenv("MODEL_WARMUP_BATCH_SIZE", "1024"))
+
+# 고장 확률로 사용하는 상태 클래스
+FAILURE_STATUS = STATUS_LABELS[2]
+
+
+class ModelVersion:
+    """학습 결과 한 버전 (model_training.save_artifact 형식)
+
+    가중치 .npy 파일은 메모리 맵으로 열어 실제로 접근한 페이지만 읽으며,
+    같은 버전을 여는 워커 프로세스들은 운영체제 페이지 캐시를 공유한다.
+    """
+
+    def __init__(self, path: str):
+        start = time.perf_counter()
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.path = path
+        self.version = self.meta["version"]
+        self.features = tuple(self.meta["features"])
+        self.status_classes = tuple(self.meta["status_classes"])
+        self.weights = {
+            name[:-len(".npy")]: np.load(os.path.join(path, name), mmap_mode="r")
+            for name in sorted(os.listdir(path)) if name.endswith(".npy")
+        }
+        missing = {"scaler_mean", "scaler_scale"} - set(self.weights)
+        if missing:
+            raise ValueError(f"{self.version}: 가중치 파일 누락 ({', '.join(sorted(missing))})")
+        self.load_seconds = time.perf_counter() - start
+        self.warmup_seconds: Optional[float] = None
+        self.loaded_at = datetime.now()
+
+    @property
+    def has_classifier(self) -> bool:
+        return "classifier_coef" in self.weights
+
+    @property
+    def has_regressor(self) -> bool:
+        return "regressor_coef" in self.weights
+
+    @property
+    def nbytes(self) -> int:
+        """가중치 크기 (메모리 맵 바이트 수)"""
+        return sum(int(w.nbytes) for w in self.weights.values())
+
+    def predict(self, features: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """특성 배열 → 학습 모델 출력 (failure_probability, status, rul_days 중 학습된 항목)"""
+        w = self.weights
+        x = np.column_stack([np.asarray(features[name], dtype=np.float64) for name in self.features])
+        scaled = (x - w["scaler_mean"]) / w["scaler_scale"]
+
+        result = {}
+        if self.has_classifier:
+            # SGDClassifier(log_loss) 다중 클래스는 one-vs-rest - 클래스별 시그모이드를 정규화
+            logits = scaled @ w["classifier_coef"].T + w["classifier_intercept"]
+            proba = 1 / (1 + np.exp(-logits))
+            proba /= proba.sum(axis=1, keepdims=True)
+            result["status"] = proba.argmax(axis=1)
+            if FAILURE_STATUS in self.status_classes:
+                result["failure_probability"] = proba[:, self.status_classes.index(FAILURE_STATUS)]
+        if self.has_regressor:
+            result["rul_days"] = scaled @ w["regressor_coef"] + w["regressor_intercept"][0]
+        return result
+
+    def synthetic_features(self, rows: int = WARMUP_BATCH_SIZE) -> Dict[str, np.ndarray]:
+        """워밍업용 입력 (학습 데이터 평균 주변 값)"""
+        rng = np.random.default_rng(0)
+        mean, scale = self.weights["scaler_mean"], self.weights["scaler_scale"]
+        return {
+            name: mean[j] + scale[j] * rng.standard_normal(rows)
+            for j, name in enumerate(self.features)
+        }
+
+    def info(self) -> Dict:
+        return {
+            "version": self.version,
+            "path": self.path,
+            "created_at": self.meta.get("created_at"),
+            "records": self.meta.get("records"),
+            "online_accuracy": self.meta.get("online_accuracy"),
+            "outputs": [name for name, present in (
+                ("status", self.has_classifier), ("rul_days", self.has_regressor)
+            ) if present],
+            "loaded_at": self.loaded_at.isoformat(),
+            "load_seconds": round(self.load_seconds, 6),
+            "warmup_seconds": round(self.warmup_seconds, 6) if self.warmup_seconds is not None else None,
+            "memory_bytes": self.nbytes,
+        }
+
+
+class ModelRegistry:
+    """모델 버전 관리
+
+    activate()는 새 버전을 로드하고 워밍업까지 끝낸 뒤 active 참조 하나만 바꾸므로,
+    진행 중인 배치는 이전 버전으로 끝나고 다음 배치부터 새 버전을 사용한다.
+    uvicorn 재시작이나 WebSocket 재연결이 필요 없다.
+    """
+
+    def __init__(self, artifact_dir: str = MODEL_ARTIFACT_DIR, keep: int = MODEL_REGISTRY_KEEP):
+        self.artifact_dir = artifact_dir
+        self.keep = max(keep, 1)
+        # None이면 규칙 기반 기본 모델
+        self.active: Optional[ModelVersion] = None
+        self.loaded: "OrderedDict[str, ModelVersion]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def active_version(self) -> Optional[str]:
+        model = self.active
+        return model.version if model is not None else None
+
+    def available(self) -> List[str]:
+        """디스크의 버전 목록 (오래된 순 - 버전 이름이 생성 시각으로 시작)"""
+        if not os.path.isdir(self.artifact_dir):
+            return []
+        return sorted(
+            name for name in os.listdir(self.artifact_dir)
+            if not name.startswith(".") and os.path.isfile(os.path.join(self.artifact_dir, name, "meta.json"))
+        )
+
+    def latest(self) -> Optional[str]:
+        """가장 최근에 학습된 버전 (meta.json의 created_at 기준 - 버전 이름 형식과 무관)"""
+        versions = self.available()
+        if not versions:
+            return None
+        return max(versions, key=lambda version: (self._created_at(version), version))
+
+    def _created_at(self, version: str) -> str:
+        try:
+            with open(os.path.join(self.artifact_dir, version, "meta.json"), encoding="utf-8") as f:
+                return str(json.load(f).get("created_at") or "")
+        except (OSError, ValueError):
+            return ""
+
+    def load(self, version: str) -> ModelVersion:
+        """버전 로드 (이미 로드된 버전은 재사용)"""
+        with self._lock:
+            model = self.loaded.get(version)
+            if model is None:
+                if version not in self.available():
+                    raise LookupError(f"모델 버전을 찾을 수 없습니다: {version}")
+                model = ModelVersion(os.path.join(self.artifact_dir, version))
+                self.loaded[version] = model
+            self.loaded.move_to_end(version)
+            return model
+
+    def activate(self, version: Optional[str],
+                 warm_up: Optional[Callable[[ModelVersion], None]] = None) -> Optional[ModelVersion]:
+        """버전 교체 (None: 기본 모델) - warm_up(model)은 교체 전에 한 번 실행"""
+        if version is None:
+            self.active = None
+            return None
+
+        model = self.load(version)
+        if model.warmup_seconds is None:
+            start = time.perf_counter()
+            model.predict(model.synthetic_features())
+            if warm_up is not None:
+                warm_up(model)
+            model.warmup_seconds = time.perf_counter() - start
+
+        self.active = model
+        with self._lock:
+            # 오래된 버전 해제 (활성 버전은 유지)
+            for name in list(self.loaded):
+                if len(self.loaded) <= self.keep:
+                    break
+                if name != version:
+                    del self.loaded[name]
+        return model
+
+    def resolve(self, version: str = MODEL_VERSION) -> Optional[str]:
+        """설정 값(latest / builtin / 버전 이름) → 활성화할 버전 (None: 기본 모델)"""
+        if version == BUILTIN_VERSION:
+            return None
+        if version == LATEST_VERSION:
+            return self.latest()
+        return version
+
+    def info(self) -> Dict:
+        return {
+            "artifact_dir": self.artifact_dir,
+            "active_version": self.active_version,
+            "available": self.available(),
+            "loaded": [model.info() for model in reversed(self.loaded.values())],
+        }
@@ -0,0 +1,242 @@
+"""
+모델 학습 파이프라인 - 청크 단위 증분 학습 (partial_fit), 백그라운드 프로세스 풀 실행
+"""
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import suppress
+from datetime import datetime
+from typing import Dict, List, Optional
+import numpy as np
+
+from services.history_store import STATUS_LABELS
+from services.record_reader import DEFAULT_CHUNK_SIZE, RECORD_FEATURES, iter_source_chunks, records_to_arrays
+
+
+# 학습 프로세스 수 / 보관할 작업 이력 수
+TRAINING_WORKERS = int(os.getenv("TRAINING_WORKERS", "1"))
+TRAINING_JOB_HISTORY = int(os.getenv("TRAINING_JOB_HISTORY", "50"))
+
+# 학습 결과(가중치) 저장 위치
+MODEL_ARTIFACT_DIR = os.getenv("MODEL_ARTIFACT_DIR", "./model_artifacts")
+
+STATUS_CLASSES = np.arange(len(STATUS_LABELS))
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+
+def train_incremental(job_id: str, source: Dict, progress, artifact_dir: str = MODEL_ARTIFACT_DIR,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict:
+    """청크 단위 증분 학습 (학습 프로세스에서 실행)
+
+    특성 표준화(StandardScaler)와 모델(SGDClassifier: 상태, SGDRegressor: 잔존 수명)을
+    청크마다 partial_fit 하므로 메모리 사용량은 데이터 크기와 무관하게 청크 하나 분량이다.
+    progress: 진행 상황을 기록할 공유 딕셔너리 (Manager.dict)
+    """
+    from sklearn.linear_model import SGDClassifier, SGDRegressor
+    from sklearn.preprocessing import StandardScaler
+
+    scaler = StandardScaler()
+    classifier = SGDClassifier(loss="log_loss", random_state=0)
+    regressor = SGDRegressor(random_state=0)
+    classifier_samples = 0
+    regressor_samples = 0
+    records = 0
+    skipped = 0
+    correct = 0
+    scored = 0
+
+    progress.update({"status": JOB_RUNNING, "started_at": datetime.now().isoformat()})
+    for chunk_index, (chunk, fraction) in enumerate(iter_source_chunks(source, chunk_size), start=1):
+        features, labels = records_to_arrays(chunk)
+        skipped += len(chunk) - len(features)
+        records += len(features)
+        if len(features):
+            scaler.partial_fit(features)
+            scaled = scaler.transform(features)
+
+            has_status = labels["status"] >= 0
+            if has_status.any():
+                x, y = scaled[has_status], labels["status"][has_status]
+                if classifier_samples:
+                    # 학습 전 예측으로 온라인 정확도 추정 (progressive validation)
+                    correct += int((classifier.predict(x) == y).sum())
+                    scored += len(y)
+                classifier.partial_fit(x, y, classes=STATUS_CLASSES)
+                classifier_samples += len(y)
+
+            has_rul = np.isfinite(labels["rul_days"])
+            if has_rul.any():
+                regressor.partial_fit(scaled[has_rul], labels["rul_days"][has_rul])
+                regressor_samples += int(has_rul.sum())
+
+        progress.update({
+            "chunks": chunk_index,
+            "records": records,
+            "skipped": skipped,
+            "progress": round(fraction, 4),
+        })
+
+    if not classifier_samples and not regressor_samples:
+        raise ValueError("학습 가능한 레코드가 없습니다 (status 또는 rul_days 라벨 필요)")
+
+    version = f"{datetime.now():%Y%m%d%H%M%S}-{job_id[:8]}"
+    weights = {
+        "scaler_mean": scaler.mean_,
+        "scaler_scale": scaler.scale_,
+    }
+    if classifier_samples:
+        weights["classifier_coef"] = classifier.coef_
+        weights["classifier_intercept"] = classifier.intercept_
+    if regressor_samples:
+        weights["regressor_coef"] = regressor.coef_
+        weights["regressor_intercept"] = regressor.intercept_
+
+    meta = {
+        "version": version,
+        "job_id": job_id,
+        "created_at": datetime.now().isoformat(),
+        "features": list(RECORD_FEATURES),
+        "status_classes": list(STATUS_LABELS),
+        "records": records,
+        "skipped": skipped,
+        "classifier_samples": classifier_samples,
+        "regressor_samples": regressor_samples,
+        "online_accuracy": round(correct / scored, 4) if scored else None,
+    }
+    path = save_artifact(artifact_dir, version, weights, meta)
+    return {**meta, "artifact_path": path}
+
+
+def save_artifact(artifact_dir: str, version: str, weights: Dict[str, np.ndarray], meta: Dict) -> str:
+    """가중치를 버전 디렉터리에 .npy로 저장 (임시 디렉터리에 쓴 뒤 이름 변경 - 부분 저장본 노출 없음)"""
+    os.makedirs(artifact_dir, exist_ok=True)
+    final = os.path.join(artifact_dir, version)
+    staging = os.path.join(artifact_dir, f".{version}.tmp")
+    os.makedirs(staging, exist_ok=True)
+    try:
+        for name, array in weights.items():
+            np.save(os.path.join(staging, f"{name}.npy"), np.ascontiguousarray(array, dtype=np.float64))
+        with open(os.path.join(staging, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        os.replace(staging, final)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return final
+
+
+class TrainingJobManager:
+    """학습 작업 관리자
+
+    작업은 별도 프로세스 풀에서 실행되므로 학습 중에도 이벤트 루프와 API 응답이
+    영향을 받지 않는다. 진행 상황은 Manager 공유 딕셔너리로 전달받는다.
+    프로세스 풀은 첫 작업 제출 시 생성한다.
+    """
+
+    def __init__(self, max_workers: int = TRAINING_WORKERS, artifact_dir: str = MODEL_ARTIFACT_DIR,
+                 history_size: int = TRAINING_JOB_HISTORY):
+        self.max_workers = max_workers
+        self.artifact_dir = artifact_dir
+        self.history_size = history_size
+        self.jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+
+    def _ensure_started(self):
+        if self._executor is None:
+            # fork는 부모의 스레드(저장소 쓰기 스레드 등) 상태를 복제하므로 spawn 사용
+            context = multiprocessing.get_context("spawn")
+            self._manager = context.Manager()
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+
+    def submit(self, source: Dict, description: Optional[Dict] = None, cleanup_path: Optional[str] = None) -> Dict:
+        """학습 작업 제출 - 즉시 반환 (작업 상태는 get()으로 조회)"""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._ensure_started()
+            progress = self._manager.dict({
+                "status": JOB_QUEUED, "chunks": 0, "records": 0, "skipped": 0, "progress": 0.0,
+            })
+            job = {
+                "job_id": job_id,
+                "source": description or {"type": source["type"]},
+                "submitted_at": datetime.now().isoformat(),
+                "finished_at": None,
+                "result": None,
+                "error": None,
+                "_progress": progress,
+                "_final": None,
+            }
+            self.jobs[job_id] = job
+            while len(self.jobs) > self.history_size:
+                oldest = next(iter(self.jobs.values()))
+                if oldest["_final"] is None:
+                    break
+                self.jobs.popitem(last=False)
+
+            future = self._executor.submit(train_incremental, job_id, source, progress, self.artifact_dir)
+        future.add_done_callback(lambda f: self._finish(job_id, f, cleanup_path))
+        return self.get(job_id)
+
+    def _finish(self, job_id: str, future: Future, cleanup_path: Optional[str]):
+        if cleanup_path:
+            with suppress(OSError):
+                os.remove(cleanup_path)
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            final = dict(job["_progress"]) if not future.cancelled() else {}
+            if future.cancelled():
+                final["status"] = JOB_FAILED
+                job["error"] = "작업이 취소되었습니다"
+            elif future.exception() is not None:
+                final["status"] = JOB_FAILED
+                job["error"] = str(future.exception())
+            else:
+                final["status"] = JOB_COMPLETED
+                final["progress"] = 1.0
+                job["result"] = future.result()
+            job["finished_at"] = datetime.now().isoformat()
+            # 완료 후에는 공유 딕셔너리 대신 마지막 값을 보관
+            job["_final"] = final
+            job["_progress"] = None
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """작업 상태 (진행 중이면 학습 프로세스가 기록한 최신 진행 상황 포함)"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            state = job["_final"]
+            if state is None:
+                try:
+                    state = dict(job["_progress"])
+                except Exception:
+                    state = {"status": JOB_RUNNING}
+        return {
+            **{k: v for k, v in job.items() if not k.startswith("_")},
+            **state,
+        }
+
+    def list(self) -> List[Dict]:
+        return [self.get(job_id) for job_id in reversed(list(self.jobs))]
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+
@@ -0,0 +1,190 @@
+"""
+예측 캐시 - 배터리 ID + 모델 버전 + 양자화된 특성을 키로 하는 LRU/TTL 캐시 (배치 단위 조회/저장)
+"""
+import os
+import threading
+import time
+import zlib
+from typing import Dict, Optional, Tuple
+import numpy as np
+
+from services.metrics import PREDICTION_CACHE_LOOKUPS
+
+
+# 최대 항목 수 (0이면 캐시 비활성화) / 항목 유효 시간 (초)
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "200000"))
+PREDICTION_CACHE_TTL_SECONDS = float(os.getenv("PREDICTION_CACHE_TTL_SECONDS", "30"))
+
+# 특성별 양자화 단위 - 이 단위 안의 변화는 같은 예측을 재사용
+DEFAULT_RESOLUTION = {
+    "soc": 0.5,
+    "soh": 0.1,
+    "temperature": 0.5,
+    "voltage": 0.01,
+    "current": 0.1,
+    "cycle_count": 1,
+    "cell_imbalance": 1,
+    "drift_score": 0.05,
+    # 활성 알림 비트마스크 (정수 - 그대로 키에 포함)
+    "active_alerts": 1,
+}
+
+# 배터리 ID 하나가 동시에 가질 수 있는 캐시 항목 수 (세트당 웨이 수)
+PREDICTION_CACHE_WAYS = 2
+
+
+def parse_resolution(text: str) -> Dict[str, float]:
+    """"soc=0.5,temperature=0.5" 형식의 양자화 단위 설정 파싱"""
+    resolution = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        name, _, value = item.partition("=")
+        if name not in DEFAULT_RESOLUTION:
+            raise ValueError(f"알 수 없는 특성: {name}")
+        resolution[name] = float(value)
+        if resolution[name] <= 0:
+            raise ValueError(f"{name} 양자화 단위는 0보다 커야 합니다")
+    return resolution
+
+
+class PredictionCache:
+    """배치 예측 결과 캐시 (세트 연관 LRU)
+
+    항목은 (세트 × 웨이) 슬롯 배열에 열 단위로 저장한다. 배터리 ID로 세트를 정하고
+    세트 안의 웨이들과 키 행렬(배터리 ID + 모델 버전 + 양자화 특성)을 비교하므로 조회/저장이
+    배터리별 파이썬 루프 없이 벡터 연산으로 끝난다. 세트가 가득 차면 그 세트에서
+    마지막 사용 시점이 가장 오래된 웨이를 비우고(LRU), TTL이 지난 항목은 미스로 처리한다.
+    """
+
+    def __init__(self, max_entries: int = PREDICTION_CACHE_SIZE,
+                 ttl_seconds: float = PREDICTION_CACHE_TTL_SECONDS,
+                 resolution: Optional[Dict[str, float]] = None,
+                 ways: int = PREDICTION_CACHE_WAYS):
+        if max_entries < ways:
+            raise ValueError("max_entries는 웨이 수 이상이어야 합니다")
+        self.ways = ways
+        self.sets = max_entries // ways
+        self.max_entries = self.sets * ways
+        self.ttl_seconds = ttl_seconds
+        self.resolution = {**DEFAULT_RESOLUTION, **(resolution or {})}
+        self.features = tuple(self.resolution)
+        self._lock = threading.Lock()
+
+        shape = (self.sets, ways)
+        self._keys = np.zeros((*shape, len(self.features) + 2), dtype=np.int64)
+        self._occupied = np.zeros(shape, dtype=bool)
+        self._created = np.zeros(shape, dtype=np.float64)
+        self._last_used = np.zeros(shape, dtype=np.int64)
+        self._values: Dict[str, np.ndarray] = {}
+        self._clock = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return int(self._occupied.sum())
+
+    def quantize(self, battery_ids: np.ndarray, features: Dict[str, np.ndarray],
+                 model_version: Optional[str] = None) -> np.ndarray:
+        """(배터리 수 × (2 + 특성 수)) 키 행렬 - 첫 열은 배터리 ID, 둘째 열은 모델 버전 (None: 기본 모델)"""
+        n = len(battery_ids)
+        keys = np.empty((n, len(self.features) + 2), dtype=np.int64)
+        keys[:, 0] = battery_ids
+        keys[:, 1] = 0 if model_version is None else zlib.crc32(model_version.encode("utf-8")) + 1
+        for j, name in enumerate(self.features, start=2):
+            values = features.get(name)
+            if values is None:
+                keys[:, j] = 0
+            else:
+                keys[:, j] = np.round(np.asarray(values, dtype=np.float64) / self.resolution[name])
+        return keys
+
+    def _match(self, keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """키별 (세트, 웨이별 일치 여부)"""
+        sets = keys[:, 0] % self.sets
+        match = (self._keys[sets] == keys[:, None, :]).all(axis=2) & self._occupied[sets]
+        return sets, match
+
+    def lookup(self, keys: np.ndarray, now: Optional[float] = None) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """키 행렬 조회 → (적중 마스크, 적중한 행의 예측 결과 배열)
+
+        결과는 같은 잠금 안에서 복사하므로 동시에 store()가 슬롯을 덮어써도 섞이지 않는다.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            sets, match = self._match(keys)
+            way = match.argmax(axis=1)
+            found = match[np.arange(len(keys)), way]
+            fresh = now - self._created[sets, way] < self.ttl_seconds
+            hit = found & fresh
+
+            self._clock += 1
+            self._last_used[sets[hit], way[hit]] = self._clock
+            hit_count = int(hit.sum())
+            self.hits += hit_count
+            self.misses += len(keys) - hit_count
+            self.expirations += int((found & ~fresh).sum())
+            slots = sets[hit] * self.ways + way[hit]
+            cached = {name: values[slots] for name, values in self._values.items()}
+
+        PREDICTION_CACHE_LOOKUPS.labels("hit").inc(hit_count)
+        PREDICTION_CACHE_LOOKUPS.labels("miss").inc(len(keys) - hit_count)
+        return hit, cached
+
+    def store(self, keys: np.ndarray, batch: Dict[str, np.ndarray], now: Optional[float] = None):
+        """예측 결과 저장 - 같은 키는 덮어쓰고, 없으면 세트의 LRU 웨이를 사용"""
+        now = time.monotonic() if now is None else now
+        rows = np.arange(len(keys))
+        with self._lock:
+            while len(rows):
+                # 같은 세트에 들어갈 행이 여럿이면 세트마다 한 행씩 나눠 저장
+                _, first = np.unique(keys[rows, 0] % self.sets, return_index=True)
+                self._store_rows(keys, batch, rows[first], now)
+                rows = np.delete(rows, first)
+
+    def _store_rows(self, keys: np.ndarray, batch: Dict[str, np.ndarray], rows: np.ndarray, now: float):
+        sets, match = self._match(keys[rows])
+        existing = match.any(axis=1)
+        occupied = self._occupied[sets]
+        lru_way = np.where(occupied, self._last_used[sets], -1).argmin(axis=1)
+        way = np.where(existing, match.argmax(axis=1), lru_way)
+        self.evictions += int((~existing & occupied[np.arange(len(rows)), way]).sum())
+
+        self._clock += 1
+        self._keys[sets, way] = keys[rows]
+        self._occupied[sets, way] = True
+        self._created[sets, way] = now
+        self._last_used[sets, way] = self._clock
+        slots = sets * self.ways + way
+        for name, values in batch.items():
+            store = self._values.get(name)
+            if store is None:
+                store = self._values[name] = np.zeros(self.max_entries, dtype=values.dtype)
+            store[slots] = values[rows]
+
+    def clear(self):
+        with self._lock:
+            self._occupied[:] = False
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "resolution": self.resolution,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+def create_prediction_cache() -> Optional[PredictionCache]:
+    """환경 설정으로 캐시 생성 (PREDICTION_CACHE_SIZE=0 이면 None)"""
+    if PREDICTION_CACHE_SIZE <= 0:
+        return None
+    resolution = parse_resolution(os.getenv("PREDICTION_CACHE_RESOLUTION", ""))
+    return PredictionCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL_SECONDS, resolution)
@@ -0,0 +1,241 @@
+"""
+레코드 리더 - NDJSON/CSV/JSON 배열 파일과 저장된 히스토리를 고정 크기 청크로 스트리밍 (메모리 사용량 일정)
+"""
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+
+from services.history_store import STATUS_LABELS, CELL_BALANCE_LABELS
+
+
+# 모델 입력 특성 (AIService.predict_batch 인자와 같은 순서)
+RECORD_FEATURES = ("soc", "soh", "temperature", "voltage", "current", "cycle_count", "cell_imbalance")
+
+# 청크 크기 (레코드 수)
+DEFAULT_CHUNK_SIZE = int(os.getenv("RECORD_CHUNK_SIZE", "5000"))
+
+FORMAT_NDJSON = "ndjson"
+FORMAT_CSV = "csv"
+FORMAT_JSON = "json"
+RECORD_FORMATS = (FORMAT_NDJSON, FORMAT_CSV, FORMAT_JSON)
+
+# JSON 배열 파일을 읽는 단위 (문자 수) - 레코드 하나가 이보다 길면 다 읽힐 때까지 이어 붙임
+JSON_READ_CHARS = 64 * 1024
+
+_STATUS_CODES = {label: code for code, label in enumerate(STATUS_LABELS)}
+
+
+def detect_format(filename: Optional[str] = None, content_type: Optional[str] = None) -> str:
+    """파일 이름 / Content-Type으로 형식 판별 (알 수 없으면 NDJSON)"""
+    content_type = (content_type or "").lower()
+    name = (filename or "").lower()
+    if "csv" in content_type or name.endswith(".csv"):
+        return FORMAT_CSV
+    if content_type.startswith("application/json") or name.endswith(".json"):
+        return FORMAT_JSON
+    return FORMAT_NDJSON
+
+
+class _CountingReader(io.RawIOBase):
+    """읽은 바이트 수를 세는 파일 래퍼 (진행률 계산용)"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        n = self.raw.readinto(buffer)
+        self.bytes_read += n or 0
+        return n
+
+
+def iter_file_chunks(path: str, fmt: str = FORMAT_NDJSON,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Tuple[List[Dict], float]]:
+    """NDJSON/CSV/JSON 배열 파일 → (레코드 청크, 진행률 0~1)"""
+    total = max(os.path.getsize(path), 1)
+    with open(path, "rb", buffering=0) as raw:
+        counter = _CountingReader(raw)
+        text = io.TextIOWrapper(io.BufferedReader(counter), encoding="utf-8-sig", newline="")
+        if fmt == FORMAT_CSV:
+            rows = csv.DictReader(text)
+        elif fmt == FORMAT_JSON:
+            rows = _json_array_rows(text)
+        else:
+            rows = _ndjson_rows(text)
+
+        chunk: List[Dict] = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk, min(counter.bytes_read / total, 1.0)
+                chunk = []
+        if chunk:
+            yield chunk, 1.0
+
+
+def _ndjson_rows(lines) -> Iterator[Dict]:
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{number}번째 줄: 잘못된 JSON ({e.msg})") from None
+        if not isinstance(record, dict):
+            raise ValueError(f"{number}번째 줄: JSON 객체가 아닙니다")
+        yield record
+
+
+def _json_array_rows(text, read_chars: int = JSON_READ_CHARS) -> Iterator[Dict]:
+    """JSON 배열 ([{...}, {...}]) 을 조금씩 읽으며 원소를 하나씩 반환 - 전체 배열을 메모리에 올리지 않음"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def peek() -> str:
+        # 공백을 건너뛴 다음 문자 (필요하면 더 읽음, 파일 끝이면 "")
+        nonlocal buffer, pos, eof
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer) or eof:
+                return buffer[pos:pos + 1]
+            buffer, pos = text.read(read_chars), 0
+            eof = not buffer
+
+    if peek() != "[":
+        raise ValueError("JSON 레코드 배열이 필요합니다")
+    pos += 1
+    number = 0
+    if peek() == "]":
+        pos += 1
+    else:
+        while True:
+            number += 1
+            if not peek():
+                raise ValueError(f"{number}번째 레코드: 배열이 끝나지 않았습니다")
+            while True:
+                try:
+                    record, end = decoder.raw_decode(buffer, pos)
+                    # 버퍼 끝에서 끝난 숫자 등은 다음 조각에 이어질 수 있음
+                    if end < len(buffer) or eof:
+                        break
+                except json.JSONDecodeError as e:
+                    if eof:
+                        raise ValueError(f"{number}번째 레코드: 잘못된 JSON ({e.msg})") from None
+                more = text.read(read_chars)
+                buffer, pos, eof = buffer[pos:] + more, 0, not more
+            pos = end
+            if not isinstance(record, dict):
+                raise ValueError(f"{number}번째 레코드: JSON 객체가 아닙니다")
+            yield record
+            separator = peek()
+            pos += 1
+            if separator == "]":
+                break
+            if separator != ",":
+                raise ValueError(f"{number}번째 레코드 뒤: ',' 또는 ']'가 필요합니다")
+    if peek():
+        raise ValueError("JSON 배열 뒤에 불필요한 데이터가 있습니다")
+
+
+def iter_history_chunks(database_url: str, start: float, end: float, battery_id: Optional[int] = None,
+                        chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Tuple[List[Dict], float]]:
+    """영구 저장소 측정값 → (레코드 청크, 진행률 0~1 - 조회 구간 중 처리한 시간 비율)"""
+    from services.telemetry_store import TelemetryStore
+
+    # 조회 전용 연결 - 학습 워커에서 쓰기 스레드를 시작하거나 DB 파일을 만들지 않음
+    store = TelemetryStore(database_url, read_only=True)
+    span = max(end - start, 1e-9)
+    try:
+        for chunk in store.iter_range(start, end, battery_id, chunk_size):
+            last = datetime.fromisoformat(chunk[-1]["timestamp"]).timestamp()
+            yield chunk, min(max((last - start) / span, 0.0), 1.0)
+    finally:
+        store.close()
+
+
+def iter_source_chunks(source: Dict, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Tuple[List[Dict], float]]:
+    """학습/평가 데이터 소스 → 레코드 청크
+
+    source:
+        {"type": "file", "path": ..., "format": "ndjson" | "csv" | "json"}
+        {"type": "history", "database_url": ..., "start": epoch, "end": epoch, "battery_id": 선택}
+    """
+    if source["type"] == "file":
+        return iter_file_chunks(source["path"], source.get("format", FORMAT_NDJSON), chunk_size)
+    if source["type"] == "history":
+        return iter_history_chunks(source["database_url"], source["start"], source["end"],
+                                   source.get("battery_id"), chunk_size)
+    raise ValueError(f"지원하지 않는 데이터 소스: {source['type']}")
+
+
+def _float_column(records: List[Dict], name: str) -> np.ndarray:
+    """레코드 목록 → float 열 (없거나 숫자가 아니면 NaN)"""
+    values = np.full(len(records), np.nan)
+    for i, record in enumerate(records):
+        value = record.get(name)
+        if value is None or value == "":
+            continue
+        try:
+            values[i] = float(value)
+        except (TypeError, ValueError):
+            pass
+    return values
+
+
+def _cell_imbalance_column(records: List[Dict]) -> np.ndarray:
+    values = np.zeros(len(records))
+    for i, record in enumerate(records):
+        value = record.get("cell_imbalance")
+        if value is None:
+            value = record.get("cell_balance") in (CELL_BALANCE_LABELS[1], 1, "1")
+        elif isinstance(value, str):
+            value = value.strip().lower() in ("1", "true", "yes", CELL_BALANCE_LABELS[1])
+        values[i] = float(bool(value))
+    return values
+
+
+def _status_column(records: List[Dict]) -> np.ndarray:
+    """상태 라벨/코드 → 코드 (없거나 알 수 없으면 -1)"""
+    codes = np.full(len(records), -1, dtype=np.int64)
+    for i, record in enumerate(records):
+        value = record.get("status")
+        if value in _STATUS_CODES:
+            codes[i] = _STATUS_CODES[value]
+        elif value not in (None, ""):
+            try:
+                code = int(value)
+            except (TypeError, ValueError):
+                continue
+            if 0 <= code < len(STATUS_LABELS):
+                codes[i] = code
+    return codes
+
+
+def records_to_arrays(records: List[Dict]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """레코드 청크 → (특성 행렬 (n × RECORD_FEATURES), 라벨 배열)
+
+    특성이 하나라도 빠진 레코드는 제외한다.
+    라벨: status (코드, 없으면 -1), rul_days (없으면 NaN)
+    """
+    columns = [
+        _cell_imbalance_column(records) if name == "cell_imbalance" else _float_column(records, name)
+        for name in RECORD_FEATURES
+    ]
+    features = np.column_stack(columns) if records else np.empty((0, len(RECORD_FEATURES)))
+    valid = np.isfinite(features).all(axis=1)
+    labels = {
+        "status": _status_column(records)[valid],
+        "rul_days": _float_column(records, "rul_days")[valid],
+    }
+    return features[valid], labels
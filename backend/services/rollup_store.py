@@ -0,0 +1,178 @@
+"""
+롤업 저장소 - 분/시/일 단위 사전 집계 (min/max/sum/count), 스냅샷마다 증분 갱신
+"""
+import os
+import time
+from typing import Dict, Optional, Sequence, Tuple
+import numpy as np
+
+
+# 집계 대상 지표
+ROLLUP_METRICS = ("power_current", "voltage", "current", "temperature", "soc", "soh", "energy_today")
+
+# 해상도 (이름, 버킷 길이(초), 보관 버킷 수)
+ROLLUP_RESOLUTIONS = (
+    ("minute", 60, 2 * 24 * 60),
+    ("hour", 3600, 90 * 24),
+    ("day", 86400, 400),
+)
+
+# 해상도별 (버킷 수 × 배터리 수) 상한 - 대규모 플릿의 메모리 사용량 제한
+DEFAULT_ROLLUP_MAX_CELLS = int(os.getenv("ROLLUP_MAX_CELLS", "1000000"))
+
+
+def _local_offset(timestamp: float) -> int:
+    """로컬 타임존 UTC 오프셋 (초) - 일 버킷을 로컬 자정 기준으로 맞춤"""
+    return time.localtime(timestamp).tm_gmtoff
+
+
+class RollupSeries:
+    """한 해상도의 버킷 링 (버킷 × 배터리 배열)"""
+
+    def __init__(self, name: str, width: int, capacity: int, battery_count: int):
+        self.name = name
+        self.width = width
+        self.capacity = capacity
+        self.bucket_ids = np.full(capacity, -1, dtype=np.int64)
+        self.count = np.zeros((capacity, battery_count), dtype=np.int32)
+        self.sum = {m: np.zeros((capacity, battery_count), dtype=np.float64) for m in ROLLUP_METRICS}
+        self.min = {m: np.full((capacity, battery_count), np.inf, dtype=np.float32) for m in ROLLUP_METRICS}
+        self.max = {m: np.full((capacity, battery_count), -np.inf, dtype=np.float32) for m in ROLLUP_METRICS}
+
+    def bucket_of(self, timestamp: float) -> int:
+        return int((timestamp + _local_offset(timestamp)) // self.width)
+
+    def bucket_start(self, bucket: np.ndarray) -> np.ndarray:
+        """버킷 번호 → 버킷 시작 epoch 초"""
+        starts = bucket * self.width
+        return starts - np.array([_local_offset(ts) for ts in starts.tolist()], dtype=np.int64)
+
+    def update(self, timestamp: float, metrics: Dict[str, np.ndarray], rows: Optional[np.ndarray] = None):
+        """측정값 한 틱 반영 - O(배터리 수) (rows를 주면 그 배터리 행만)"""
+        cols = slice(None) if rows is None else rows
+        bucket = self.bucket_of(timestamp)
+        slot = bucket % self.capacity
+
+        if self.bucket_ids[slot] != bucket:
+            # 오래된 버킷 재사용
+            self.bucket_ids[slot] = bucket
+            self.count[slot] = 0
+            for m in ROLLUP_METRICS:
+                self.sum[m][slot] = 0
+                self.min[m][slot] = np.inf
+                self.max[m][slot] = -np.inf
+
+        self.count[slot, cols] += 1
+        for m in ROLLUP_METRICS:
+            values = metrics[m] if rows is None else metrics[m][rows]
+            self.sum[m][slot, cols] += values
+            self.min[m][slot, cols] = np.minimum(self.min[m][slot, cols], values)
+            self.max[m][slot, cols] = np.maximum(self.max[m][slot, cols], values)
+
+    def copy_from(self, old: "RollupSeries", new_cols: np.ndarray, old_cols: np.ndarray):
+        """이전 링의 버킷을 옮김 (용량이 줄면 최근 버킷만)"""
+        valid = np.flatnonzero(old.bucket_ids >= 0)
+        buckets = old.bucket_ids[valid]
+        keep = buckets > buckets.max(initial=-1) - self.capacity
+        old_slots, buckets = valid[keep], buckets[keep]
+        slots = buckets % self.capacity
+        self.bucket_ids[slots] = buckets
+        self.count[np.ix_(slots, new_cols)] = old.count[np.ix_(old_slots, old_cols)]
+        for m in ROLLUP_METRICS:
+            for target, source in ((self.sum, old.sum), (self.min, old.min), (self.max, old.max)):
+                target[m][np.ix_(slots, new_cols)] = source[m][np.ix_(old_slots, old_cols)]
+
+    def window(self, points: int) -> Tuple[np.ndarray, np.ndarray]:
+        """현재 시각 기준 최근 points개 버킷 중 데이터가 있는 버킷 (버킷 번호, 슬롯) - 시간순"""
+        points = min(points, self.capacity)
+        current = self.bucket_of(time.time())
+        buckets = np.arange(current - points + 1, current + 1, dtype=np.int64)
+        slots = buckets % self.capacity
+        valid = self.bucket_ids[slots] == buckets
+        return buckets[valid], slots[valid]
+
+
+class RollupStore:
+    """분/시/일 롤업 엔진
+
+    스냅샷이 들어올 때마다 모든 해상도의 현재 버킷을 벡터 연산으로 갱신하므로
+    차트 조회는 기간과 무관하게 요청한 포인트 수만큼의 버킷만 읽는다.
+    """
+
+    def __init__(self, max_cells: int = DEFAULT_ROLLUP_MAX_CELLS):
+        self.max_cells = max_cells
+        self._allocate(np.zeros(0, dtype=np.int64))
+
+    def _allocate(self, battery_ids: np.ndarray):
+        battery_count = len(battery_ids)
+        self.battery_ids = battery_ids.copy()
+        self.battery_count = battery_count
+        self.series: Dict[str, RollupSeries] = {
+            name: RollupSeries(name, width, max(1, min(capacity, self.max_cells // max(battery_count, 1))),
+                               battery_count)
+            for name, width, capacity in ROLLUP_RESOLUTIONS
+        }
+
+    def capacity(self, resolution: str) -> int:
+        """해상도별 보관 버킷 수"""
+        return self.series[resolution].capacity
+
+    def _remap(self, battery_ids: np.ndarray):
+        """플릿 구성이 바뀌면 남은 배터리의 버킷을 옮김 (새 배터리의 지난 버킷은 측정값 없음)"""
+        old_ids, old_series = self.battery_ids, self.series
+        self._allocate(battery_ids)
+        _, new_cols, old_cols = np.intersect1d(battery_ids, old_ids, assume_unique=True, return_indices=True)
+        for name, series in self.series.items():
+            series.copy_from(old_series[name], new_cols, old_cols)
+
+    def update(self, timestamp: float, battery_ids: np.ndarray, metrics: Dict[str, np.ndarray],
+               rows: Optional[np.ndarray] = None):
+        """스냅샷 반영 - rows를 주면 그 배터리 행만 (직전 값을 유지한 배터리는 제외)"""
+        if not np.array_equal(battery_ids, self.battery_ids):
+            self._remap(battery_ids)
+        for series in self.series.values():
+            series.update(timestamp, metrics, rows)
+
+    def aggregate(self, resolution: str, metrics: Sequence[str], points: int,
+                  battery_index: Optional[int] = None, per_battery: bool = False) -> Dict[str, np.ndarray]:
+        """최근 points개 버킷의 집계값
+
+        battery_index를 주면 해당 배터리, per_battery=True 이면 (버킷 × 배터리) 배열,
+        둘 다 아니면 플릿 전체(배터리 합산) 기준.
+        반환: timestamp(버킷 시작 epoch 초), count, {metric}_mean/_min/_max/_sum
+        """
+        series = self.series[resolution]
+        buckets, slots = series.window(points)
+        cols = slice(None) if battery_index is None else battery_index
+        fleet = battery_index is None and not per_battery
+
+        count = series.count[slots, cols]
+        result = {"timestamp": series.bucket_start(buckets)}
+        if fleet:
+            count = count.sum(axis=1)
+        result["count"] = count
+
+        safe_count = np.maximum(count, 1)
+        for m in metrics:
+            total = series.sum[m][slots, cols]
+            low = series.min[m][slots, cols]
+            high = series.max[m][slots, cols]
+            if fleet:
+                total, low, high = total.sum(axis=1), low.min(axis=1), high.max(axis=1)
+            result[f"{m}_sum"] = total
+            result[f"{m}_mean"] = total / safe_count
+            result[f"{m}_min"] = low
+            result[f"{m}_max"] = high
+        return result
+
+    def per_battery_max_mean(self, resolution: str, metric: str, points: int) -> Dict[str, np.ndarray]:
+        """버킷별 (배터리별 최대값)의 플릿 평균 - 예: 일별 발전량"""
+        series = self.series[resolution]
+        buckets, slots = series.window(points)
+        high = series.max[metric][slots].astype(np.float64)
+        reported = series.count[slots] > 0
+        totals = np.where(reported, high, 0.0).sum(axis=1)
+        return {
+            "timestamp": series.bucket_start(buckets),
+            "value": totals / np.maximum(reported.sum(axis=1), 1),
+        }
@@ -0,0 +1,41 @@
+"""
+응답 직렬화 - 고속 JSON 응답 클래스 (orjson), 컬럼형 응답 형식
+"""
+from typing import Any
+import numpy as np
+import orjson
+from fastapi.responses import JSONResponse
+
+
+# 응답 형식 (format 파라미터) - 레코드 목록 / 컬럼 배열
+FORMAT_RECORDS = "records"
+FORMAT_COLUMNAR = "columnar"
+FORMAT_PATTERN = f"^({FORMAT_RECORDS}|{FORMAT_COLUMNAR})$"
+
+
+def _default(value: Any) -> Any:
+    """JSON 기본 타입이 아닌 값 변환 (NumPy 스칼라/배열)"""
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    raise TypeError(f"JSON으로 직렬화할 수 없는 타입: {type(value).__name__}")
+
+
+def encode_json(payload: Any) -> bytes:
+    """응답 본문 JSON 인코딩 (UTF-8, 공백 없음 - NaN/Infinity는 null)"""
+    return orjson.dumps(payload, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+class FastJSONResponse(JSONResponse):
+    """고속 JSON 응답 (opt-in)
+
+    라우트가 이 응답을 직접 반환하면 FastAPI의 jsonable_encoder 변환을 거치지 않고
+    바로 직렬화한다. 내용은 JSON 기본 타입이나 NumPy 스칼라/배열이어야 한다.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return encode_json(content)
+
+
+def epoch_millis(timestamps: np.ndarray) -> list:
+    """epoch 초 배열 → epoch 밀리초 정수 목록 (컬럼형 응답의 timestamps)"""
+    return np.rint(np.asarray(timestamps, dtype=np.float64) * 1000).astype(np.int64).tolist()
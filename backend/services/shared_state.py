@@ -0,0 +1,549 @@
+"""
+공유 메모리 텔레메트리 상태 - 멀티 워커(uvicorn --workers)에서 프로듀서 워커 하나가 기록한
+히스토리 링 버퍼를 모든 워커가 같은 메모리로 조회
+"""
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+from services.history_store import (
+    BATTERY_METRICS, DEFAULT_HISTORY_CAPACITY, DEFAULT_HISTORY_MAX_SAMPLES, SYSTEM_METRICS, HistoryStore,
+    metric_dtype,
+)
+from services.metrics import SHARED_STATE_PRODUCER
+from services.telemetry_ingest import METRIC_FIELDS, QueueFullError, ReadingBatch
+
+try:
+    import fcntl
+except ImportError:  # POSIX 전용 - Windows에서는 공유 상태 모드 비활성화
+    fcntl = None
+
+
+# 멀티 워커 공유 상태 사용 여부 (기본: 워커마다 독립 상태)
+SHARED_STATE_ENABLED = os.getenv("SHARED_STATE", "0") == "1"
+
+# 공유 메모리 세그먼트 이름 접두어 / 프로듀서 선출용 잠금 파일 (같은 값을 쓰는 워커끼리 상태 공유)
+SHARED_STATE_NAME = os.getenv("SHARED_STATE_NAME", "battery_telemetry")
+SHARED_STATE_LOCK_PATH = os.getenv(
+    "SHARED_STATE_LOCK_PATH", os.path.join(tempfile.gettempdir(), f"{SHARED_STATE_NAME}.lock")
+)
+
+# 공유 상태 틱 주기 (초) - 프로듀서는 새 틱 기록, 나머지 워커는 기록된 틱 반영 및 프로듀서 승계 시도
+SHARED_STATE_TICK_SECONDS = float(os.getenv("SHARED_STATE_TICK_SECONDS", "1.0"))
+
+# 워커 시작/승계 시 되짚는 최근 틱 수 (통계/롤업/알림/드리프트 상태 복원 범위)
+SHARED_STATE_REPLAY_TICKS = int(os.getenv("SHARED_STATE_REPLAY_TICKS", "3600"))
+
+# 프로듀서가 아닌 워커가 받은 측정값을 프로듀서에 넘기는 공유 큐 크기 (측정값 수, 초과 시 429)
+SHARED_INGEST_QUEUE_READINGS = int(os.getenv("SHARED_INGEST_QUEUE_READINGS", "100000"))
+
+# 제어 세그먼트 필드 (int64)
+_CONTROL_GENERATION = 0
+_CONTROL_PRODUCER_PID = 1
+_CONTROL_LIVE = 2
+_CONTROL_FIELDS = 8
+
+# 히스토리 세그먼트 헤더 필드 (int64) - 쓰기 위치/크기도 헤더에 두어 모든 워커가 같은 값을 읽는다
+_HEADER_BATTERY_COUNT = 0
+_HEADER_CAPACITY = 1
+_HEADER_NEXT = 2
+_HEADER_SIZE = 3
+_HEADER_META_OFFSET = 4
+_HEADER_META_LENGTH = 5
+_HEADER_SEQUENCE = 6
+_HEADER_FIELDS = 8
+
+# 전달 큐 세그먼트 헤더 필드 (int64) - 위치는 누적 측정값 수 (용량으로 나눈 나머지가 링 위치)
+_QUEUE_CAPACITY = 0
+_QUEUE_HEAD = 1
+_QUEUE_TAIL = 2
+_QUEUE_APPLIED = 3
+_QUEUE_FIELDS = 8
+
+# 전달 큐 레코드 (수치 NaN / 범주 -1은 생략된 값 - ReadingBatch와 같은 규칙)
+_QUEUE_RECORD = np.dtype(
+    [("battery_id", "<i8"), ("timestamp", "<f8")]
+    + [(name, "<f8") for name in METRIC_FIELDS]
+    + [("status", "i1"), ("cell_balance", "i1")]
+)
+
+# 기록 중이거나 읽는 도중 덮어쓰인 슬롯을 다시 읽는 횟수
+_SLOT_READ_ATTEMPTS = 3
+
+# 배열 시작 위치 정렬 (캐시 라인)
+_ALIGNMENT = 64
+
+# 응답용 시스템 합계 필드 (나머지 시스템 지표는 환경 정보)
+_TOTAL_STATS = ("total_power", "total_energy", "average_soc", "average_soh", "average_temperature")
+
+
+class NotProducerError(RuntimeError):
+    """프로듀서가 아닌 워커에서 공유 상태 기록 시도"""
+
+
+def _untrack(segment: shared_memory.SharedMemory) -> shared_memory.SharedMemory:
+    """resource_tracker 등록 해제 - 연결만 한 워커가 종료될 때 다른 워커가 쓰는 세그먼트를 지우지 않도록
+    (Python 3.13 미만은 연결할 때도 등록되며, 세그먼트 삭제는 SharedTelemetry가 직접 관리)
+    """
+    resource_tracker.unregister(segment._name, "shared_memory")
+    return segment
+
+
+def _unlink(name: str):
+    """이름으로 세그먼트 삭제 (없으면 무시) - 연결 후 unlink()로 등록/해제 짝을 맞춘다"""
+    try:
+        segment = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    segment.close()
+    segment.unlink()
+
+
+def _layout(battery_count: int, capacity: int) -> Tuple[List[Tuple[str, np.dtype, tuple, int]], int]:
+    """히스토리 세그먼트 배열 배치 (이름, dtype, shape, 오프셋) 와 전체 크기 - 메타데이터 JSON은 그 뒤"""
+    rows = 2 * capacity
+    fields = [
+        ("header", np.int64, (_HEADER_FIELDS,)),
+        ("battery_ids", np.int64, (battery_count,)),
+        ("timestamps", np.float64, (rows,)),
+        ("sequences", np.int64, (rows,)),
+        *[(f"metric:{name}", metric_dtype(name), (rows, battery_count)) for name, _ in BATTERY_METRICS],
+        ("status", np.int8, (rows, battery_count)),
+        ("cell_balance", np.int8, (rows, battery_count)),
+        ("reported", np.bool_, (rows, battery_count)),
+        *[(f"system:{name}", np.float64, (rows,)) for name, _ in SYSTEM_METRICS],
+    ]
+    layout = []
+    offset = 0
+    for name, dtype, shape in fields:
+        dtype = np.dtype(dtype)
+        layout.append((name, dtype, shape, offset))
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        offset += (nbytes + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+    return layout, offset
+
+
+class SharedTelemetry:
+    """워커 간 공유 상태 - 프로듀서 선출 + 공유 메모리 세그먼트 관리
+
+    잠금 파일에 대한 비차단 flock을 얻은 워커가 프로듀서가 된다. 프로듀서 프로세스가
+    종료되면 (비정상 종료 포함) 커널이 잠금을 풀고, 다른 워커가 다음 틱에 이어받는다.
+    연결된 워커는 모두 참여 잠금 파일의 공유 잠금을 보유하므로, 종료 시 배타 잠금을 얻은
+    워커가 마지막 워커로 세그먼트를 삭제한다. 제어 세그먼트에는 현재 히스토리 세대 번호와
+    프로듀서 PID를 둔다. 전달 큐 세그먼트는 프로듀서가 아닌 워커가 받은 측정값을 프로듀서에
+    넘기는 고정 크기 링이다 (프로듀서가 바뀌어도 남은 측정값은 새 프로듀서가 이어서 꺼냄).
+    """
+
+    def __init__(self, name: str = SHARED_STATE_NAME, lock_path: str = SHARED_STATE_LOCK_PATH):
+        self.name = name
+        self.is_producer = False
+        # 선출용 잠금 (프로듀서가 계속 보유) / 제어 세그먼트 수정용 잠금 (짧게 보유) / 참여 잠금 (공유)
+        self._election = open(lock_path, "a+b")
+        self._mutex = open(f"{lock_path}.ctl", "a+b")
+        self._membership = open(f"{lock_path}.workers", "a+b")
+        with self._locked():
+            fcntl.flock(self._membership.fileno(), fcntl.LOCK_SH)
+            try:
+                self._control = shared_memory.SharedMemory(
+                    name=f"{name}_ctl", create=True, size=_CONTROL_FIELDS * 8,
+                )
+            except FileExistsError:
+                self._control = shared_memory.SharedMemory(name=f"{name}_ctl")
+            _untrack(self._control)
+            self.control = np.ndarray((_CONTROL_FIELDS,), dtype=np.int64, buffer=self._control.buf)
+            self._attach_queue()
+        self._closed = False
+        self.try_acquire()
+
+    def _attach_queue(self):
+        """전달 큐 세그먼트 생성 또는 연결 (제어 잠금 안에서 호출)"""
+        header_size = _QUEUE_FIELDS * 8
+        try:
+            self._queue = shared_memory.SharedMemory(
+                name=f"{self.name}_ingest", create=True,
+                size=header_size + SHARED_INGEST_QUEUE_READINGS * _QUEUE_RECORD.itemsize,
+            )
+            created = True
+        except FileExistsError:
+            self._queue = shared_memory.SharedMemory(name=f"{self.name}_ingest")
+            created = False
+        _untrack(self._queue)
+        self.queue_header = np.ndarray((_QUEUE_FIELDS,), dtype=np.int64, buffer=self._queue.buf)
+        if created:
+            self.queue_header[_QUEUE_CAPACITY] = SHARED_INGEST_QUEUE_READINGS
+        capacity = int(self.queue_header[_QUEUE_CAPACITY])
+        self._queue_records = np.ndarray((capacity,), dtype=_QUEUE_RECORD, buffer=self._queue.buf, offset=header_size)
+
+    @contextmanager
+    def _locked(self):
+        fcntl.flock(self._mutex.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._mutex.fileno(), fcntl.LOCK_UN)
+
+    @property
+    def generation(self) -> int:
+        """현재 게시된 히스토리 세대 (0은 아직 없음)"""
+        return int(self.control[_CONTROL_GENERATION])
+
+    @property
+    def producer_live(self) -> bool:
+        """프로듀서가 수신 데이터 모드로 기록 중인지 (승계 시 수신 플릿 상태 복원 여부)"""
+        return bool(self.control[_CONTROL_LIVE])
+
+    def segment_name(self, generation: int) -> str:
+        return f"{self.name}_{generation}"
+
+    def try_acquire(self) -> bool:
+        """프로듀서 잠금 시도 (비차단) - 이미 프로듀서이거나 새로 얻었으면 True"""
+        if self.is_producer:
+            return True
+        try:
+            fcntl.flock(self._election.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        self.is_producer = True
+        self.control[_CONTROL_PRODUCER_PID] = os.getpid()
+        SHARED_STATE_PRODUCER.set(1)
+        return True
+
+    def require_producer(self):
+        if not self.is_producer:
+            raise NotProducerError("공유 상태는 프로듀서 워커에서만 기록할 수 있습니다")
+
+    def mark_source(self, live: bool):
+        """프로듀서의 데이터 소스 (수신 데이터 / 시뮬레이션) 기록"""
+        self.control[_CONTROL_LIVE] = int(live)
+
+    def create_generation(self, size: int) -> Tuple[int, shared_memory.SharedMemory]:
+        """다음 세대 히스토리 세그먼트 생성 (게시는 내용을 채운 뒤 publish())"""
+        self.require_producer()
+        generation = self.generation + 1
+        name = self.segment_name(generation)
+        try:
+            segment = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # 비정상 종료로 남은 세그먼트
+            _unlink(name)
+            segment = shared_memory.SharedMemory(name=name, create=True, size=size)
+        return generation, _untrack(segment)
+
+    def publish(self, generation: int):
+        """새 세대 게시 후 이전 세대 삭제 (이미 연결한 워커의 매핑은 닫을 때까지 유효)"""
+        with self._locked():
+            previous = self.generation
+            self.control[_CONTROL_GENERATION] = generation
+        if previous and previous != generation:
+            _unlink(self.segment_name(previous))
+
+    def attach(self, generation: int) -> Optional[shared_memory.SharedMemory]:
+        """게시된 세대에 연결 (그 사이 다음 세대로 교체되어 삭제되었으면 None)"""
+        try:
+            return _untrack(shared_memory.SharedMemory(name=self.segment_name(generation)))
+        except FileNotFoundError:
+            return None
+
+    def forward(self, batch: ReadingBatch) -> int:
+        """측정값을 전달 큐에 추가 (프로듀서가 아닌 워커, 가득 차면 QueueFullError) - 추가 후 큐 위치"""
+        records = np.empty(len(batch), dtype=_QUEUE_RECORD)
+        records["battery_id"] = batch.battery_ids
+        records["timestamp"] = batch.timestamps
+        for name in METRIC_FIELDS:
+            records[name] = batch.metrics[name]
+        records["status"] = batch.status
+        records["cell_balance"] = batch.cell_balance
+        with self._locked():
+            header = self.queue_header
+            capacity, head = int(header[_QUEUE_CAPACITY]), int(header[_QUEUE_HEAD])
+            depth = head - int(header[_QUEUE_TAIL])
+            if depth + len(records) > capacity:
+                raise QueueFullError(f"프로듀서 전달 큐가 가득 찼습니다 ({depth}/{capacity})")
+            self._queue_records[(head + np.arange(len(records))) % capacity] = records
+            header[_QUEUE_HEAD] = head + len(records)
+        return head + len(records)
+
+    def take_forwarded(self, limit: int) -> Tuple[Optional[ReadingBatch], int]:
+        """전달 큐에서 최대 limit개 측정값을 꺼냄 (프로듀서) - (묶음, 꺼낸 뒤 큐 위치), 비어 있으면 묶음 None"""
+        self.require_producer()
+        with self._locked():
+            header = self.queue_header
+            capacity, tail = int(header[_QUEUE_CAPACITY]), int(header[_QUEUE_TAIL])
+            count = min(int(header[_QUEUE_HEAD]) - tail, limit)
+            if count <= 0:
+                return None, tail
+            records = self._queue_records[(tail + np.arange(count)) % capacity]
+            header[_QUEUE_TAIL] = tail + count
+        batch = ReadingBatch(
+            records["battery_id"], records["timestamp"], {name: records[name] for name in METRIC_FIELDS},
+            records["status"].astype(np.int16), records["cell_balance"].astype(np.int16),
+        )
+        return batch, tail + count
+
+    def mark_forwarded_applied(self, position: int):
+        """position까지의 전달 측정값이 반영됨 (프로듀서) - 전달한 워커의 ack=applied 대기 해제"""
+        with self._locked():
+            self.queue_header[_QUEUE_APPLIED] = max(int(self.queue_header[_QUEUE_APPLIED]), position)
+
+    @property
+    def forwarded_applied(self) -> int:
+        """프로듀서가 반영을 마친 전달 큐 위치"""
+        return int(self.queue_header[_QUEUE_APPLIED])
+
+    @property
+    def forward_depth(self) -> int:
+        """전달 큐에서 프로듀서가 아직 꺼내지 않은 측정값 수"""
+        return int(self.queue_header[_QUEUE_HEAD] - self.queue_header[_QUEUE_TAIL])
+
+    def info(self) -> Dict:
+        return {
+            "role": "producer" if self.is_producer else "replica",
+            "pid": os.getpid(),
+            "producer_pid": int(self.control[_CONTROL_PRODUCER_PID]),
+            "generation": self.generation,
+            "forward_queue_depth": self.forward_depth,
+        }
+
+    def close(self):
+        """연결 해제 - 마지막 워커가 세그먼트를 삭제하고, 프로듀서는 잠금을 풀어 승계를 허용"""
+        if self._closed:
+            return
+        self._closed = True
+        with self._locked():
+            # 공유 → 배타 잠금 전환은 다른 워커가 없을 때만 성공 (비정상 종료한 워커의 잠금은 커널이 해제)
+            try:
+                fcntl.flock(self._membership.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                last = True
+            except BlockingIOError:
+                last = False
+            self.queue_header = self._queue_records = None
+            self._queue.close()
+            if last:
+                generation = self.generation
+                if generation:
+                    _unlink(self.segment_name(generation))
+                self.control = None
+                self._control.close()
+                _unlink(f"{self.name}_ctl")
+                _unlink(f"{self.name}_ingest")
+            fcntl.flock(self._membership.fileno(), fcntl.LOCK_UN)
+        if self.is_producer:
+            self.is_producer = False
+            SHARED_STATE_PRODUCER.set(0)
+            fcntl.flock(self._election.fileno(), fcntl.LOCK_UN)
+        self._election.close()
+        self._membership.close()
+        self._mutex.close()
+
+
+class SharedHistoryStore(HistoryStore):
+    """공유 메모리 링 버퍼 - 프로듀서 워커가 기록하고 나머지 워커는 같은 메모리를 복사 없이 조회
+
+    배열 배치와 조회 메서드는 HistoryStore와 같고, 쓰기 위치/크기는 세그먼트 헤더에 둔다.
+    배터리 구성이 바뀌면 프로듀서가 새 세대 세그먼트를 만들어 게시하고, 다른 워커는
+    sync()에서 새 세대로 옮겨 간다. 세그먼트 연결 전에는 프로세스 메모리의 빈 버퍼를 쓴다.
+    """
+
+    def __init__(self, shared: SharedTelemetry, capacity: int = DEFAULT_HISTORY_CAPACITY,
+                 max_samples: int = DEFAULT_HISTORY_MAX_SAMPLES):
+        self.shared = shared
+        self.generation = 0
+        self._segments: List[shared_memory.SharedMemory] = []
+        super().__init__(capacity=capacity, battery_count=0, max_samples=max_samples)
+        self.sync()
+
+    @property
+    def _next(self) -> int:
+        return int(self._header[_HEADER_NEXT])
+
+    @_next.setter
+    def _next(self, value: int):
+        self._header[_HEADER_NEXT] = value
+
+    @property
+    def _size(self) -> int:
+        return int(self._header[_HEADER_SIZE])
+
+    @_size.setter
+    def _size(self, value: int):
+        self._header[_HEADER_SIZE] = value
+
+    @property
+    def _sequence(self) -> int:
+        return int(self._header[_HEADER_SEQUENCE])
+
+    @_sequence.setter
+    def _sequence(self, value: int):
+        self._header[_HEADER_SEQUENCE] = value
+
+    def _capacity_for(self, battery_count: int) -> int:
+        return max(1, min(self.requested_capacity, self.max_samples // max(battery_count, 1)))
+
+    def _allocate(self, battery_count: int):
+        capacity = self._capacity_for(battery_count)
+        layout, size = _layout(battery_count, capacity)
+        self._map(bytearray(size), layout, battery_count, capacity)
+
+    def _map(self, buffer, layout, battery_count: int, capacity: int):
+        """버퍼 위에 배열 뷰 배치"""
+        views = {
+            name: np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+            for name, dtype, shape, offset in layout
+        }
+        self.capacity = capacity
+        self.battery_count = battery_count
+        self._header = views["header"]
+        self.battery_ids = views["battery_ids"]
+        self.battery_meta = [{} for _ in range(battery_count)]
+        self._id_index = {}
+        self.timestamps = views["timestamps"]
+        self.sequences = views["sequences"]
+        self.metrics = {name: views[f"metric:{name}"] for name, _ in BATTERY_METRICS}
+        self.status = views["status"]
+        self.cell_balance = views["cell_balance"]
+        self.reported = views["reported"]
+        self.system = {name: views[f"system:{name}"] for name, _ in SYSTEM_METRICS}
+
+    def _set_meta(self, meta: List[Dict]):
+        self.battery_meta = meta
+        self._id_index = {int(bid): i for i, bid in enumerate(self.battery_ids)}
+
+    def _retain(self, segment: shared_memory.SharedMemory):
+        """이전 세대 매핑 정리 - 응답 생성 중인 뷰가 남아 있으면 다음 세대 교체 때 다시 시도"""
+        retained = []
+        for previous in self._segments:
+            try:
+                previous.close()
+            except BufferError:
+                retained.append(previous)
+        self._segments = [*retained, segment]
+
+    def set_batteries(self, battery_ids: Sequence[int], meta: Sequence[Dict]):
+        """배터리 등록 - 새 세대 세그먼트에 남은 배터리의 이력을 옮겨 게시 (다른 워커는 다음 sync()에서 연결)"""
+        self.shared.require_producer()
+        battery_ids = np.asarray(battery_ids, dtype=np.int64)
+        old = self._columns()
+        meta = [dict(m) for m in meta]
+        payload = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+        battery_count = len(battery_ids)
+        capacity = self._capacity_for(battery_count)
+        layout, size = _layout(battery_count, capacity)
+
+        generation, segment = self.shared.create_generation(size + len(payload))
+        self._map(segment.buf, layout, battery_count, capacity)
+        self._header[[_HEADER_BATTERY_COUNT, _HEADER_CAPACITY, _HEADER_META_OFFSET, _HEADER_META_LENGTH]] = (
+            battery_count, capacity, size, len(payload),
+        )
+        segment.buf[size:size + len(payload)] = payload
+        self._carry_over(old, battery_ids)
+        del old
+        self._set_meta(meta)
+        self._retain(segment)
+        self.generation = generation
+        self.shared.publish(generation)
+
+    def sync(self) -> bool:
+        """게시된 세대가 바뀌었으면 새 세그먼트에 연결 - 연결했으면 True"""
+        generation = self.shared.generation
+        if generation == 0 or generation == self.generation:
+            return False
+        segment = self.shared.attach(generation)
+        if segment is None:
+            return False
+        header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=segment.buf)
+        battery_count, capacity, offset, length = (
+            int(header[field]) for field in
+            (_HEADER_BATTERY_COUNT, _HEADER_CAPACITY, _HEADER_META_OFFSET, _HEADER_META_LENGTH)
+        )
+        layout, _ = _layout(battery_count, capacity)
+        self._map(segment.buf, layout, battery_count, capacity)
+        self._set_meta(json.loads(bytes(segment.buf[offset:offset + length])))
+        self._retain(segment)
+        self.generation = generation
+        return True
+
+    def append(self, timestamp: float, metrics: Dict[str, np.ndarray],
+               status: np.ndarray, cell_balance: np.ndarray, system: Dict[str, float],
+               reported: Optional[np.ndarray] = None):
+        # 기록 중인 슬롯은 순번이 0이고 값을 모두 쓴 뒤 순번을 매기므로, 다른 워커는 slot()에서
+        # 읽기 전후 순번을 비교해 덮어쓰는 중인 슬롯을 걸러낸다
+        self.shared.require_producer()
+        super().append(timestamp, metrics, status, cell_balance, system, reported)
+
+    def _read(self, rows, battery_index: Optional[int] = None,
+              system: bool = False) -> Tuple[Dict[str, np.ndarray], Optional[Dict[str, np.ndarray]]]:
+        """구간 복사본 - slot()과 같이 복사 전후 순번을 비교해 기록 중이거나 덮어쓴 슬롯은 제외"""
+        before = self.sequences[rows].copy()
+        window, system_window = super()._read(rows, battery_index, system)
+        window = {name: np.array(values) for name, values in window.items()}
+        if system_window is not None:
+            system_window = {name: np.array(values) for name, values in system_window.items()}
+        stable = (before != 0) & (self.sequences[rows] == before)
+        if not stable.all():
+            window = {name: values[stable] for name, values in window.items()}
+            if system_window is not None:
+                system_window = {name: values[stable] for name, values in system_window.items()}
+        return window, system_window
+
+    def slots_after(self, sequence: int, limit: int) -> np.ndarray:
+        """순번 sequence 이후에 기록된 슬롯의 행 번호 (기록순, 최근 limit개 이내)
+
+        같은 타임스탬프로 기록된 틱도 순번은 다르므로 빠짐없이 이어 읽을 수 있다.
+        """
+        rows = self._window_slice(limit)
+        return np.flatnonzero(self.sequences[rows] > sequence) + rows.start
+
+    def slot(self, row: int) -> Optional[Dict]:
+        """한 슬롯의 값 복사본 - 지표는 기록 시 자릿수로 반올림한 float64, 시스템 지표는 응답 형식
+
+        복사 전후 순번이 같을 때만 반환하고, 프로듀서가 덮어쓰는 중이면 몇 번 다시 읽은 뒤 None.
+        """
+        for _ in range(_SLOT_READ_ATTEMPTS):
+            sequence = int(self.sequences[row])
+            if sequence == 0:
+                continue
+            values = self._copy_slot(row)
+            if int(self.sequences[row]) == sequence:
+                values["sequence"] = sequence
+                return values
+        return None
+
+    def _copy_slot(self, row: int) -> Dict:
+        metrics = {}
+        for name, digits in BATTERY_METRICS:
+            values = self.metrics[name][row].astype(np.float64)
+            metrics[name] = np.rint(values) if digits is None else np.round(values, digits)
+        system = {}
+        for name, digits in SYSTEM_METRICS:
+            value = float(self.system[name][row])
+            system[name] = None if np.isnan(value) else round(value, digits)
+        reported = self.reported[row]
+        return {
+            "timestamp": float(self.timestamps[row]),
+            "battery_ids": self.battery_ids.copy(),
+            "metrics": metrics,
+            "status": self.status[row].copy(),
+            "cell_balance": self.cell_balance[row].copy(),
+            # 이번 슬롯에 새 측정값을 보고한 배터리 행 (None은 전체)
+            "reported": None if reported.all() else np.flatnonzero(reported),
+            "total_stats": {name: system[name] for name in _TOTAL_STATS},
+            "environment": {
+                "outdoor_temperature": system["outdoor_temperature"],
+                "humidity": system["humidity"],
+                # 환경 정보가 없는 수신 데이터 틱은 None
+                "weather": "맑음" if system["outdoor_temperature"] is not None else None,
+            },
+        }
+
+
+def create_shared_telemetry() -> Optional[SharedTelemetry]:
+    """환경 설정에 따라 공유 상태 생성 (비활성화 시 None)"""
+    if not SHARED_STATE_ENABLED:
+        return None
+    if fcntl is None:
+        raise RuntimeError("SHARED_STATE=1 은 POSIX 환경(Linux/macOS)에서만 지원됩니다")
+    return SharedTelemetry()
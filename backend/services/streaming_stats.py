@@ -0,0 +1,241 @@
+"""
+스트리밍 통계 - Welford 평균/분산, 최소/최대, 상태 카운터 및 롤링 윈도우 (측정값당 O(1) 갱신)
+"""
+import time
+from typing import Dict, Optional
+import numpy as np
+
+from services.history_store import STATUS_LABELS
+
+
+# 통계 대상 지표
+STAT_METRICS = ("voltage", "current", "temperature", "soc", "soh", "power_current", "energy_total")
+
+# 롤링 윈도우 (이름, 길이(초), 사용할 링)
+ROLLING_WINDOWS = {
+    "1m": (60, "second"),
+    "1h": (3600, "minute"),
+    "24h": (86400, "minute"),
+}
+
+
+class _RollingRing:
+    """플릿 전체 롤링 집계 링 (버킷별 count/mean/M2/min/max)"""
+
+    def __init__(self, width: int, slots: int, k: int):
+        self.width = width
+        self.slots = slots
+        self.bucket_ids = np.full(slots, -1, dtype=np.int64)
+        self.count = np.zeros(slots, dtype=np.int64)
+        self.mean = np.zeros((slots, k))
+        self.m2 = np.zeros((slots, k))
+        self.min = np.full((slots, k), np.inf)
+        self.max = np.full((slots, k), -np.inf)
+
+    def update(self, timestamp: float, count: int, mean: np.ndarray, m2: np.ndarray,
+               low: np.ndarray, high: np.ndarray):
+        """틱 배치 통계를 현재 버킷에 병합 (Chan 병렬 분산 공식)"""
+        bucket = int(timestamp // self.width)
+        slot = bucket % self.slots
+        if self.bucket_ids[slot] != bucket:
+            self.bucket_ids[slot] = bucket
+            self.count[slot] = 0
+            self.mean[slot] = 0
+            self.m2[slot] = 0
+            self.min[slot] = np.inf
+            self.max[slot] = -np.inf
+
+        n_a = self.count[slot]
+        n = n_a + count
+        delta = mean - self.mean[slot]
+        self.mean[slot] += delta * (count / n)
+        self.m2[slot] += m2 + delta ** 2 * (n_a * count / n)
+        self.count[slot] = n
+        np.minimum(self.min[slot], low, out=self.min[slot])
+        np.maximum(self.max[slot], high, out=self.max[slot])
+
+    def window(self, seconds: int, now: float) -> Dict[str, np.ndarray]:
+        """최근 seconds 구간 버킷들을 병합한 통계"""
+        current = int(now // self.width)
+        buckets = np.arange(current - seconds // self.width + 1, current + 1, dtype=np.int64)
+        slots = buckets % self.slots
+        slots = slots[self.bucket_ids[slots] == buckets]
+
+        counts = self.count[slots]
+        total = int(counts.sum())
+        if total == 0:
+            return {"count": 0}
+
+        weights = counts[:, None]
+        mean = (self.mean[slots] * weights).sum(axis=0) / total
+        m2 = self.m2[slots].sum(axis=0) + (weights * (self.mean[slots] - mean) ** 2).sum(axis=0)
+        return {
+            "count": total,
+            "mean": mean,
+            "var": m2 / total,
+            "min": self.min[slots].min(axis=0),
+            "max": self.max[slots].max(axis=0),
+        }
+
+
+class StreamingStats:
+    """배터리별/플릿 전체 누적 통계 및 롤링 윈도우 통계
+
+    틱마다 (지표 × 배터리) 행렬 하나로 배터리별 Welford 상태를 갱신하고,
+    같은 틱의 배치 통계를 플릿 누적값과 초/분 링 버킷에 병합한다.
+    조회는 히스토리를 다시 훑지 않고 누적 상태나 링 버킷만 읽는다.
+    """
+
+    def __init__(self):
+        self._allocate(np.zeros(0, dtype=np.int64))
+        k = len(STAT_METRICS)
+        self.rings = {
+            "second": _RollingRing(1, 120, k),
+            "minute": _RollingRing(60, 24 * 60 + 1, k),
+        }
+        # 플릿 전체 누적 (모든 측정값)
+        self.fleet_count = 0
+        self.fleet_mean = np.zeros(k)
+        self.fleet_m2 = np.zeros(k)
+        self.fleet_min = np.full(k, np.inf)
+        self.fleet_max = np.full(k, -np.inf)
+        self.fleet_status_counts = np.zeros(len(STATUS_LABELS), dtype=np.int64)
+        self.latest_status_counts = np.zeros(len(STATUS_LABELS), dtype=np.int64)
+
+    def _allocate(self, battery_ids: np.ndarray):
+        """배터리별 상태 할당"""
+        k = len(STAT_METRICS)
+        battery_count = len(battery_ids)
+        self.battery_ids = battery_ids.copy()
+        self.battery_count = battery_count
+        self._id_index: Dict[int, int] = {int(bid): i for i, bid in enumerate(self.battery_ids)}
+        self.count = np.zeros(battery_count, dtype=np.int64)
+        self.mean = np.zeros((k, battery_count))
+        self.m2 = np.zeros((k, battery_count))
+        self.min = np.full((k, battery_count), np.inf)
+        self.max = np.full((k, battery_count), -np.inf)
+        self.status_counts = np.zeros((battery_count, len(STATUS_LABELS)), dtype=np.int64)
+
+    def _remap(self, battery_ids: np.ndarray):
+        """플릿 구성이 바뀌면 남은 배터리의 누적 통계만 옮김 (새 배터리는 0부터)"""
+        names = ("count", "mean", "m2", "min", "max", "status_counts")
+        old_ids = self.battery_ids
+        old = [getattr(self, name) for name in names]
+        self._allocate(battery_ids)
+        _, new_rows, old_rows = np.intersect1d(battery_ids, old_ids, assume_unique=True, return_indices=True)
+        for name, source in zip(names, old):
+            target = getattr(self, name)
+            if target.ndim == 2 and name != "status_counts":
+                target[:, new_rows] = source[:, old_rows]
+            else:
+                target[new_rows] = source[old_rows]
+
+    def battery_index(self, battery_id: int) -> Optional[int]:
+        """배터리 ID → 통계 컬럼 인덱스"""
+        return self._id_index.get(int(battery_id))
+
+    def update(self, timestamp: float, battery_ids: np.ndarray, metrics: Dict[str, np.ndarray],
+               status: np.ndarray, rows: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """한 틱 반영 - 반환값은 이번 틱의 지표별 합계 (total_stats 계산용)
+
+        rows: 이번 틱에 새 측정값을 보고한 배터리 행 (생략 시 전체) - 직전 값을 유지한
+        배터리가 통계에 중복 반영되지 않도록 이 행만 갱신한다.
+        """
+        if not np.array_equal(battery_ids, self.battery_ids):
+            self._remap(battery_ids)
+        self.latest_status_counts = np.bincount(status, minlength=len(STATUS_LABELS))
+        values = np.stack([np.asarray(metrics[m], dtype=np.float64) for m in STAT_METRICS])
+        cols = slice(None) if rows is None else rows
+        if rows is not None:
+            values = values[:, rows]
+            status = status[rows]
+        n = values.shape[1]
+        if n == 0:
+            return {"sum": np.zeros(len(STAT_METRICS)), "count": 0}
+
+        # 배터리별 Welford 갱신
+        count = self.count[cols] + 1
+        mean = self.mean[:, cols]
+        delta = values - mean
+        mean = mean + delta / count
+        self.m2[:, cols] += delta * (values - mean)
+        self.mean[:, cols] = mean
+        self.count[cols] = count
+        self.min[:, cols] = np.minimum(self.min[:, cols], values)
+        self.max[:, cols] = np.maximum(self.max[:, cols], values)
+        self.status_counts[np.arange(n) if rows is None else rows, status] += 1
+
+        # 이번 틱 배치 통계
+        batch_sum = values.sum(axis=1)
+        batch_mean = batch_sum / n
+        batch_m2 = ((values - batch_mean[:, None]) ** 2).sum(axis=1)
+        batch_min = values.min(axis=1)
+        batch_max = values.max(axis=1)
+
+        # 플릿 누적값 병합
+        n_a = self.fleet_count
+        total = n_a + n
+        delta = batch_mean - self.fleet_mean
+        self.fleet_mean += delta * (n / total)
+        self.fleet_m2 += batch_m2 + delta ** 2 * (n_a * n / total)
+        self.fleet_count = total
+        np.minimum(self.fleet_min, batch_min, out=self.fleet_min)
+        np.maximum(self.fleet_max, batch_max, out=self.fleet_max)
+
+        self.fleet_status_counts += np.bincount(status, minlength=len(STATUS_LABELS))
+
+        for ring in self.rings.values():
+            ring.update(timestamp, n, batch_mean, batch_m2, batch_min, batch_max)
+
+        return {"sum": batch_sum, "count": n}
+
+    def running(self) -> Dict:
+        """플릿 전체 누적 통계"""
+        return {
+            "count": self.fleet_count,
+            "metrics": _metric_stats(self.fleet_mean, self.fleet_m2 / max(self.fleet_count, 1),
+                                     self.fleet_min, self.fleet_max, self.fleet_count),
+            "status_counts": _status_dict(self.fleet_status_counts),
+        }
+
+    def battery(self, index: int) -> Dict:
+        """배터리별 누적 통계"""
+        count = int(self.count[index])
+        return {
+            "count": count,
+            "metrics": _metric_stats(self.mean[:, index], self.m2[:, index] / max(count, 1),
+                                     self.min[:, index], self.max[:, index], count),
+            "status_counts": _status_dict(self.status_counts[index]),
+        }
+
+    def rolling(self, window: str, now: Optional[float] = None) -> Dict:
+        """롤링 윈도우 통계 (1m / 1h / 24h)"""
+        seconds, ring = ROLLING_WINDOWS[window]
+        stats = self.rings[ring].window(seconds, time.time() if now is None else now)
+        count = stats["count"]
+        return {
+            "window": window,
+            "count": count,
+            "metrics": _metric_stats(stats["mean"], stats["var"], stats["min"], stats["max"], count)
+            if count else {},
+        }
+
+
+def _metric_stats(mean: np.ndarray, var: np.ndarray, low: np.ndarray, high: np.ndarray, count: int) -> Dict:
+    """지표별 통계 딕셔너리"""
+    if not count:
+        return {}
+    std = np.sqrt(np.maximum(var, 0))
+    return {
+        name: {
+            "mean": round(m, 3),
+            "std": round(s, 3),
+            "min": round(lo, 3),
+            "max": round(hi, 3),
+        }
+        for name, m, s, lo, hi in zip(STAT_METRICS, mean.tolist(), std.tolist(), low.tolist(), high.tolist())
+    }
+
+
+def _status_dict(counts: np.ndarray) -> Dict[str, int]:
+    return dict(zip(STATUS_LABELS, counts.tolist()))
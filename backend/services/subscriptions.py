@@ -0,0 +1,123 @@
+"""
+WebSocket 구독 - 배터리/필드 선택 및 전송 주기
+"""
+import os
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+
+# 전송 주기 (Hz)
+DEFAULT_RATE_HZ = float(os.getenv("TELEMETRY_RATE_HZ", "1.0"))
+MIN_RATE_HZ = 0.05
+MAX_RATE_HZ = 10.0
+
+# 구독 가능한 필드 (배터리 데이터 + 배터리별 예측 결과)
+BATTERY_FIELDS = (
+    "name", "status", "voltage", "voltage_max", "voltage_min", "current", "temperature", "soc", "soh",
+    "capacity_current", "capacity_rated", "power_current", "power_peak", "energy_today", "energy_total",
+    "runtime", "cycle_count", "internal_resistance", "cell_balance",
+)
+PREDICTION_FIELDS = (
+    "rul_days", "replacement_date", "health_grade", "anomaly_score", "is_anomaly", "anomaly_type",
+    "failure_probability", "failure_risk", "charging_recommendation", "predicted_soh_next_month",
+    "predicted_capacity_retention", "warnings", "recommendations",
+)
+SUBSCRIBABLE_FIELDS = frozenset(BATTERY_FIELDS + PREDICTION_FIELDS)
+
+# 구독 필드 → 델타 행렬 열 이름 (이름이 다른 경우만)
+_COLUMN_ALIASES = {"runtime": "runtime_hours"}
+
+
+class Subscription:
+    """구독 조건 (battery_ids / fields 가 None 이면 전체)"""
+
+    def __init__(self, battery_ids: Optional[List[int]] = None, fields: Optional[List[str]] = None,
+                 rate: float = DEFAULT_RATE_HZ):
+        self.battery_ids = tuple(dict.fromkeys(battery_ids)) if battery_ids is not None else None
+        self.fields = tuple(dict.fromkeys(fields)) if fields is not None else None
+        self.rate = rate
+
+    @classmethod
+    def from_message(cls, message: Dict) -> "Subscription":
+        """subscribe 메시지 검증 후 구독 생성 (잘못된 값은 ValueError)"""
+        battery_ids = message.get("battery_ids")
+        if battery_ids is not None:
+            if not isinstance(battery_ids, list) or not all(
+                isinstance(bid, int) and not isinstance(bid, bool) for bid in battery_ids
+            ):
+                raise ValueError("battery_ids는 정수 목록이어야 합니다")
+
+        fields = message.get("fields")
+        if fields is not None:
+            if not isinstance(fields, list) or not all(isinstance(f, str) for f in fields):
+                raise ValueError("fields는 문자열 목록이어야 합니다")
+            unknown = sorted(set(fields) - SUBSCRIBABLE_FIELDS)
+            if unknown:
+                raise ValueError(f"알 수 없는 필드: {', '.join(unknown)}")
+
+        rate = message.get("rate", DEFAULT_RATE_HZ)
+        if isinstance(rate, bool) or not isinstance(rate, (int, float)) or not MIN_RATE_HZ <= rate <= MAX_RATE_HZ:
+            raise ValueError(f"rate는 {MIN_RATE_HZ}~{MAX_RATE_HZ} Hz 범위여야 합니다")
+
+        return cls(battery_ids, fields, float(rate))
+
+    @property
+    def key(self) -> Tuple:
+        return (self.battery_ids, self.fields, self.rate)
+
+    @property
+    def interval(self) -> float:
+        """전송 간격 (초)"""
+        return 1.0 / self.rate
+
+    @property
+    def is_full(self) -> bool:
+        """전체 문서 구독 여부"""
+        return self.battery_ids is None and self.fields is None
+
+    def to_dict(self) -> Dict:
+        return {
+            "battery_ids": list(self.battery_ids) if self.battery_ids is not None else None,
+            "fields": list(self.fields) if self.fields is not None else None,
+            "rate": self.rate,
+        }
+
+    def rows(self, snapshot) -> Optional[np.ndarray]:
+        """구독 배터리의 스냅샷 행 인덱스 (없는 ID는 제외, None이면 전체)"""
+        if self.battery_ids is None:
+            return None
+        indices = [snapshot.index_of(bid) for bid in self.battery_ids]
+        return np.array([i for i in indices if i is not None], dtype=np.int64)
+
+    def columns(self, column_names: Tuple[str, ...]) -> Optional[np.ndarray]:
+        """구독 필드에 해당하는 델타 행렬 열 인덱스 (None이면 전체)"""
+        if self.fields is None:
+            return None
+        wanted = {_COLUMN_ALIASES.get(f, f) for f in self.fields}
+        return np.array([i for i, name in enumerate(column_names) if name in wanted], dtype=np.int64)
+
+    def project(self, snapshot, rows: Optional[np.ndarray]) -> List[Dict]:
+        """구독 배터리 × 필드만 담은 배터리 목록 (배터리 데이터와 예측 결과 병합)"""
+        batteries = snapshot.battery_data["batteries"]
+        predictions = snapshot.prediction["battery_predictions"]
+        indices = range(len(batteries)) if rows is None else rows.tolist()
+
+        if self.fields is None:
+            return [
+                {**batteries[i], **{k: v for k, v in predictions[i].items() if k not in ("battery_id", "battery_name")}}
+                for i in indices
+            ]
+
+        battery_fields = [f for f in self.fields if f in BATTERY_FIELDS]
+        prediction_fields = [f for f in self.fields if f in PREDICTION_FIELDS]
+        return [
+            {
+                "id": batteries[i]["id"],
+                **{f: batteries[i][f] for f in battery_fields},
+                **{f: predictions[i][f] for f in prediction_fields},
+            }
+            for i in indices
+        ]
+
+
+DEFAULT_SUBSCRIPTION = Subscription()
@@ -0,0 +1,200 @@
+"""
+텔레메트리 코덱 - WebSocket 프레임 인코딩 (JSON 전체 프레임 / 키프레임 + 바이너리 델타)
+"""
+import json
+import os
+import struct
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+from services.ai_service import HEALTH_GRADES, FAILURE_RISK_LABELS
+from services.history_store import BATTERY_METRICS, STATUS_LABELS, CELL_BALANCE_LABELS
+
+
+# 프로토콜 이름 (Sec-WebSocket-Protocol 또는 ?protocol= 로 협상)
+PROTOCOL_JSON = "json"
+PROTOCOL_DELTA = "delta"
+DELTA_SUBPROTOCOL = "battery-delta.v1"
+
+# 키프레임 주기 (틱)
+DELTA_KEYFRAME_INTERVAL = int(os.getenv("DELTA_KEYFRAME_INTERVAL", "30"))
+
+# 델타 프레임 헤더: magic, seq, base_seq, timestamp(epoch 초), 변경 개수
+DELTA_MAGIC = b"BDL1"
+DELTA_HEADER = struct.Struct("<4sIIdI")
+
+# 델타 대상 수치 열 (배터리 지표 + 범주 코드 + 예측 결과)
+DELTA_COLUMNS = (
+    *[name for name, _ in BATTERY_METRICS],
+    "status", "cell_balance",
+    "rul_days", "anomaly_score", "failure_probability", "health_grade", "failure_risk", "is_anomaly",
+)
+
+
+def encode_message(message: dict) -> str:
+    """WebSocket 메시지 JSON 인코딩 (send_json과 동일한 형식)"""
+    return json.dumps(message, ensure_ascii=False, separators=(",", ":"))
+
+
+def column_matrix(snapshot) -> np.ndarray:
+    """스냅샷 → (배터리 × DELTA_COLUMNS) 행렬"""
+    fleet = snapshot.fleet
+    batch = snapshot.prediction_batch
+    columns = [fleet.metrics[name] for name, _ in BATTERY_METRICS]
+    columns += [
+        fleet.status, fleet.cell_balance,
+        np.floor(batch["rul_days"]),
+        np.round(batch["anomaly_score"], 3),
+        np.round(batch["failure_probability"], 3),
+        batch["health_grade"], batch["failure_risk"], batch["is_anomaly"],
+    ]
+    return np.column_stack(columns).astype(np.float64)
+
+
+class TelemetryFrames:
+    """한 틱의 전송 프레임 - 프로토콜별 인코딩은 필요할 때 한 번만 수행
+
+    subscription이 주어지면 구독한 배터리(행)와 필드(열)만 담은 프레임을 만든다.
+    같은 구독을 가진 구독자 그룹은 이 객체 하나를 공유한다.
+    """
+
+    def __init__(self, seq: int, snapshot, previous: Optional["TelemetryFrames"] = None,
+                 keyframe_interval: int = DELTA_KEYFRAME_INTERVAL, subscription=None):
+        self.seq = seq
+        self.snapshot = snapshot
+        self.subscription = subscription
+        self.timestamp = datetime.now()
+        self.rows = subscription.rows(snapshot) if subscription is not None else None
+        self.columns = subscription.columns(DELTA_COLUMNS) if subscription is not None else None
+        self.battery_ids = snapshot.fleet.battery_ids if self.rows is None else snapshot.fleet.battery_ids[self.rows]
+        self._previous_matrix = None
+        if (previous is not None and previous.seq == seq - 1 and seq % keyframe_interval != 0
+                and np.array_equal(previous.battery_ids, self.battery_ids)):
+            self._previous_matrix = previous._matrix
+        self._matrix: Optional[np.ndarray] = None
+        self._json: Optional[str] = None
+        self._keyframe: Optional[str] = None
+        self._delta: Optional[bytes] = None
+        self._sizes: Dict[int, int] = {}
+
+    @property
+    def matrix(self) -> np.ndarray:
+        if self._matrix is None:
+            matrix = self.snapshot.memo("column_matrix", lambda: column_matrix(self.snapshot))
+            if self.rows is not None:
+                matrix = matrix[self.rows]
+            if self.columns is not None:
+                matrix = matrix[:, self.columns]
+            self._matrix = matrix
+        return self._matrix
+
+    @property
+    def column_names(self) -> Tuple[str, ...]:
+        if self.columns is None:
+            return DELTA_COLUMNS
+        return tuple(DELTA_COLUMNS[i] for i in self.columns.tolist())
+
+    def _full_message(self) -> Dict:
+        subscription = self.subscription
+        if subscription is not None and not subscription.is_full:
+            return {
+                "timestamp": self.timestamp.isoformat(),
+                "subscription": subscription.to_dict(),
+                "batteries": subscription.project(self.snapshot, self.rows),
+            }
+        return {
+            "timestamp": self.timestamp.isoformat(),
+            "battery_data": self.snapshot.battery_data,
+            "prediction": self.snapshot.prediction
+        }
+
+    @property
+    def json_text(self) -> str:
+        """기본 프로토콜 - 전체 JSON 문서"""
+        if self._json is None:
+            self._json = encode_message(self._full_message())
+        return self._json
+
+    @property
+    def keyframe(self) -> str:
+        """델타 프로토콜 키프레임 - 전체 문서 + 열 스키마 + 수치 행렬"""
+        if self._keyframe is None:
+            self._keyframe = encode_message({
+                "type": "keyframe",
+                "seq": self.seq,
+                "columns": self.column_names,
+                "labels": {
+                    "status": STATUS_LABELS,
+                    "cell_balance": CELL_BALANCE_LABELS,
+                    "health_grade": HEALTH_GRADES,
+                    "failure_risk": FAILURE_RISK_LABELS,
+                },
+                "battery_ids": self.battery_ids.tolist(),
+                "values": self.matrix.tolist(),
+                **self._full_message(),
+            })
+        return self._keyframe
+
+    @property
+    def delta(self) -> Optional[bytes]:
+        """직전 틱 대비 변경된 값만 담은 바이너리 프레임 (직전 틱이 없거나 키프레임 주기면 None)
+
+        형식: 헤더(<4sIIdI) + 변경 위치 uint32[count] (배터리 인덱스 × 열 수 + 열 인덱스)
+              + 변경 값 float32[count]
+        """
+        previous = self._previous_matrix
+        if previous is None or previous.shape != self.matrix.shape:
+            return None
+        if self._delta is None:
+            current = self.matrix
+            changed = np.flatnonzero(current != previous).astype("<u4")
+            values = current.ravel()[changed].astype("<f4")
+            header = DELTA_HEADER.pack(DELTA_MAGIC, self.seq, self.seq - 1,
+                                       self.timestamp.timestamp(), len(changed))
+            self._delta = header + changed.tobytes() + values.tobytes()
+        return self._delta
+
+    def payload_size(self, payload) -> int:
+        """페이로드 전송 크기 (바이트) - 구독자들이 공유하는 같은 페이로드는 한 번만 계산"""
+        if isinstance(payload, bytes):
+            return len(payload)
+        size = self._sizes.get(id(payload))
+        if size is None:
+            size = self._sizes[id(payload)] = len(payload.encode("utf-8"))
+        return size
+
+    def payload_for(self, protocol: str, last_seq: Optional[int]):
+        """구독자 상태에 맞는 페이로드 (str 또는 bytes)"""
+        if protocol != PROTOCOL_DELTA:
+            return self.json_text
+        if last_seq == self.seq - 1:
+            delta = self.delta
+            if delta is not None:
+                return delta
+        return self.keyframe
+
+
+def decode_delta(frame: bytes) -> Dict:
+    """델타 프레임 디코딩 (클라이언트 참고 구현)"""
+    magic, seq, base_seq, timestamp, count = DELTA_HEADER.unpack_from(frame)
+    if magic != DELTA_MAGIC:
+        raise ValueError("잘못된 델타 프레임입니다")
+    offset = DELTA_HEADER.size
+    indices = np.frombuffer(frame, dtype="<u4", count=count, offset=offset)
+    values = np.frombuffer(frame, dtype="<f4", count=count, offset=offset + 4 * count)
+    return {"seq": seq, "base_seq": base_seq, "timestamp": timestamp, "indices": indices, "values": values}
+
+
+def apply_delta(matrix: np.ndarray, delta: Dict) -> np.ndarray:
+    """키프레임 행렬에 델타 적용 (클라이언트 참고 구현)"""
+    updated = matrix.copy()
+    updated.ravel()[delta["indices"]] = delta["values"]
+    return updated
+
+
+def negotiate_protocol(requested: List[str], query_protocol: Optional[str]) -> str:
+    """요청된 서브프로토콜 / 쿼리 파라미터로 프로토콜 결정"""
+    if DELTA_SUBPROTOCOL in requested or query_protocol == PROTOCOL_DELTA:
+        return PROTOCOL_DELTA
+    return PROTOCOL_JSON
@@ -0,0 +1,537 @@
+"""
+텔레메트리 수집 - 게이트웨이 측정값 일괄 검증, 프로세스 내 큐, 마이크로 배치 반영
+"""
+import asyncio
+import json
+import os
+import struct
+import time
+from collections import deque
+from datetime import datetime
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+import numpy as np
+
+from services.history_store import BATTERY_METRICS, CELL_BALANCE_LABELS, STATUS_LABELS
+from services.metrics import INGEST_APPLY_LATENCY, INGEST_QUEUE_DEPTH, INGEST_READINGS
+
+
+# 큐에 쌓일 수 있는 최대 측정값 수 (초과 시 429) / 한 번에 반영할 측정값 수 / 반영 주기 (밀리초)
+INGEST_QUEUE_MAX_READINGS = int(os.getenv("INGEST_QUEUE_MAX_READINGS", "1000000"))
+INGEST_MICRO_BATCH_READINGS = int(os.getenv("INGEST_MICRO_BATCH_READINGS", "50000"))
+INGEST_DRAIN_INTERVAL_MS = float(os.getenv("INGEST_DRAIN_INTERVAL_MS", "100"))
+
+# 요청 본문 최대 크기 (바이트) / 허용하는 미래 시각 오차 (초)
+INGEST_MAX_BODY_BYTES = int(os.getenv("INGEST_MAX_BODY_BYTES", str(64 * 1024 * 1024)))
+INGEST_MAX_CLOCK_SKEW_SECONDS = float(os.getenv("INGEST_MAX_CLOCK_SKEW_SECONDS", "300"))
+
+# ack=applied 요청이 반영을 기다리는 최대 시간 (초, 초과 시 504)
+INGEST_ACK_TIMEOUT_SECONDS = float(os.getenv("INGEST_ACK_TIMEOUT_SECONDS", "10"))
+
+# 응답에 포함할 거부 사유 수
+INGEST_MAX_REPORTED_ERRORS = 20
+
+# 텔레메트리 소스 (auto: 첫 수신 전까지 시뮬레이터, simulator: 수집 API 비활성, ingest: 수신 데이터만)
+SOURCE_AUTO = "auto"
+SOURCE_SIMULATOR = "simulator"
+SOURCE_INGEST = "ingest"
+TELEMETRY_SOURCES = (SOURCE_AUTO, SOURCE_SIMULATOR, SOURCE_INGEST)
+TELEMETRY_SOURCE = os.getenv("TELEMETRY_SOURCE", SOURCE_AUTO)
+
+CONTENT_TYPE_JSON = "application/json"
+CONTENT_TYPE_NDJSON = "application/x-ndjson"
+CONTENT_TYPE_BINARY = "application/vnd.battery-telemetry"
+CONTENT_TYPE_OCTET_STREAM = "application/octet-stream"
+
+# 측정값 필드 - 필수 필드는 모든 측정값에 있어야 하고, 나머지는 생략 시 직전 값 유지
+METRIC_FIELDS = tuple(name for name, _ in BATTERY_METRICS)
+REQUIRED_FIELDS = ("voltage", "current", "temperature", "soc", "soh")
+
+# 값 범위 (이상치/단위 오류 거부)
+VALID_RANGES = {
+    "voltage": (0.0, 1000.0),
+    "current": (-100000.0, 100000.0),
+    "temperature": (-60.0, 150.0),
+    "soc": (0.0, 100.0),
+    "soh": (0.0, 100.0),
+    "cycle_count": (0.0, 1e7),
+}
+
+# 바이너리 형식: 헤더(<4sI: 매직, 측정값 수) + 고정 길이 레코드 (little-endian, 패딩 없음)
+# 생략한 수치는 NaN, 생략한 status/cell_balance는 255, timestamp 0은 수신 시각
+BINARY_MAGIC = b"BTI1"
+BINARY_HEADER = struct.Struct("<4sI")
+BINARY_RECORD = np.dtype(
+    [("battery_id", "<u4"), ("timestamp", "<f8")]
+    + [(name, "<f4") for name in METRIC_FIELDS]
+    + [("status", "u1"), ("cell_balance", "u1")]
+)
+_BINARY_MISSING_CODE = 255
+
+_STATUS_CODES = {label: code for code, label in enumerate(STATUS_LABELS)}
+_CELL_BALANCE_CODES = {label: code for code, label in enumerate(CELL_BALANCE_LABELS)}
+
+
+class IngestError(ValueError):
+    """요청 전체를 거부해야 하는 형식 오류 (400)"""
+
+
+class UnsupportedMediaTypeError(IngestError):
+    """지원하지 않는 Content-Type (415)"""
+
+
+class QueueFullError(Exception):
+    """수집 큐가 가득 참 (429)"""
+
+
+class ReadingBatch:
+    """측정값 묶음 (열 배열) - 수치 NaN / 범주 -1은 생략된 값"""
+
+    def __init__(self, battery_ids: np.ndarray, timestamps: np.ndarray, metrics: Dict[str, np.ndarray],
+                 status: np.ndarray, cell_balance: np.ndarray):
+        self.battery_ids = battery_ids
+        self.timestamps = timestamps
+        self.metrics = metrics
+        self.status = status
+        self.cell_balance = cell_balance
+
+    def __len__(self) -> int:
+        return len(self.battery_ids)
+
+    def select(self, rows: np.ndarray) -> "ReadingBatch":
+        return ReadingBatch(
+            self.battery_ids[rows], self.timestamps[rows],
+            {name: values[rows] for name, values in self.metrics.items()},
+            self.status[rows], self.cell_balance[rows],
+        )
+
+    @classmethod
+    def concatenate(cls, batches: List["ReadingBatch"]) -> "ReadingBatch":
+        if len(batches) == 1:
+            return batches[0]
+        return cls(
+            np.concatenate([b.battery_ids for b in batches]),
+            np.concatenate([b.timestamps for b in batches]),
+            {name: np.concatenate([b.metrics[name] for b in batches]) for name in METRIC_FIELDS},
+            np.concatenate([b.status for b in batches]),
+            np.concatenate([b.cell_balance for b in batches]),
+        )
+
+
+def _float_column(values: list) -> np.ndarray:
+    """값 목록 → float 배열 (None은 NaN, 숫자가 아닌 값도 NaN)"""
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        column = np.full(len(values), np.nan)
+        for i, value in enumerate(values):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                column[i] = value
+        return column
+
+
+def _code_column(values: list, codes: Dict[str, int], count: int) -> np.ndarray:
+    """라벨 또는 코드 목록 → 코드 배열 (생략 -1, 알 수 없는 값 -2)"""
+    column = np.full(len(values), -1, dtype=np.int16)
+    for i, value in enumerate(values):
+        if value is None:
+            continue
+        code = codes.get(value, value) if isinstance(value, (str, int)) else None
+        column[i] = code if isinstance(code, int) and not isinstance(code, bool) and 0 <= code < count else -2
+    return column
+
+
+def _timestamp_column(values: list, received_at: float) -> np.ndarray:
+    """epoch 초 또는 ISO 8601 문자열 목록 → epoch 초 (생략 시 수신 시각, 해석 불가 NaN)"""
+    if all(value is None for value in values):
+        return np.full(len(values), received_at)
+    column = np.full(len(values), received_at)
+    for i, value in enumerate(values):
+        if value is None:
+            continue
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            column[i] = value
+        elif isinstance(value, str):
+            try:
+                column[i] = datetime.fromisoformat(value).timestamp()
+            except ValueError:
+                column[i] = np.nan
+        else:
+            column[i] = np.nan
+    return column
+
+
+def parse_records(records: list, received_at: float) -> Tuple[ReadingBatch, Dict[int, str]]:
+    """JSON 객체 목록 → (측정값 묶음, 행별 형식 오류)
+
+    battery_id (또는 id), timestamp (선택), 수치 필드, status / cell_balance (라벨 또는 코드)
+    """
+    errors = {i: "JSON 객체가 아닙니다" for i, record in enumerate(records) if not isinstance(record, dict)}
+    if errors:
+        records = [record if isinstance(record, dict) else {} for record in records]
+
+    ids = _float_column([r.get("battery_id", r.get("id")) for r in records])
+    batch = ReadingBatch(
+        battery_ids=np.where(np.isfinite(ids), ids, -1).astype(np.int64),
+        timestamps=_timestamp_column([r.get("timestamp") for r in records], received_at),
+        metrics={name: _float_column([r.get(name) for r in records]) for name in METRIC_FIELDS},
+        status=_code_column([r.get("status") for r in records], _STATUS_CODES, len(STATUS_LABELS)),
+        cell_balance=_code_column([r.get("cell_balance") for r in records],
+                                  _CELL_BALANCE_CODES, len(CELL_BALANCE_LABELS)),
+    )
+    batch.battery_ids[~np.isfinite(ids) | (ids != np.round(ids))] = -1
+    return batch, errors
+
+
+def parse_ndjson(body: bytes, received_at: float) -> Tuple[ReadingBatch, Dict[int, str]]:
+    """NDJSON 본문 → (측정값 묶음, 행별 오류) - 줄 전체를 한 번에 파싱하고, 실패 시에만 줄 단위로 재시도"""
+    try:
+        lines = [line for line in body.decode("utf-8").split("\n") if line.strip()]
+    except UnicodeDecodeError:
+        raise IngestError("UTF-8 NDJSON이 아닙니다") from None
+    try:
+        records = json.loads("[" + ",".join(lines) + "]")
+        if len(records) != len(lines):
+            # 한 줄에 여러 값이 있는 경우 (예: "{...},{...}") - 줄 단위로 다시 해석
+            raise json.JSONDecodeError("한 줄에 값이 여러 개입니다", "", 0)
+    except json.JSONDecodeError:
+        records = []
+        bad = {}
+        for i, line in enumerate(lines):
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                records.append(None)
+                bad[i] = f"잘못된 JSON ({e.msg})"
+        batch, errors = parse_records(records, received_at)
+        errors.update(bad)
+        return batch, errors
+    return parse_records(records, received_at)
+
+
+def parse_binary(body: bytes, received_at: float) -> Tuple[ReadingBatch, Dict[int, str]]:
+    """바이너리 본문 → 측정값 묶음 (복사 없이 레코드 배열로 해석)"""
+    if len(body) < BINARY_HEADER.size:
+        raise IngestError("바이너리 헤더가 없습니다")
+    magic, count = BINARY_HEADER.unpack_from(body)
+    if magic != BINARY_MAGIC:
+        raise IngestError(f"지원하지 않는 바이너리 형식: {magic!r}")
+    if len(body) != BINARY_HEADER.size + count * BINARY_RECORD.itemsize:
+        raise IngestError(
+            f"본문 크기 불일치 (측정값 {count}개 × {BINARY_RECORD.itemsize}바이트 + 헤더 {BINARY_HEADER.size}바이트)"
+        )
+    records = np.frombuffer(body, dtype=BINARY_RECORD, count=count, offset=BINARY_HEADER.size)
+    timestamps = records["timestamp"].astype(np.float64)
+    timestamps[timestamps == 0] = received_at
+    status = records["status"].astype(np.int16)
+    cell_balance = records["cell_balance"].astype(np.int16)
+    status[status == _BINARY_MISSING_CODE] = -1
+    cell_balance[cell_balance == _BINARY_MISSING_CODE] = -1
+    status[status >= len(STATUS_LABELS)] = -2
+    cell_balance[cell_balance >= len(CELL_BALANCE_LABELS)] = -2
+    batch = ReadingBatch(
+        battery_ids=records["battery_id"].astype(np.int64),
+        timestamps=timestamps,
+        metrics={name: records[name].astype(np.float64) for name in METRIC_FIELDS},
+        status=status,
+        cell_balance=cell_balance,
+    )
+    return batch, {}
+
+
+def parse_json(body: bytes, received_at: float) -> Tuple[ReadingBatch, Dict[int, str]]:
+    """JSON 배열 본문 → 측정값 묶음"""
+    try:
+        records = json.loads(body)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise IngestError(f"잘못된 JSON: {e}") from None
+    if not isinstance(records, list):
+        raise IngestError("측정값 배열이 필요합니다")
+    return parse_records(records, received_at)
+
+
+def parse_body(body: bytes, content_type: str, received_at: float) -> Tuple[ReadingBatch, Dict[int, str]]:
+    """Content-Type에 따라 본문 해석 (NDJSON / JSON 배열 / 바이너리)"""
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type == CONTENT_TYPE_NDJSON:
+        return parse_ndjson(body, received_at)
+    if media_type == CONTENT_TYPE_JSON:
+        return parse_json(body, received_at)
+    if media_type in (CONTENT_TYPE_BINARY, CONTENT_TYPE_OCTET_STREAM):
+        return parse_binary(body, received_at)
+    raise UnsupportedMediaTypeError(
+        f"지원하지 않는 Content-Type: {media_type or '없음'} "
+        f"({CONTENT_TYPE_NDJSON} / {CONTENT_TYPE_JSON} / {CONTENT_TYPE_BINARY})"
+    )
+
+
+def encode_binary(batch: ReadingBatch) -> bytes:
+    """측정값 묶음 → 바이너리 본문 (게이트웨이/벤치마크용)"""
+    records = np.zeros(len(batch), dtype=BINARY_RECORD)
+    records["battery_id"] = batch.battery_ids
+    records["timestamp"] = batch.timestamps
+    for name in METRIC_FIELDS:
+        records[name] = batch.metrics[name]
+    records["status"] = np.where(batch.status < 0, _BINARY_MISSING_CODE, batch.status)
+    records["cell_balance"] = np.where(batch.cell_balance < 0, _BINARY_MISSING_CODE, batch.cell_balance)
+    return BINARY_HEADER.pack(BINARY_MAGIC, len(batch)) + records.tobytes()
+
+
+def validate(batch: ReadingBatch, errors: Dict[int, str], now: float) -> Tuple[np.ndarray, List[Dict]]:
+    """일괄 검증 (규칙별 벡터 연산) → (유효 행 마스크, 거부 사유 목록 - 앞쪽 일부만)"""
+    n = len(batch)
+    reasons = np.zeros(n, dtype=np.int16)
+    messages = [""]
+
+    def reject(mask: np.ndarray, message: str):
+        mask = mask & (reasons == 0)
+        if mask.any():
+            messages.append(message)
+            reasons[mask] = len(messages) - 1
+
+    for message in set(errors.values()):
+        mask = np.zeros(n, dtype=bool)
+        mask[[row for row, m in errors.items() if m == message]] = True
+        reject(mask, message)
+    reject((batch.battery_ids <= 0) | (batch.battery_ids > np.iinfo(np.int32).max),
+           "battery_id가 없거나 양의 정수가 아닙니다")
+    reject(~np.isfinite(batch.timestamps), "timestamp를 해석할 수 없습니다")
+    reject(batch.timestamps > now + INGEST_MAX_CLOCK_SKEW_SECONDS, "timestamp가 미래 시각입니다")
+    for name in REQUIRED_FIELDS:
+        reject(~np.isfinite(batch.metrics[name]), f"{name} 필드가 없거나 숫자가 아닙니다")
+    for name, (low, high) in VALID_RANGES.items():
+        values = batch.metrics[name]
+        reject(np.isfinite(values) & ((values < low) | (values > high)), f"{name} 값이 범위({low}~{high})를 벗어났습니다")
+    for name in METRIC_FIELDS:
+        reject(np.isinf(batch.metrics[name]), f"{name} 값이 유한하지 않습니다")
+    reject(batch.status == -2, "알 수 없는 status")
+    reject(batch.cell_balance == -2, "알 수 없는 cell_balance")
+
+    rejected = np.flatnonzero(reasons)
+    details = [
+        {"index": int(i), "error": messages[reasons[i]]}
+        for i in rejected[:INGEST_MAX_REPORTED_ERRORS].tolist()
+    ]
+    return reasons == 0, details
+
+
+def prepare_batch(body: bytes, content_type: str, received_at: float) -> Tuple[ReadingBatch, int, List[Dict]]:
+    """본문 해석 + 검증 → (유효한 측정값 묶음, 거부 수, 거부 사유 목록)"""
+    batch, errors = parse_body(body, content_type, received_at)
+    valid, details = validate(batch, errors, received_at)
+    rejected = len(batch) - int(valid.sum())
+    return (batch.select(valid) if rejected else batch), rejected, details
+
+
+class LiveFleetState:
+    """수신 측정값으로 구성한 플릿 상태 - 배터리별 최신 값 (ID 오름차순 배열)"""
+
+    def __init__(self):
+        self.battery_ids = np.zeros(0, dtype=np.int64)
+        self.metrics = {name: np.zeros(0) for name in METRIC_FIELDS}
+        self.status = np.zeros(0, dtype=np.int8)
+        self.cell_balance = np.zeros(0, dtype=np.int8)
+        self.last_timestamp = np.zeros(0)
+        self.latest_timestamp = 0.0
+
+    def __len__(self) -> int:
+        return len(self.battery_ids)
+
+    def _add_batteries(self, battery_ids: np.ndarray):
+        """새 배터리 추가 (생략 가능 필드는 0, 상태는 정상으로 시작)"""
+        merged = np.union1d(self.battery_ids, battery_ids)
+        old_rows = np.searchsorted(merged, self.battery_ids)
+
+        def grow(values: np.ndarray, fill) -> np.ndarray:
+            column = np.full(len(merged), fill, dtype=values.dtype)
+            column[old_rows] = values
+            return column
+
+        self.metrics = {name: grow(values, 0.0) for name, values in self.metrics.items()}
+        self.status = grow(self.status, 0)
+        self.cell_balance = grow(self.cell_balance, 0)
+        self.last_timestamp = grow(self.last_timestamp, -np.inf)
+        self.battery_ids = merged
+
+    def restore(self, battery_ids: np.ndarray, metrics: Dict[str, np.ndarray],
+                status: np.ndarray, cell_balance: np.ndarray, timestamp: float):
+        """마지막 스냅샷 값으로 상태 복원 (다른 워커가 기록하던 수신 플릿을 이어받을 때)"""
+        self.battery_ids = battery_ids.copy()
+        self.metrics = {name: np.asarray(metrics[name], dtype=np.float64).copy() for name in METRIC_FIELDS}
+        self.status = status.copy()
+        self.cell_balance = cell_balance.copy()
+        self.last_timestamp = np.full(len(battery_ids), timestamp)
+        self.latest_timestamp = timestamp
+
+    def apply(self, batch: ReadingBatch) -> Tuple[Dict[str, int], np.ndarray]:
+        """측정값 반영 - 배터리별로 시각이 가장 늦은 값이 남고, 이미 반영된 시각보다 오래된 값은 무시
+
+        반환: (반영/무시 건수, 반영된 측정값의 배치 내 인덱스 - 시각순)
+        """
+        ids = batch.battery_ids
+        if len(ids) and not np.isin(ids, self.battery_ids).all():
+            self._add_batteries(np.unique(ids))
+        rows = np.searchsorted(self.battery_ids, ids)
+
+        fresh = batch.timestamps >= self.last_timestamp[rows]
+        # 시각 순으로 정렬 후 대입 - 같은 배터리가 여러 번 나오면 마지막(가장 늦은) 값이 남는다
+        order = np.flatnonzero(fresh)[np.argsort(batch.timestamps[fresh], kind="stable")]
+        rows = rows[order]
+        for name, column in self.metrics.items():
+            values = batch.metrics[name][order]
+            present = ~np.isnan(values)
+            column[rows[present]] = values[present]
+        for column, values in ((self.status, batch.status[order]), (self.cell_balance, batch.cell_balance[order])):
+            present = values >= 0
+            column[rows[present]] = values[present]
+        self.last_timestamp[rows] = batch.timestamps[order]
+        if len(order):
+            self.latest_timestamp = max(self.latest_timestamp, float(batch.timestamps[order[-1]]))
+        return {"applied": len(order), "stale": len(ids) - len(order)}, order
+
+    def readings(self, batch: ReadingBatch, applied: np.ndarray) -> Dict[str, np.ndarray]:
+        """반영된 측정값 (영구 저장용 - 각자의 시각, 생략된 필드는 그 배터리의 현재 값)
+
+        rows는 새 측정값을 보고한 배터리의 상태 행 (중복 없음)
+        """
+        battery_ids = batch.battery_ids[applied]
+        rows = np.searchsorted(self.battery_ids, battery_ids)
+        metrics = {}
+        for name, column in self.metrics.items():
+            values = batch.metrics[name][applied].astype(np.float64)
+            missing = np.isnan(values)
+            values[missing] = column[rows[missing]]
+            metrics[name] = values
+        status, cell_balance = (
+            np.where(values >= 0, values, column[rows]).astype(np.int8)
+            for values, column in ((batch.status[applied], self.status), (batch.cell_balance[applied], self.cell_balance))
+        )
+        return {
+            "timestamps": batch.timestamps[applied].astype(np.float64),
+            "battery_ids": battery_ids,
+            "metrics": metrics,
+            "status": status,
+            "cell_balance": cell_balance,
+            "rows": np.unique(rows),
+        }
+
+
+class _QueuedBatch:
+    __slots__ = ("batch", "future", "enqueued_at")
+
+    def __init__(self, batch: ReadingBatch, future: Optional[asyncio.Future]):
+        self.batch = batch
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class IngestQueue:
+    """프로세스 내 수집 큐 (측정값 수 기준 상한)
+
+    요청 처리기는 검증된 묶음을 넣고 즉시 반환하며(acknowledge: queued), 드레인 태스크가
+    drain_interval마다 또는 micro_batch 이상 쌓이면 묶음들을 이어 붙여 apply()로 한 번에 반영한다.
+    applied 확인이 필요한 요청은 반영 결과 future를 기다린다.
+    드레인 태스크는 첫 요청 시 현재 이벤트 루프에서 시작한다.
+    """
+
+    def __init__(self, apply: Callable[[ReadingBatch], Awaitable[Dict]],
+                 max_readings: int = INGEST_QUEUE_MAX_READINGS,
+                 micro_batch: int = INGEST_MICRO_BATCH_READINGS,
+                 drain_interval_ms: float = INGEST_DRAIN_INTERVAL_MS):
+        self.apply = apply
+        self.max_readings = max_readings
+        self.micro_batch = micro_batch
+        self.drain_interval = drain_interval_ms / 1000.0
+        self.depth = 0
+        self._items: Deque[_QueuedBatch] = deque()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._drain_task: Optional[asyncio.Task] = None
+
+        self.accepted = 0
+        self.applied = 0
+        self.stale = 0
+        self.micro_batches = 0
+        self.last_applied_at: Optional[float] = None
+
+    def offer(self, batch: ReadingBatch, wait: bool = False) -> Optional[asyncio.Future]:
+        """묶음 추가 (가득 차면 QueueFullError) - wait=True 이면 반영 결과 future 반환"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._bind(loop)
+        if self.depth + len(batch) > self.max_readings:
+            raise QueueFullError(f"수집 큐가 가득 찼습니다 ({self.depth}/{self.max_readings})")
+
+        future = loop.create_future() if wait else None
+        self._items.append(_QueuedBatch(batch, future))
+        self.depth += len(batch)
+        self.accepted += len(batch)
+        INGEST_QUEUE_DEPTH.set(self.depth)
+        self._wakeup.set()
+        if self._drain_task is None or self._drain_task.done():
+            self._drain_task = loop.create_task(self._drain())
+        return future
+
+    def _bind(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._items.clear()
+        self.depth = 0
+        self._wakeup = asyncio.Event()
+        self._drain_task = None
+
+    async def _drain(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._items:
+                if self.depth < self.micro_batch and self.drain_interval > 0:
+                    # 마이크로 배치가 찰 때까지 최대 drain_interval 동안 더 모음
+                    await asyncio.sleep(self.drain_interval)
+                await self._apply(self._take())
+
+    def _take(self) -> List[_QueuedBatch]:
+        items = [self._items.popleft()]
+        readings = len(items[0].batch)
+        while self._items and readings + len(self._items[0].batch) <= self.micro_batch:
+            item = self._items.popleft()
+            items.append(item)
+            readings += len(item.batch)
+        self.depth -= readings
+        INGEST_QUEUE_DEPTH.set(self.depth)
+        return items
+
+    async def _apply(self, items: List[_QueuedBatch]):
+        start = time.perf_counter()
+        try:
+            result = await self.apply(ReadingBatch.concatenate([item.batch for item in items]))
+        except Exception as e:
+            print(f"Telemetry ingest error: {e}")
+            for item in items:
+                if item.future is not None and not item.future.done():
+                    item.future.set_exception(e)
+            return
+        INGEST_APPLY_LATENCY.observe(time.perf_counter() - start)
+        INGEST_READINGS.labels("applied").inc(result["applied"])
+        INGEST_READINGS.labels("stale").inc(result["stale"])
+        self.applied += result["applied"]
+        self.stale += result["stale"]
+        self.micro_batches += 1
+        self.last_applied_at = time.time()
+        for item in items:
+            if item.future is not None and not item.future.done():
+                item.future.set_result(result)
+
+    def retry_after(self) -> int:
+        """큐가 비워질 때까지 예상 시간 (초, Retry-After 헤더용)"""
+        ticks = -(-self.depth // max(self.micro_batch, 1))
+        return max(1, int(np.ceil(ticks * self.drain_interval)))
+
+    def stats(self) -> Dict:
+        return {
+            "queue_depth": self.depth,
+            "max_readings": self.max_readings,
+            "accepted": self.accepted,
+            "applied": self.applied,
+            "stale": self.stale,
+            "micro_batches": self.micro_batches,
+            "last_applied_at": self.last_applied_at,
+        }
@@ -0,0 +1,346 @@
+"""
+텔레메트리 저장소 - 배터리 측정값 영구 저장 (SQLAlchemy, 월 단위 파티션 테이블)
+"""
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+from sqlalchemy import (
+    Column, Float, Index, Integer, MetaData, SmallInteger, Table, create_engine, event, inspect, select,
+)
+from sqlalchemy.engine import Engine, make_url
+
+from services.history_store import BATTERY_METRICS, CATEGORY_LABELS, STATUS_LABELS, CELL_BALANCE_LABELS
+from services.serialization import epoch_millis
+
+
+# 저장소 설정 (환경 변수)
+TELEMETRY_DATABASE_URL = os.getenv("TELEMETRY_DATABASE_URL", "sqlite:///./battery_telemetry.db")
+TELEMETRY_PERSISTENCE_ENABLED = os.getenv("TELEMETRY_PERSISTENCE", "1") == "1"
+TELEMETRY_FLUSH_TICKS = int(os.getenv("TELEMETRY_FLUSH_TICKS", "10"))
+TELEMETRY_FLUSH_INTERVAL_SECONDS = float(os.getenv("TELEMETRY_FLUSH_INTERVAL_SECONDS", "5.0"))
+TELEMETRY_QUEUE_SIZE = int(os.getenv("TELEMETRY_QUEUE_SIZE", "1000"))
+# 종료 시 남은 데이터 기록을 기다리는 최대 시간 (초)
+TELEMETRY_CLOSE_TIMEOUT_SECONDS = float(os.getenv("TELEMETRY_CLOSE_TIMEOUT_SECONDS", "10"))
+
+TABLE_PREFIX = "battery_readings_"
+
+
+def partition_name(timestamp: float) -> str:
+    """epoch 초 → 월 단위 파티션 테이블 이름"""
+    return TABLE_PREFIX + datetime.fromtimestamp(timestamp).strftime("%Y%m")
+
+
+def _month_partitions(start: float, end: float) -> List[str]:
+    """[start, end] 구간에 걸친 파티션 이름 목록 (시간순)"""
+    first = datetime.fromtimestamp(start)
+    last = datetime.fromtimestamp(end)
+    names = []
+    year, month = first.year, first.month
+    while (year, month) <= (last.year, last.month):
+        names.append(f"{TABLE_PREFIX}{year:04d}{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return names
+
+
+class TelemetryStore:
+    """배터리 측정값 영구 저장소
+
+    스냅샷은 enqueue() 로 큐에만 넣고(이벤트 루프 비차단), 백그라운드 쓰기
+    스레드가 N틱 단위로 모아 파티션별 executemany 한 트랜잭션으로 기록한다.
+    조회는 동기 메서드이므로 라우터에서 스레드풀로 실행한다.
+    read_only=True 이면 조회 전용 연결만 열고 쓰기 스레드를 시작하지 않는다 (학습 워커 등).
+    """
+
+    def __init__(self, database_url: str = TELEMETRY_DATABASE_URL,
+                 flush_ticks: int = TELEMETRY_FLUSH_TICKS,
+                 flush_interval: float = TELEMETRY_FLUSH_INTERVAL_SECONDS,
+                 queue_size: int = TELEMETRY_QUEUE_SIZE,
+                 read_only: bool = False):
+        self.database_url = database_url
+        self.read_only = read_only
+        self.engine = self._create_engine(database_url, read_only)
+        self.metadata = MetaData()
+        self.flush_ticks = flush_ticks
+        self.flush_interval = flush_interval
+
+        self._tables: Dict[str, Table] = {}
+        self._existing: set = set(
+            name for name in inspect(self.engine).get_table_names() if name.startswith(TABLE_PREFIX)
+        )
+        self._table_lock = threading.Lock()
+
+        self._queue: "queue.Queue[Optional[Tuple]]" = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self.written_rows = 0
+        self.dropped_ticks = 0
+        self._writer: Optional[threading.Thread] = None
+        if not read_only:
+            self._writer = threading.Thread(target=self._writer_loop, name="telemetry-writer", daemon=True)
+            self._writer.start()
+
+    @staticmethod
+    def _create_engine(database_url: str, read_only: bool = False) -> Engine:
+        if not database_url.startswith("sqlite"):
+            if read_only:
+                # 트랜잭션 기본값을 읽기 전용으로 (PostgreSQL)
+                return create_engine(database_url, pool_pre_ping=True,
+                                     connect_args={"options": "-c default_transaction_read_only=on"})
+            return create_engine(database_url, pool_pre_ping=True)
+
+        if read_only:
+            # 파일을 만들거나 저널 설정을 바꾸지 않는 조회 전용 연결 (WAL 모드는 DB 파일에 유지됨)
+            path = make_url(database_url).database
+            return create_engine(f"sqlite:///file:{path}?mode=ro&uri=true",
+                                 connect_args={"check_same_thread": False})
+
+        engine = create_engine(database_url, connect_args={"check_same_thread": False})
+
+        @event.listens_for(engine, "connect")
+        def _sqlite_pragmas(dbapi_connection, _):
+            # 쓰기 중에도 조회가 막히지 않도록 WAL 모드 사용
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.close()
+
+        return engine
+
+    def _table(self, name: str, create: bool = False) -> Optional[Table]:
+        """파티션 테이블 (create=True 이면 없을 때 생성)"""
+        with self._table_lock:
+            table = self._tables.get(name)
+            if table is None:
+                table = Table(
+                    name, self.metadata,
+                    Column("battery_id", Integer, nullable=False),
+                    Column("timestamp", Float, nullable=False),
+                    *[Column(metric, Float) for metric, _ in BATTERY_METRICS],
+                    Column("status", SmallInteger),
+                    Column("cell_balance", SmallInteger),
+                    Index(f"ix_{name}_battery_ts", "battery_id", "timestamp"),
+                    Index(f"ix_{name}_ts", "timestamp"),
+                )
+                self._tables[name] = table
+            if name not in self._existing:
+                if not create:
+                    return None
+                table.create(self.engine, checkfirst=True)
+                self._existing.add(name)
+            return table
+
+    # ------------------------------------------------------------------
+    # 쓰기
+    # ------------------------------------------------------------------
+
+    def enqueue(self, timestamp: Union[float, np.ndarray], battery_ids: np.ndarray, metrics: Dict[str, np.ndarray],
+                status: np.ndarray, cell_balance: np.ndarray):
+        """스냅샷 한 틱 (또는 측정값마다 시각이 다른 수신 측정값 묶음)을 쓰기 큐에 추가 (가득 차면 버리고 카운트)"""
+        if self.read_only:
+            raise RuntimeError("조회 전용 저장소에는 기록할 수 없습니다")
+        try:
+            self._queue.put_nowait((timestamp, battery_ids, metrics, status, cell_balance))
+        except queue.Full:
+            self.dropped_ticks += 1
+
+    def _writer_loop(self):
+        pending: List[Tuple] = []
+        deadline = time.monotonic() + self.flush_interval
+
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = ()
+
+            if item:
+                pending.append(item)
+            if self._stop.is_set():
+                # 종료 - 큐에 남은 틱까지 기록
+                pending.extend(self._drain())
+                self._flush(pending)
+                return
+
+            if len(pending) >= self.flush_ticks or time.monotonic() >= deadline:
+                self._flush(pending)
+                pending = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _drain(self) -> List[Tuple]:
+        items = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return items
+            if item:
+                items.append(item)
+
+    def _flush(self, pending: List[Tuple]):
+        """모인 틱들을 파티션별로 묶어 한 트랜잭션에 bulk insert"""
+        if not pending:
+            return
+
+        batches: Dict[str, List[Dict]] = {}
+        for timestamp, battery_ids, metrics, status, cell_balance in pending:
+            timestamps = np.broadcast_to(np.asarray(timestamp, dtype=np.float64), battery_ids.shape)
+            columns = {name: values.tolist() for name, values in metrics.items()}
+            columns["battery_id"] = battery_ids.tolist()
+            columns["status"] = status.tolist()
+            columns["cell_balance"] = cell_balance.tolist()
+            columns["timestamp"] = timestamps.tolist()
+            names = list(columns)
+            records = [dict(zip(names, values)) for values in zip(*columns.values())]
+            if not records:
+                continue
+            first, last = partition_name(float(timestamps.min())), partition_name(float(timestamps.max()))
+            if first == last:
+                batches.setdefault(first, []).extend(records)
+            else:
+                # 월 경계에 걸친 수신 측정값 묶음 - 측정값마다 파티션 결정
+                for record in records:
+                    batches.setdefault(partition_name(record["timestamp"]), []).append(record)
+
+        try:
+            # DDL은 쓰기 트랜잭션 밖에서 먼저 수행 (SQLite 잠금 방지)
+            tables = {name: self._table(name, create=True) for name in batches}
+            with self.engine.begin() as conn:
+                for name, rows in batches.items():
+                    conn.execute(tables[name].insert(), rows)
+            self.written_rows += sum(len(rows) for rows in batches.values())
+        except Exception as e:
+            print(f"Telemetry write error: {e}")
+
+    def close(self, timeout: float = TELEMETRY_CLOSE_TIMEOUT_SECONDS):
+        """남은 데이터 기록 후 쓰기 스레드 종료 - 최대 timeout초 대기 (큐가 가득 차 있어도 막히지 않음)"""
+        if self._writer is None:
+            self.engine.dispose()
+            return
+        self._stop.set()
+        try:
+            # 대기 중인 쓰기 스레드를 바로 깨움 (가득 차 있으면 쓰기 스레드가 이미 꺼내는 중)
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+        self._writer.join(timeout)
+        if self._writer.is_alive():
+            print(f"Telemetry writer did not finish within {timeout}s")
+
+    # ------------------------------------------------------------------
+    # 조회 (동기 - 스레드풀에서 실행)
+    # ------------------------------------------------------------------
+
+    def iter_range(self, start: float, end: float, battery_id: Optional[int] = None,
+                   chunk_size: int = 5000) -> Iterator[List[Dict]]:
+        """[start, end] 구간의 측정값을 시간순 청크로 반환 (키셋 페이지네이션)"""
+        for rows in self._iter_rows(start, end, battery_id, chunk_size):
+            yield [_reading_dict(row) for row in rows]
+
+    def _iter_rows(self, start: float, end: float, battery_id: Optional[int],
+                   chunk_size: int) -> Iterator[list]:
+        """[start, end] 구간의 DB 행을 시간순 청크로 반환"""
+        for name in _month_partitions(start, end):
+            table = self._table(name)
+            if table is None:
+                continue
+
+            cursor: Tuple[float, int] = (start, -1)
+            while True:
+                # timestamp 하한을 별도 조건으로 두어야 timestamp 인덱스 범위 검색 + 순서대로 읽기가 됨
+                # (OR 조건만 두면 매 페이지 구간 전체를 정렬)
+                after = (table.c.timestamp >= cursor[0]) & (
+                    (table.c.timestamp > cursor[0]) | (table.c.battery_id > cursor[1])
+                )
+                query = select(table).where(after, table.c.timestamp <= end)
+                if battery_id is not None:
+                    query = query.where(table.c.battery_id == battery_id)
+                query = query.order_by(table.c.timestamp, table.c.battery_id)
+
+                with self.engine.connect() as conn:
+                    rows = conn.execute(query.limit(chunk_size)).mappings().all()
+                if not rows:
+                    break
+
+                yield rows
+
+                last = rows[-1]
+                cursor = (last["timestamp"], last["battery_id"])
+                if len(rows) < chunk_size:
+                    break
+
+    def query_range(self, start: float, end: float, battery_id: Optional[int] = None,
+                    limit: int = 1000) -> List[Dict]:
+        """[start, end] 구간 측정값 조회 (최대 limit개, 시간순)"""
+        readings: List[Dict] = []
+        for chunk in self.iter_range(start, end, battery_id, chunk_size=min(limit, 5000)):
+            readings.extend(chunk[:limit - len(readings)])
+            if len(readings) >= limit:
+                break
+        return readings
+
+    def iter_range_arrays(self, start: float, end: float, battery_id: Optional[int] = None,
+                          chunk_size: int = 5000) -> Iterator[Dict[str, np.ndarray]]:
+        """[start, end] 구간 측정값을 시간순 컬럼 배열 청크로 반환 (메모리는 청크 크기만큼만 사용)"""
+        for rows in self._iter_rows(start, end, battery_id, chunk_size):
+            names = list(rows[0].keys())
+            # NULL(값 없는 지표)은 NaN
+            matrix = np.array([tuple(row.values()) for row in rows], dtype=np.float64)
+            chunk = {name: matrix[:, j] for j, name in enumerate(names)}
+            chunk["battery_id"] = chunk["battery_id"].astype(np.int64)
+            for name in ("status", "cell_balance"):
+                chunk[name] = np.nan_to_num(chunk[name]).astype(np.int8)
+            yield chunk
+
+    def query_range_columns(self, start: float, end: float, battery_id: Optional[int] = None,
+                            limit: int = 1000) -> Dict:
+        """[start, end] 구간 측정값 조회 - 컬럼형 (행마다 timestamps[i], battery_ids[i], values[지표][i])"""
+        chunks: List[Dict[str, np.ndarray]] = []
+        remaining = limit
+        for chunk in self.iter_range_arrays(start, end, battery_id, chunk_size=min(limit, 5000)):
+            chunks.append({name: column[:remaining] for name, column in chunk.items()})
+            remaining -= len(chunks[-1]["timestamp"])
+            if remaining <= 0:
+                break
+        names = ["timestamp", "battery_id", *(name for name, _ in BATTERY_METRICS), "status", "cell_balance"]
+        columns = {
+            name: np.concatenate([chunk[name] for chunk in chunks]) if chunks else np.zeros(0)
+            for name in names
+        }
+
+        values = {}
+        for name, digits in BATTERY_METRICS:
+            column = columns[name]
+            values[name] = (np.rint(column).astype(np.int64) if digits is None else np.round(column, digits)).tolist()
+        values["status"] = columns["status"].astype(np.int64).tolist()
+        values["cell_balance"] = columns["cell_balance"].astype(np.int64).tolist()
+        return {
+            "timestamps": epoch_millis(columns["timestamp"]),
+            "battery_ids": columns["battery_id"].astype(np.int64).tolist(),
+            "values": values,
+            "labels": CATEGORY_LABELS,
+        }
+
+
+def _reading_dict(row) -> Dict:
+    """DB 행 → 응답용 딕셔너리"""
+    reading = {
+        "timestamp": datetime.fromtimestamp(row["timestamp"]).isoformat(),
+        "battery_id": row["battery_id"],
+    }
+    for name, digits in BATTERY_METRICS:
+        value = row[name]
+        reading[name] = int(value) if digits is None else round(value, digits)
+    reading["status"] = STATUS_LABELS[row["status"]]
+    reading["cell_balance"] = CELL_BALANCE_LABELS[row["cell_balance"]]
+    return reading
+
+
+def create_telemetry_store() -> Optional[TelemetryStore]:
+    """환경 설정에 따라 저장소 생성 (비활성화 시 None)"""
+    if not TELEMETRY_PERSISTENCE_ENABLED:
+        return None
+    return TelemetryStore()
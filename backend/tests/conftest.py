@@ -0,0 +1,30 @@
+"""
+테스트 공통 설정 - 서비스 모듈이 import 시 읽는 환경 변수를 테스트용 값으로 고정
+"""
+import os
+import shutil
+import tempfile
+
+import pytest
+
+# 모델 산출물 / 업로드 / DB 파일은 작업 디렉터리 대신 임시 디렉터리에
+_WORKDIR = tempfile.mkdtemp(prefix="battery-tests-")
+os.environ.setdefault("TELEMETRY_PERSISTENCE", "0")
+os.environ.setdefault("TELEMETRY_DATABASE_URL", f"sqlite:///{_WORKDIR}/telemetry.db")
+os.environ.setdefault("MODEL_ARTIFACT_DIR", os.path.join(_WORKDIR, "model_artifacts"))
+os.environ.setdefault("TRAINING_UPLOAD_DIR", _WORKDIR)
+os.environ.setdefault("SHARED_STATE", "0")
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_WORKDIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def client():
+    """앱 수명주기(lifespan)까지 실행한 테스트 클라이언트 - 프로듀서 태스크가 프로세스 전역이므로 세션당 한 번"""
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
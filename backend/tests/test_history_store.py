@@ -0,0 +1,139 @@
+"""
+컬럼형 링 버퍼 히스토리 - 순환, 연속 뷰, 플릿 변경 시 이력 이전
+"""
+import numpy as np
+import pytest
+
+from services.history_store import BATTERY_METRICS, SYSTEM_METRICS, HistoryStore
+
+
+def _append(store, tick, battery_count=None, **overrides):
+    """tick 값으로 채운 슬롯 기록 (배터리 b의 voltage = tick + b / 100)"""
+    n = store.battery_count if battery_count is None else battery_count
+    metrics = {name: np.full(n, float(tick)) for name, _ in BATTERY_METRICS}
+    metrics["voltage"] = tick + np.arange(n) / 100
+    metrics.update(overrides)
+    store.append(
+        float(1_700_000_000 + tick), metrics,
+        np.zeros(n, dtype=np.int8), np.zeros(n, dtype=np.int8),
+        {name: float(tick) for name, _ in SYSTEM_METRICS},
+    )
+
+
+def _store(capacity=4, battery_ids=(1, 2, 3)):
+    store = HistoryStore(capacity=capacity, battery_count=len(battery_ids))
+    store.set_batteries(battery_ids, [{"name": f"battery-{i}"} for i in battery_ids])
+    return store
+
+
+def test_window_wraps_and_keeps_latest_slots_in_order():
+    store = _store(capacity=4)
+    for tick in range(1, 11):
+        _append(store, tick)
+
+    assert len(store) == 4
+    window = store.window(10)
+    assert window["timestamp"].tolist() == [1_700_000_000 + t for t in (7, 8, 9, 10)]
+    assert window["soc"][:, 0].tolist() == [7, 8, 9, 10]
+    # 복제 배치 덕분에 순환 후에도 복사 없는 뷰
+    assert np.shares_memory(window["soc"], store.metrics["soc"])
+
+
+def test_window_for_single_battery_and_limit():
+    store = _store(capacity=8)
+    for tick in range(1, 6):
+        _append(store, tick)
+
+    window = store.window(2, battery_index=2)
+    assert window["voltage"].tolist() == pytest.approx([4.02, 5.02])
+
+
+def test_records_and_columns_match():
+    store = _store(capacity=8)
+    for tick in range(1, 4):
+        _append(store, tick)
+
+    records = store.battery_records(1, 10)
+    columns = store.battery_columns(1, 10)
+    assert [r["voltage"] for r in records] == columns["values"]["voltage"] == [1.01, 2.01, 3.01]
+    assert records[-1]["id"] == columns["battery_id"] == 2
+    assert records[-1]["status"] == "정상"
+    assert len(columns["timestamps"]) == 3
+
+    snapshots = store.snapshot_records(2)
+    assert [len(s["batteries"]) for s in snapshots] == [3, 3]
+    assert snapshots[-1]["total_stats"]["total_power"] == 3.0
+
+
+def test_remap_carries_over_remaining_batteries():
+    store = _store(capacity=4, battery_ids=(1, 2, 3))
+    for tick in range(1, 7):
+        _append(store, tick)
+
+    # 배터리 2 제거, 배터리 4 추가
+    store.set_batteries([1, 3, 4], [{"name": "a"}, {"name": "c"}, {"name": "d"}])
+    assert len(store) == 4
+    window = store.window(10)
+    assert window["voltage"][:, 0].tolist() == pytest.approx([3.0, 4.0, 5.0, 6.0])
+    assert window["voltage"][:, 1].tolist() == pytest.approx([3.02, 4.02, 5.02, 6.02])
+    # 새 배터리의 과거 슬롯은 값 없음
+    assert np.isnan(window["voltage"][:, 2]).all()
+    assert store.battery_records(2, 10) == []
+
+    # 이전 후에도 이어서 기록
+    _append(store, 7)
+    assert store.window(1)["voltage"][0].tolist() == pytest.approx([7.0, 7.01, 7.02])
+    assert store.battery_index(4) == 2
+    assert store.battery_index(2) is None
+
+
+def test_shrinking_capacity_keeps_most_recent_slots():
+    store = HistoryStore(capacity=10, battery_count=2, max_samples=20)
+    store.set_batteries([1, 2], [{}, {}])
+    for tick in range(1, 9):
+        _append(store, tick)
+
+    # 배터리 수가 늘어 용량이 20 // 4 = 5로 줄어듦
+    store.set_batteries([1, 2, 3, 4], [{}, {}, {}, {}])
+    assert store.capacity == 5
+    assert store.window(10)["soc"][:, 0].tolist() == [4, 5, 6, 7, 8]
+
+
+def test_cumulative_metrics_keep_decimal_precision():
+    store = _store(capacity=2, battery_ids=(1,))
+    total = 123_456_789.37
+    _append(store, 1, energy_total=np.array([total]), runtime_hours=np.array([98_765.43]))
+
+    record = store.battery_records(0, 1)[0]
+    assert record["energy_total"] == total
+    assert record["runtime"] == "98765.43시간"
+
+
+def test_iter_range_arrays_chunks_and_bounds():
+    store = _store(capacity=16)
+    for tick in range(1, 11):
+        _append(store, tick)
+
+    chunks = list(store.iter_range_arrays(1_700_000_003, 1_700_000_008, chunk_rows=6))
+    assert [len(c["timestamp"]) for c in chunks] == [6, 6, 6]
+    timestamps = np.concatenate([c["timestamp"] for c in chunks])
+    assert timestamps.min() == 1_700_000_003 and timestamps.max() == 1_700_000_008
+    assert np.concatenate([c["battery_id"] for c in chunks]).tolist() == [1, 2, 3] * 6
+
+    single = list(store.iter_range_arrays(0, 2e9, battery_index=1))
+    assert single[0]["voltage"].tolist() == pytest.approx([t + 0.01 for t in range(1, 11)])
+
+
+def test_history_endpoint_records_and_columnar(client):
+    client.get("/api/battery/status")
+
+    records = client.get("/api/battery/history", params={"battery_id": 1, "limit": 5}).json()
+    assert records["success"] and records["count"] == len(records["data"]) >= 1
+    assert all(r["id"] == 1 for r in records["data"])
+
+    columns = client.get("/api/battery/history", params={"battery_id": 1, "format": "columnar"}).json()
+    assert columns["count"] == len(columns["data"]["timestamps"])
+    assert len(columns["data"]["values"]["voltage"]) == columns["count"]
+
+    missing = client.get("/api/battery/history", params={"battery_id": 999}).json()
+    assert missing["data"] == []
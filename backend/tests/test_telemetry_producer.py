@@ -0,0 +1,98 @@
+"""
+공유 텔레메트리 프로듀서 - 구독자 수와 무관하게 스냅샷당 한 번 계산해 모든 클라이언트에 전송
+"""
+import asyncio
+import json
+
+import pytest
+
+from main import manager, next_grid_time, publish_due_groups
+from services.container import container
+
+
+class RecordingWebSocket:
+    """보낸 메시지를 기록하는 WebSocket 대역"""
+
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, payload):
+        self.sent.append(payload)
+
+    async def send_bytes(self, payload):
+        self.sent.append(payload)
+
+    async def close(self, code=None):
+        pass
+
+
+async def _drain():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_next_grid_time_keeps_phase():
+    assert next_grid_time(10.0, 0.0, 1.0) == 11.0
+    assert next_grid_time(10.4, 0.0, 1.0) == 11.0
+    assert next_grid_time(10.4, 0.25, 0.5) == 10.75
+    # 처리 지연으로 여러 틱을 놓쳐도 다음 격자 시각으로
+    assert next_grid_time(13.7, 10.0, 1.0) == 14.0
+
+
+@pytest.mark.asyncio
+async def test_one_frame_per_snapshot_is_fanned_out_to_all_clients():
+    sockets = [RecordingWebSocket() for _ in range(3)]
+    subscribers = [await manager.connect(ws) for ws in sockets]
+    try:
+        assert len(manager.groups) == 1
+        snapshot = container.refresh()
+        loop = asyncio.get_running_loop()
+        await publish_due_groups(snapshot, loop.time(), loop.time())
+        await _drain()
+
+        payloads = [ws.sent for ws in sockets]
+        assert all(len(sent) == 1 for sent in payloads)
+        # 그룹당 한 번 인코딩한 같은 본문
+        assert payloads[0][0] is payloads[1][0] is payloads[2][0]
+        assert set(json.loads(payloads[0][0])) == {"timestamp", "battery_data", "prediction"}
+
+        # 같은 스냅샷은 다시 보내지 않음
+        (group,) = manager.groups.values()
+        group.next_due = 0.0
+        await publish_due_groups(snapshot, loop.time(), loop.time())
+        await _drain()
+        assert all(len(ws.sent) == 1 for ws in sockets)
+    finally:
+        for subscriber in subscribers:
+            manager.disconnect(subscriber)
+    assert manager.groups == {}
+
+
+@pytest.mark.asyncio
+async def test_late_subscriber_gets_latest_frame_immediately():
+    first = RecordingWebSocket()
+    subscriber = await manager.connect(first)
+    late = None
+    try:
+        snapshot = container.refresh()
+        loop = asyncio.get_running_loop()
+        await publish_due_groups(snapshot, loop.time(), loop.time())
+        late_ws = RecordingWebSocket()
+        late = await manager.connect(late_ws)
+        await _drain()
+        assert late_ws.sent == first.sent
+    finally:
+        manager.disconnect(subscriber)
+        if late is not None:
+            manager.disconnect(late)
+
+
+def test_websocket_clients_receive_telemetry(client):
+    with client.websocket_connect("/ws/battery-data") as a, client.websocket_connect("/ws/battery-data") as b:
+        for ws in (a, b):
+            message = json.loads(ws.receive_text())
+            assert message["battery_data"]["batteries"]
+            assert "battery_predictions" in message["prediction"]